@@ -0,0 +1,78 @@
+"""daily rollups
+
+Revision ID: 8e1f4a6c2d90
+Revises: 3b9d2e7a1c45
+Create Date: 2026-10-18 11:04:52.730114
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e1f4a6c2d90"
+down_revision: str | Sequence[str] | None = "3b9d2e7a1c45"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "video_daily_stats",
+        sa.Column("video_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("delta_views_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_likes_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_comments_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_reports_count", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["video_id"], ["videos.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("video_id", "day"),
+    )
+    op.create_index(
+        "ix_video_daily_stats_day", "video_daily_stats", ["day"], unique=False
+    )
+    op.create_table(
+        "daily_stats",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("delta_views_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_likes_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_comments_count", sa.BigInteger(), nullable=False),
+        sa.Column("delta_reports_count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day"),
+    )
+    op.execute(
+        """
+        INSERT INTO video_daily_stats (
+            video_id, day, delta_views_count, delta_likes_count,
+            delta_comments_count, delta_reports_count
+        )
+        SELECT video_id, (created_at AT TIME ZONE 'UTC')::date,
+               sum(delta_views_count), sum(delta_likes_count),
+               sum(delta_comments_count), sum(delta_reports_count)
+        FROM video_snapshots
+        GROUP BY video_id, (created_at AT TIME ZONE 'UTC')::date
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO daily_stats (
+            day, delta_views_count, delta_likes_count,
+            delta_comments_count, delta_reports_count
+        )
+        SELECT day, sum(delta_views_count), sum(delta_likes_count),
+               sum(delta_comments_count), sum(delta_reports_count)
+        FROM video_daily_stats
+        GROUP BY day
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_stats")
+    op.drop_index("ix_video_daily_stats_day", table_name="video_daily_stats")
+    op.drop_table("video_daily_stats")
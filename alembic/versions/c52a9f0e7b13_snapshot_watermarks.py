@@ -0,0 +1,43 @@
+"""snapshot watermarks
+
+Revision ID: c52a9f0e7b13
+Revises: 8e1f4a6c2d90
+Create Date: 2026-10-18 12:21:07.104539
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c52a9f0e7b13"
+down_revision: str | Sequence[str] | None = "8e1f4a6c2d90"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "video_snapshot_watermarks",
+        sa.Column("video_id", sa.UUID(), nullable=False),
+        sa.Column("last_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["video_id"], ["videos.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("video_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO video_snapshot_watermarks (video_id, last_created_at)
+        SELECT video_id, max(created_at)
+        FROM video_snapshots
+        GROUP BY video_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("video_snapshot_watermarks")
@@ -0,0 +1,43 @@
+"""utc date expression indexes
+
+Revision ID: d7a3b19e5f28
+Revises: c52a9f0e7b13
+Create Date: 2026-10-18 14:02:41.318207
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a3b19e5f28"
+down_revision: str | Sequence[str] | None = "c52a9f0e7b13"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_videos_video_created_at_utc_date",
+        "videos",
+        [sa.text("CAST(timezone('UTC', video_created_at) AS DATE)")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_video_snapshots_created_at_utc_date",
+        "video_snapshots",
+        [sa.text("CAST(timezone('UTC', created_at) AS DATE)")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_video_snapshots_created_at_utc_date", table_name="video_snapshots"
+    )
+    op.drop_index("ix_videos_video_created_at_utc_date", table_name="videos")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class PipelineBusyError(Exception):
+    pass
+
+
+class RequestPipeline:
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_pending: int = 500,
+        max_pending_per_chat: int = 3,
+    ) -> None:
+        self._max_pending = max_pending
+        self._max_pending_per_chat = max_pending_per_chat
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_pending: dict[int, int] = {}
+        self._pending = 0
+        self._in_flight = 0
+        self.shed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, chat_id: int, job: Callable[[], Awaitable[T]]) -> T:
+        chat_pending = self._chat_pending.get(chat_id, 0)
+        if (
+            self._pending >= self._max_pending
+            or chat_pending >= self._max_pending_per_chat
+        ):
+            self.shed += 1
+            raise PipelineBusyError(f"pipeline is full for chat {chat_id}")
+
+        self._pending += 1
+        self._chat_pending[chat_id] = chat_pending + 1
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+
+        try:
+            # Сначала очередь чата (порядок ответов), потом общий слот:
+            # чат с медленным SQL держит не больше одного слота и не
+            # вытесняет остальные чаты.
+            async with lock, self._slots:
+                self._in_flight += 1
+                try:
+                    return await job()
+                finally:
+                    self._in_flight -= 1
+        finally:
+            self._pending -= 1
+            left = self._chat_pending[chat_id] - 1
+            if left:
+                self._chat_pending[chat_id] = left
+            else:
+                del self._chat_pending[chat_id]
+                del self._chat_locks[chat_id]
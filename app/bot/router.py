@@ -1,40 +1,149 @@
-from typing import Awaitable, Callable, cast
 import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import cast
 
 from aiogram import F, Router
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandStart
 from aiogram.types import Message
 
-from app.llm.prompt import build_messages
+from app.bot.pipeline import PipelineBusyError, RequestPipeline
+from app.core.metrics import REQUEST_ERRORS, REQUEST_LATENCY, TELEGRAM_SEND_LATENCY
+from app.core.tracing import set_attribute, span, start_trace
+from app.db.cost import SqlBudgetError
+from app.db.errors import ScalarsError, SqlError
+from app.db.stats import QueryStats
+from app.llm.cache import QuestionSqlCache
+from app.llm.client import LlmClientError
+from app.llm.prompt import build_messages, build_rewrite_messages
 
 router = Router(name=__name__)
 logger = logging.getLogger(__name__)
 
+BUSY_TEXT = "Сейчас много запросов, попробуйте чуть позже"
+TOO_EXPENSIVE_TEXT = "Запрос получился слишком тяжёлым, попробуйте сузить вопрос"
+
+
+def _error_class(exc: BaseException) -> str:
+    for error_type in (ScalarsError, SqlError, LlmClientError):
+        if isinstance(exc, error_type):
+            return error_type.__name__
+    return "other"
+
+
+async def _send(message: Message, text: str) -> None:
+    started = time.perf_counter()
+    try:
+        with span("telegram.send"):
+            await message.answer(text)
+    finally:
+        TELEGRAM_SEND_LATENCY.observe(time.perf_counter() - started)
+
 
 @router.message(CommandStart())
 async def command_start(message: Message) -> None:
     await message.answer("Бот запущен. Напиши любой текст.")
 
 
+@router.message(Command("querystats"))
+async def command_query_stats(
+    message: Message,
+    query_stats: QueryStats | None = None,
+    admin_chat_ids: frozenset[int] = frozenset(),
+) -> None:
+    # В остальных чатах команда молча игнорируется и не уходит в LLM.
+    if message.chat.id not in admin_chat_ids or query_stats is None:
+        return
+
+    args = (message.text or "").split()[1:]
+    top_n = int(args[0]) if args and args[0].isdigit() else 10
+    report = query_stats.report(top_n)
+    # Лимит Telegram — 4096 символов на сообщение.
+    for start in range(0, len(report), 4000):
+        await message.answer(report[start : start + 4000])
+
+
+async def _answer_question(
+    message: Message,
+    text: str,
+    llm_request: Callable[[list[dict[str, str]]], Awaitable[str]],
+    sql_execute: Callable[[str], Awaitable[int | float]],
+    question_cache: QuestionSqlCache | None,
+) -> str:
+    try:
+        sql = question_cache.lookup(text) if question_cache is not None else None
+        if sql is not None:
+            logger.info("question_cache_hit")
+            set_attribute("question_cache_hit", True)
+            with span("sql"):
+                value = await sql_execute(sql)
+        else:
+            messages = build_messages(text)
+            with span("llm"):
+                sql = await llm_request(messages)
+            try:
+                with span("sql"):
+                    value = await sql_execute(sql)
+            except SqlBudgetError as exc:
+                # Одна попытка попросить у LLM более дешёвый запрос.
+                logger.warning("sql_over_budget reason=%s", exc)
+                rewrite_messages = build_rewrite_messages(text, sql, str(exc))
+                with span("llm", rewrite=True):
+                    sql = await llm_request(rewrite_messages)
+                with span("sql", rewrite=True):
+                    value = await sql_execute(sql)
+            if question_cache is not None:
+                question_cache.store(text, sql)
+    except SqlBudgetError as exc:
+        logger.warning("sql_over_budget_after_rewrite")
+        REQUEST_ERRORS.labels(error=_error_class(exc)).inc()
+        await _send(message, TOO_EXPENSIVE_TEXT)
+        return "too_expensive"
+    except Exception as exc:
+        logger.exception("failed_to_process_request")
+        REQUEST_ERRORS.labels(error=_error_class(exc)).inc()
+        await _send(message, "Не смог обработать запрос")
+        return "error"
+
+    response_text = str(value)
+    logger.info("telegram_response=%s", response_text)
+    await _send(message, response_text)
+    return "ok"
+
+
 @router.message(F.text)
 async def handle_text(
     message: Message,
     llm_request: Callable[[list[dict[str, str]]], Awaitable[str]],
     sql_execute: Callable[[str], Awaitable[int | float]],
+    question_cache: QuestionSqlCache | None = None,
+    pipeline: RequestPipeline | None = None,
 ) -> None:
+    started = time.perf_counter()
     text = cast(str, message.text)
 
-    logger.info("input_text=%s", text)
+    with start_trace("handle_text", chat_id=message.chat.id):
+        logger.info("input_text=%s", text)
 
-    try:
-        messages = build_messages(text)
-        sql = await llm_request(messages)
-        value = await sql_execute(sql)
-    except Exception:
-        logger.exception("failed_to_process_request")
-        await message.answer("Не смог обработать запрос")
-        return
+        if pipeline is None:
+            outcome = await _answer_question(
+                message, text, llm_request, sql_execute, question_cache
+            )
+        else:
+            try:
+                # Разница между началом спана pipeline и первым дочерним
+                # спаном — ожидание в очереди.
+                with span("pipeline"):
+                    outcome = await pipeline.run(
+                        message.chat.id,
+                        lambda: _answer_question(
+                            message, text, llm_request, sql_execute, question_cache
+                        ),
+                    )
+            except PipelineBusyError:
+                logger.warning("pipeline_busy chat_id=%s", message.chat.id)
+                await _send(message, BUSY_TEXT)
+                outcome = "busy"
 
-    response_text = str(value)
-    logger.info("telegram_response=%s", response_text)
-    await message.answer(response_text)
+        set_attribute("outcome", outcome)
+        REQUEST_LATENCY.labels(outcome=outcome).observe(time.perf_counter() - started)
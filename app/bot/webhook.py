@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+
+async def _healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str,
+    secret_token: str,
+) -> web.Application:
+    app = web.Application()
+    app.router.add_get("/healthz", _healthz)
+
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token,
+    ).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+
+    return app
+
+
+def register_webhook(dispatcher: Dispatcher, url: str, secret_token: str) -> None:
+    # Все реплики регистрируют один и тот же URL, поэтому вызов идемпотентен.
+    # На shutdown webhook не удаляем: остальные реплики продолжают работать.
+    async def set_webhook(bot: Bot) -> None:
+        await bot.set_webhook(
+            url,
+            secret_token=secret_token,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+
+    dispatcher.startup.register(set_webhook)
+
+
+async def run_webhook(app: web.Application, host: str, port: int) -> None:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
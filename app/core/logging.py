@@ -1,9 +1,15 @@
+import json
 import logging
+import queue
+import random
+import sys
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, TextIO, cast
 
-from app.core.settings import get_settings
-
-settings = get_settings()
-log_level = settings.level_logging
+from app.core.metrics import LOG_RECORDS_DROPPED
+from app.core.tracing import RequestIdFilter
 
 _LEVELS: dict[str, int] = {
     "CRITICAL": logging.CRITICAL,
@@ -13,12 +19,152 @@ _LEVELS: dict[str, int] = {
     "DEBUG": logging.DEBUG,
 }
 
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def parse_sampling(value: str) -> dict[str, float]:
+    # "app.bot.router=0.1,app.db.executor=0.5"
+    rates: dict[str, float] = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Оставляет долю INFO/DEBUG-записей логгера; WARNING и выше — всегда."""
+
+    def __init__(self, rates: Mapping[str, float]) -> None:
+        super().__init__()
+        # Длинные префиксы первыми: app.db.executor точнее, чем app.db.
+        self._rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self._cache: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = next(
+                (
+                    value
+                    for prefix, value in self._rates
+                    if name == prefix or name.startswith(prefix + ".")
+                ),
+                1.0,
+            )
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+
+        # Внутри апдейта решение зависит от request_id, а не от случая:
+        # у попавшего в выборку апдейта остаются все строки (вопрос, SQL,
+        # ответ) во всех логгерах с той же или большей долей.
+        request_id = getattr(record, "request_id", "-")
+        if request_id == "-":
+            return random.random() < rate
+        return int(request_id[:8], 16) < rate * 0x1_0000_0000
+
 
-def setup_logging(level: int | str = logging.INFO) -> None:
+class DroppingQueueHandler(QueueHandler):
+    """Кладёт запись в ограниченную очередь и не ждёт, если она полна.
+
+    При переполнении INFO/DEBUG отбрасываются, а WARNING и выше вытесняют
+    самую старую запись.
+    """
+
+    def __init__(self, log_queue: queue.Queue[logging.LogRecord]) -> None:
+        super().__init__(log_queue)
+        self._queue = log_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Сообщение подставляется сразу: аргументы могут измениться, пока
+        # запись ждёт в очереди. JSON и запись в поток — в потоке QueueListener.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        self.dropped += 1
+        LOG_RECORDS_DROPPED.inc()
+        if record.levelno < logging.WARNING:
+            return
+
+        try:
+            self._queue.get_nowait()
+            self._queue.put_nowait(record)
+        except (queue.Empty, queue.Full):
+            pass
+
+
+class _LogListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Очередь может быть полна: при остановке ждём, пока поток её разберёт.
+        sentinel = self._sentinel  # type: ignore[attr-defined]
+        cast("queue.Queue[Any]", self.queue).put(sentinel)
+
+
+def setup_logging(
+    level: int | str = logging.INFO,
+    *,
+    log_format: str = "json",
+    queue_size: int = 10_000,
+    sampling: Mapping[str, float] | None = None,
+    stream: TextIO | None = None,
+) -> QueueListener:
     if isinstance(level, str):
         normalized = level.strip().upper()
         level = _LEVELS.get(normalized, logging.INFO)
 
-    logging.basicConfig(
-        level=level, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(
+        JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
     )
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    # request_id общий для всех строк одного апдейта (router, LLM, executor);
+    # читается из contextvars, поэтому ставится до очереди.
+    handler.addFilter(RequestIdFilter())
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    # Запись в stderr — в отдельном потоке; event loop только кладёт в очередь.
+    listener = _LogListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
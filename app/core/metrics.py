@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy.pool import Pool, QueuePool
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# От долей миллисекунды (шаблоны, кэш, валидация) до таймаута LLM.
+_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+LLM_LATENCY = Histogram(
+    "bot_llm_request_seconds",
+    "Время генерации SQL по бэкендам (template — без LLM)",
+    ["backend"],
+    buckets=_BUCKETS,
+)
+SQL_VALIDATION_LATENCY = Histogram(
+    "bot_sql_validation_seconds",
+    "Проверка SQL и переписывание условий по датам",
+    buckets=_BUCKETS,
+)
+SQL_EXECUTION_LATENCY = Histogram(
+    "bot_sql_execution_seconds",
+    "Выполнение SQL, включая ожидание пула и EXPLAIN",
+    buckets=_BUCKETS,
+)
+TELEGRAM_SEND_LATENCY = Histogram(
+    "bot_telegram_send_seconds",
+    "Отправка ответа в Telegram",
+    buckets=_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "bot_request_seconds",
+    "От входящего сообщения до отправленного ответа",
+    ["outcome"],
+    buckets=_BUCKETS,
+)
+REQUEST_ERRORS = Counter(
+    "bot_request_errors",
+    "Необработанные запросы по классу ошибки",
+    ["error"],
+)
+LOG_RECORDS_DROPPED = Counter(
+    "bot_log_records_dropped",
+    "Записи лога, отброшенные из-за переполненной очереди",
+)
+
+DB_POOL_SIZE = Gauge("bot_db_pool_size", "Размер пула соединений", ["target"])
+DB_POOL_CHECKED_OUT = Gauge(
+    "bot_db_pool_checked_out", "Соединения, выданные из пула", ["target"]
+)
+DB_POOL_OVERFLOW = Gauge(
+    "bot_db_pool_overflow", "Соединения сверх pool_size", ["target"]
+)
+PIPELINE_IN_FLIGHT = Gauge("bot_pipeline_in_flight", "Запросы в обработке")
+PIPELINE_PENDING = Gauge("bot_pipeline_pending", "Запросы в очереди и в обработке")
+
+
+def watch_pool(target: str, pool: Pool) -> None:
+    # Значения читаются только в момент scrape, горячий путь не трогаем.
+    if not isinstance(pool, QueuePool):
+        return
+
+    DB_POOL_SIZE.labels(target=target).set_function(pool.size)
+    DB_POOL_CHECKED_OUT.labels(target=target).set_function(pool.checkedout)
+    DB_POOL_OVERFLOW.labels(target=target).set_function(lambda: max(0, pool.overflow()))
+
+
+def build_metrics_app(registry: CollectorRegistry = REGISTRY) -> web.Application:
+    from aiohttp import web
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=generate_latest(registry),
+            headers={"Content-Type": CONTENT_TYPE_LATEST},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    from aiohttp import web
+
+    runner = web.AppRunner(build_metrics_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
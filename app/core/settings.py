@@ -1,4 +1,7 @@
-from pydantic import Field
+from functools import lru_cache
+from typing import Literal, Self
+
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,6 +23,21 @@ class Settings(BaseSettings):
         default="INFO",
         alias="LEVEL_LOGGING",
     )
+    log_format: Literal["json", "text"] = Field(default="json", alias="LOG_FORMAT")
+    log_queue_size: int = Field(default=10_000, alias="LOG_QUEUE_SIZE")
+    log_sampling: str = Field(default="", alias="LOG_SAMPLING")
+
+    bot_mode: Literal["polling", "webhook"] = Field(default="polling", alias="BOT_MODE")
+    webhook_base_url: str = Field(default="", alias="WEBHOOK_BASE_URL")
+    webhook_path: str = Field(default="/webhook", alias="WEBHOOK_PATH")
+    webhook_host: str = Field(default="0.0.0.0", alias="WEBHOOK_HOST")
+    webhook_port: int = Field(default=8080, alias="WEBHOOK_PORT")
+    webhook_secret: str = Field(default="", alias="WEBHOOK_SECRET")
+    metrics_host: str = Field(default="127.0.0.1", alias="METRICS_HOST")
+    metrics_port: int = Field(default=0, alias="METRICS_PORT")
+    trace_sample_rate: float = Field(default=0.0, alias="TRACE_SAMPLE_RATE")
+    trace_file: str = Field(default="traces.jsonl", alias="TRACE_FILE")
+    trace_otlp_endpoint: str = Field(default="", alias="TRACE_OTLP_ENDPOINT")
 
     database_url: str = Field(
         default="",
@@ -30,8 +48,88 @@ class Settings(BaseSettings):
     yandex_api_key: str = Field(default="", alias="YANDEX_API_KEY")
     yandex_folder_id: str = Field(default="", alias="YANDEX_FOLDER_ID")
     llm_timeout_seconds: float = Field(default=30.0, alias="LLM_TIMEOUT_SECONDS")
+    llm_pool_limit: int = Field(default=100, alias="LLM_POOL_LIMIT")
+    llm_pool_limit_per_host: int = Field(default=10, alias="LLM_POOL_LIMIT_PER_HOST")
+    llm_keepalive_seconds: float = Field(default=30.0, alias="LLM_KEEPALIVE_SECONDS")
+    llm_dns_cache_seconds: int = Field(default=300, alias="LLM_DNS_CACHE_SECONDS")
+    llm_max_tokens: int = Field(default=256, alias="LLM_MAX_TOKENS")
+    llm_stream: bool = Field(default=True, alias="LLM_STREAM")
+    llm_retries: int = Field(default=2, alias="LLM_RETRIES")
+    llm_backoff_base_seconds: float = Field(
+        default=0.2, alias="LLM_BACKOFF_BASE_SECONDS"
+    )
+    llm_backoff_max_seconds: float = Field(default=2.0, alias="LLM_BACKOFF_MAX_SECONDS")
+    llm_hedge: bool = Field(default=True, alias="LLM_HEDGE")
+    llm_hedge_quantile: float = Field(default=95.0, alias="LLM_HEDGE_QUANTILE")
+    llm_hedge_min_delay_seconds: float = Field(
+        default=0.5, alias="LLM_HEDGE_MIN_DELAY_SECONDS"
+    )
+    llm_deadline_seconds: float = Field(default=45.0, alias="LLM_DEADLINE_SECONDS")
+    llm_breaker_failures: int = Field(default=5, alias="LLM_BREAKER_FAILURES")
+    llm_breaker_reset_seconds: float = Field(
+        default=30.0, alias="LLM_BREAKER_RESET_SECONDS"
+    )
+    llm_backends: str = Field(default="yandex", alias="LLM_BACKENDS")
+    llm_templates: bool = Field(default=True, alias="LLM_TEMPLATES")
+    llm_local_url: str = Field(default="", alias="LLM_LOCAL_URL")
+    llm_local_model: str = Field(default="", alias="LLM_LOCAL_MODEL")
+    llm_local_api_key: str = Field(default="", alias="LLM_LOCAL_API_KEY")
+    question_cache_size: int = Field(default=1024, alias="QUESTION_CACHE_SIZE")
+    question_cache_ttl_seconds: float = Field(
+        default=3600.0, alias="QUESTION_CACHE_TTL_SECONDS"
+    )
     db_timeout_seconds: float = Field(default=15.0, alias="DB_TIMEOUT_SECONDS")
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout_seconds: float = Field(
+        default=30.0, alias="DB_POOL_TIMEOUT_SECONDS"
+    )
+    db_pool_recycle_seconds: float = Field(
+        default=1800.0, alias="DB_POOL_RECYCLE_SECONDS"
+    )
+    db_pool_pre_ping: bool = Field(default=False, alias="DB_POOL_PRE_PING")
+    db_prepare_threshold: int = Field(default=5, alias="DB_PREPARE_THRESHOLD")
+    db_prepared_max: int = Field(default=100, alias="DB_PREPARED_MAX")
+    sql_parameterize: bool = Field(default=True, alias="SQL_PARAMETERIZE")
+    db_replica_urls: str = Field(default="", alias="DB_REPLICA_URLS")
+    db_replica_failure_threshold: int = Field(
+        default=3, alias="DB_REPLICA_FAILURE_THRESHOLD"
+    )
+    db_replica_cooldown_seconds: float = Field(
+        default=30.0, alias="DB_REPLICA_COOLDOWN_SECONDS"
+    )
+    pipeline_max_in_flight: int = Field(default=16, alias="PIPELINE_MAX_IN_FLIGHT")
+    pipeline_max_pending: int = Field(default=500, alias="PIPELINE_MAX_PENDING")
+    pipeline_max_pending_per_chat: int = Field(
+        default=3, alias="PIPELINE_MAX_PENDING_PER_CHAT"
+    )
+    result_cache_max_bytes: int = Field(
+        default=1_048_576, alias="RESULT_CACHE_MAX_BYTES"
+    )
+    result_cache_ttl_seconds: float = Field(
+        default=600.0, alias="RESULT_CACHE_TTL_SECONDS"
+    )
+    result_cache_redis_url: str = Field(default="", alias="RESULT_CACHE_REDIS_URL")
+    data_version_refresh_seconds: float = Field(
+        default=5.0, alias="DATA_VERSION_REFRESH_SECONDS"
+    )
+    sql_max_total_cost: float = Field(default=5_000_000.0, alias="SQL_MAX_TOTAL_COST")
+    sql_max_plan_rows: float = Field(default=50_000_000.0, alias="SQL_MAX_PLAN_ROWS")
+    sql_explain_cache_size: int = Field(default=1024, alias="SQL_EXPLAIN_CACHE_SIZE")
+    sql_slow_query_ms: float = Field(default=1000.0, alias="SQL_SLOW_QUERY_MS")
+    sql_stats_max_queries: int = Field(default=1000, alias="SQL_STATS_MAX_QUERIES")
+    admin_chat_ids: str = Field(default="", alias="ADMIN_CHAT_IDS")
+
+    @model_validator(mode="after")
+    def _require_webhook_secret(self) -> Self:
+        # Без секрета любой, кто знает адрес, может слать боту поддельные апдейты.
+        if self.bot_mode == "webhook" and not self.webhook_secret:
+            raise ValueError("WEBHOOK_SECRET обязателен при BOT_MODE=webhook")
+        return self
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    # Один экземпляр на процесс: .env читается один раз.
+    # В тестах после смены окружения — get_settings.cache_clear().
     return Settings()
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Protocol, TextIO
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    start_ns: int
+    attributes: dict[str, Any]
+    end_ns: int = 0
+    error: str | None = None
+    # Общий список спанов трассы: дочерние спаны дописываются в него.
+    trace: list[Span] = field(default_factory=list, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class FileSpanExporter:
+    """Одна трасса — строки JSONL со всеми её спанами.
+
+    Запись в файл — в отдельном потоке, как у логов: event loop только кладёт
+    трассу в ограниченную очередь, а при переполнении трасса отбрасывается.
+    """
+
+    def __init__(self, path: str | Path, queue_size: int = 1000) -> None:
+        self._path = Path(path)
+        self._queue: queue.Queue[list[Span] | None] = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._write_loop, name="trace-file-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, spans: list[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        # Файл открывает и закрывает сам поток записи — при любом выходе из него.
+        try:
+            with self._path.open("a", encoding="utf-8") as file:
+                self._drain(file)
+        except OSError as exc:
+            logger.warning("trace_export_failed error=%s", exc)
+            # Файл не открылся: трассы выбрасываем, но очередь разбираем,
+            # иначе close() повиснет на полной очереди.
+            self._drain(None)
+
+    def _drain(self, file: TextIO | None) -> None:
+        while True:
+            # Всё, что накопилось в очереди, — одной записью и одним flush.
+            batch = [self._queue.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if file is not None:
+                lines = "".join(
+                    json.dumps(span.to_dict()) + "\n"
+                    for spans in batch
+                    if spans is not None
+                    for span in spans
+                )
+                try:
+                    file.write(lines)
+                    file.flush()
+                except OSError as exc:
+                    logger.warning("trace_export_failed error=%s", exc)
+
+            if batch[-1] is None:
+                return
+
+    async def close(self) -> None:
+        # Ждём, пока поток допишет очередь; put блокирует, если она полна.
+        await asyncio.to_thread(self._queue.put, None)
+        await asyncio.to_thread(self._thread.join)
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    result: list[dict[str, Any]] = []
+    for key, value in attributes.items():
+        typed: dict[str, Any]
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
+
+
+def otlp_payload(spans: list[Span], service_name: str) -> dict[str, Any]:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes({"service.name": service_name})
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app"},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": 1,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": _otlp_attributes(span.attributes),
+                                "status": (
+                                    {"code": 2, "message": span.error}
+                                    if span.error
+                                    else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OtlpHttpExporter:
+    """OTLP/HTTP JSON (`POST {endpoint}/v1/traces`), отправка в фоне."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = "data-assistant-bot",
+        timeout_seconds: float = 5.0,
+    ) -> None:
+        self._url = endpoint.rstrip("/") + "/v1/traces"
+        self._service_name = service_name
+        self._timeout_seconds = timeout_seconds
+        self._session: aiohttp.ClientSession | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        # aiohttp нужен только при OTLP-экспорте; загрузчику данных он не нужен.
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self._timeout_seconds)
+            )
+        try:
+            async with self._session.post(self._url, json=payload) as response:
+                if response.status >= 300:
+                    logger.warning("trace_export_failed status=%d", response.status)
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            logger.warning("trace_export_failed error=%s", exc)
+
+    def export(self, spans: list[Span]) -> None:
+        # Ответ пользователю не ждёт коллектор.
+        task = asyncio.get_running_loop().create_task(
+            self._send(otlp_payload(spans, self._service_name))
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+
+@dataclass
+class _Tracer:
+    sample_rate: float = 0.0
+    exporter: SpanExporter | None = None
+
+
+_tracer = _Tracer()
+
+
+def configure_tracing(sample_rate: float, exporter: SpanExporter | None) -> None:
+    _tracer.sample_rate = sample_rate if exporter is not None else 0.0
+    _tracer.exporter = exporter
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+def set_attribute(key: str, value: Any) -> None:
+    span = _current_span.get()
+    if span is not None:
+        span.attributes[key] = value
+
+
+class _SpanScope:
+    __slots__ = ("_root", "_span", "_token")
+
+    def __init__(self, span: Span, root: bool) -> None:
+        self._span = span
+        self._root = root
+        self._token: Token[Span | None] | None = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        span = self._span
+        span.end_ns = time.time_ns()
+        if exc_type is not None:
+            span.error = exc_type.__name__
+        assert self._token is not None
+        _current_span.reset(self._token)
+
+        span.trace.append(span)
+        if self._root and _tracer.exporter is not None:
+            try:
+                _tracer.exporter.export(span.trace)
+            except Exception:
+                logger.exception("trace_export_failed")
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NOOP = _NoopScope()
+
+
+class _TraceScope:
+    __slots__ = ("_attributes", "_name", "_scope", "_token")
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        self._name = name
+        self._attributes = attributes
+        self._token: Token[str] | None = None
+        self._scope: _SpanScope | None = None
+
+    def __enter__(self) -> Span | None:
+        trace_id = f"{random.getrandbits(128):032x}"
+        self._token = _request_id.set(trace_id[:16])
+
+        if _tracer.sample_rate <= 0 or random.random() >= _tracer.sample_rate:
+            return None
+
+        span = Span(
+            trace_id=trace_id,
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=None,
+            name=self._name,
+            start_ns=time.time_ns(),
+            attributes=self._attributes,
+        )
+        self._scope = _SpanScope(span, root=True)
+        return self._scope.__enter__()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self._scope is not None:
+            self._scope.__exit__(exc_type, exc, traceback)
+        assert self._token is not None
+        _request_id.reset(self._token)
+
+
+def start_trace(name: str, **attributes: Any) -> _TraceScope:
+    # request_id ставится всегда (для логов), спаны — только в сэмпле.
+    return _TraceScope(name, attributes)
+
+
+def span(name: str, **attributes: Any) -> _SpanScope | _NoopScope:
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+
+    return _SpanScope(
+        Span(
+            trace_id=parent.trace_id,
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=parent.span_id,
+            name=name,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            trace=parent.trace,
+        ),
+        root=False,
+    )
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+_SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+
+
+class ResultCacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class RedisResultBackend:
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> RedisResultBackend:
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "RESULT_CACHE_REDIS_URL задан, но пакет redis не установлен"
+            ) from exc
+
+        return cls(redis_asyncio.from_url(url))
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self._client.get(key)
+        return value if isinstance(value, bytes) else None
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._client.set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def canonicalize_sql(sql: str) -> str:
+    tokens: list[str] = []
+    for token in _SQL_TOKENS.findall(sql.strip()):
+        if token.isspace():
+            tokens.append(" ")
+        elif token[0] in "'\"":
+            tokens.append(token)
+        else:
+            tokens.append(token.lower())
+
+    return "".join(tokens)
+
+
+async def read_data_version(session: AsyncSession) -> int:
+    version = await session.scalar(
+        text("SELECT version FROM data_version WHERE id = 1")
+    )
+    return int(version or 0)
+
+
+async def fetch_data_version(session_maker: async_sessionmaker[AsyncSession]) -> int:
+    async with session_maker() as session:
+        return await read_data_version(session)
+
+
+async def bump_data_version(session: AsyncSession) -> int:
+    version = await session.scalar(
+        text(
+            "INSERT INTO data_version (id, version, updated_at) "
+            "VALUES (1, 1, now()) "
+            "ON CONFLICT (id) DO UPDATE "
+            "SET version = data_version.version + 1, updated_at = now() "
+            "RETURNING version"
+        )
+    )
+    return int(version)
+
+
+class ResultCache:
+    def __init__(
+        self,
+        load_version: Callable[[], Awaitable[int]],
+        max_bytes: int = 1_048_576,
+        ttl_seconds: float = 600.0,
+        version_refresh_seconds: float = 5.0,
+        backend: ResultCacheBackend | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._load_version = load_version
+        self._max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+        self._version_refresh_seconds = version_refresh_seconds
+        self._backend = backend
+        self._clock = clock
+
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._bytes_held = 0
+        self._version: int | None = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def bytes_held(self) -> int:
+        return self._bytes_held
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def _current_version(self) -> int:
+        now = self._clock()
+        if (
+            self._version is None
+            or now - self._version_checked_at >= self._version_refresh_seconds
+        ):
+            version = await self._load_version()
+            if version != self._version:
+                self._clear_local()
+            self._version = version
+            self._version_checked_at = now
+
+        return self._version
+
+    async def make_key(self, sql: str) -> str | None:
+        # Без версии данных кэш небезопасен: запрос идёт мимо него, а не падает.
+        try:
+            version = await self._current_version()
+        except Exception:
+            logger.warning("result_cache_version_failed", exc_info=True)
+            return None
+        return self.key_for(sql, version)
+
+    def key_for(self, sql: str, version: int) -> str:
+        digest = hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+        return f"sql-result:v{version}:{digest}"
+
+    async def get(self, key: str) -> int | float | None:
+        payload = self._get_local(key)
+
+        if payload is None and self._backend is not None:
+            try:
+                payload = await self._backend.get(key)
+            except Exception:
+                logger.warning("result_cache_backend_get_failed", exc_info=True)
+                payload = None
+            if payload is not None:
+                self._set_local(key, payload)
+
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        value: int | float = json.loads(payload)
+        return value
+
+    async def set(self, key: str, value: float) -> None:
+        payload = json.dumps(value).encode("utf-8")
+        self._set_local(key, payload)
+
+        if self._backend is not None:
+            try:
+                await self._backend.set(key, payload, self._ttl_seconds)
+            except Exception:
+                logger.warning("result_cache_backend_set_failed", exc_info=True)
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+
+    def _get_local(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        payload, expires_at = entry
+        if expires_at <= self._clock():
+            self._pop_local(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return payload
+
+    def _set_local(self, key: str, payload: bytes) -> None:
+        size = _entry_size(key, payload)
+        if size > self._max_bytes:
+            return
+
+        self._pop_local(key)
+        self._entries[key] = (payload, self._clock() + self._ttl_seconds)
+        self._bytes_held += size
+
+        while self._bytes_held > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._pop_local(oldest)
+
+    def _pop_local(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes_held -= _entry_size(key, entry[0])
+
+    def _clear_local(self) -> None:
+        self._entries.clear()
+        self._bytes_held = 0
+
+
+def _entry_size(key: str, payload: bytes) -> int:
+    return len(key.encode("utf-8")) + len(payload)
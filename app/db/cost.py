@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.tracing import span
+from app.db.cache import canonicalize_sql
+from app.db.errors import SqlError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PlanEstimate:
+    total_cost: float
+    max_rows: float
+
+
+class SqlBudgetError(SqlError):
+    def __init__(self, message: str, estimate: PlanEstimate) -> None:
+        super().__init__(message)
+        self.estimate = estimate
+
+
+def _walk_plan(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk_plan(child)
+
+
+def parse_explain(payload: Any) -> PlanEstimate:
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+
+    plan = payload[0]["Plan"]
+    # Строки считаем по самому широкому узлу: итог агрегата всегда 1 строка,
+    # а декартово произведение видно только внутри плана.
+    return PlanEstimate(
+        total_cost=float(plan["Total Cost"]),
+        max_rows=max(float(node.get("Plan Rows", 0)) for node in _walk_plan(plan)),
+    )
+
+
+class CostGuard:
+    def __init__(
+        self,
+        max_total_cost: float = 5_000_000.0,
+        max_plan_rows: float = 50_000_000.0,
+        cache_size: int = 1024,
+        ttl_seconds: float = 600.0,
+        load_version: Callable[[], Awaitable[int]] | None = None,
+        version_refresh_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_total_cost = max_total_cost
+        self._max_plan_rows = max_plan_rows
+        self._cache_size = cache_size
+        self._ttl_seconds = ttl_seconds
+        self._load_version = load_version
+        self._version_refresh_seconds = version_refresh_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[PlanEstimate, float]] = OrderedDict()
+        self._version: int | None = None
+        self._version_checked_at = 0.0
+
+        self.explains = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.explain_ms_total = 0.0
+
+    async def _current_version(self) -> int:
+        assert self._load_version is not None
+        now = self._clock()
+        if (
+            self._version is None
+            or now - self._version_checked_at >= self._version_refresh_seconds
+        ):
+            version = await self._load_version()
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._version_checked_at = now
+
+        return self._version
+
+    async def _make_key(self, sql: str) -> str | None:
+        digest = hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+        if self._load_version is None:
+            return digest
+
+        # После загрузки данных статистика и планы другие: оценка под старой
+        # версией данных не переиспользуется, как и в ResultCache.
+        try:
+            version = await self._current_version()
+        except Exception:
+            logger.warning("explain_cache_version_failed", exc_info=True)
+            return None
+        return f"v{version}:{digest}"
+
+    def _cached(self, key: str) -> PlanEstimate | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        estimate, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return estimate
+
+    def _store(self, key: str, estimate: PlanEstimate) -> None:
+        if self._cache_size <= 0:
+            return
+
+        self._entries[key] = (estimate, self._clock() + self._ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._cache_size:
+            self._entries.popitem(last=False)
+
+    async def estimate(self, session: AsyncSession, sql: str) -> PlanEstimate:
+        key = await self._make_key(sql)
+        if key is not None:
+            estimate = self._cached(key)
+            if estimate is not None:
+                self.cache_hits += 1
+                return estimate
+
+        started = time.perf_counter()
+        with span("sql.explain"):
+            result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        estimate = parse_explain(result.scalar_one())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.explains += 1
+        self.explain_ms_total += elapsed_ms
+        logger.info(
+            "sql_explain_time_ms=%.2f total_cost=%.0f max_rows=%.0f",
+            elapsed_ms,
+            estimate.total_cost,
+            estimate.max_rows,
+        )
+
+        if key is not None:
+            self._store(key, estimate)
+        return estimate
+
+    async def check(self, session: AsyncSession, sql: str) -> PlanEstimate:
+        estimate = await self.estimate(session, sql)
+
+        if estimate.total_cost > self._max_total_cost:
+            self.rejected += 1
+            raise SqlBudgetError(
+                f"Оценка стоимости {estimate.total_cost:.0f} "
+                f"больше лимита {self._max_total_cost:.0f}",
+                estimate,
+            )
+
+        if estimate.max_rows > self._max_plan_rows:
+            self.rejected += 1
+            raise SqlBudgetError(
+                f"Оценка числа строк {estimate.max_rows:.0f} "
+                f"больше лимита {self._max_plan_rows:.0f}",
+                estimate,
+            )
+
+        return estimate
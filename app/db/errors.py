@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+
+class ModuleError(Exception):
+    pass
+
+
+class ScalarsError(ModuleError):
+    pass
+
+
+class SqlError(ModuleError):
+    pass
@@ -1,47 +1,33 @@
 from __future__ import annotations
 
 import logging
-import re
 import time
 from decimal import Decimal
 from typing import Any
 
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-logger = logging.getLogger(__name__)
-
-
-class ModuleError(Exception):
-    pass
-
-
-class ScalarsError(ModuleError):
-    pass
+from app.core.metrics import SQL_EXECUTION_LATENCY, SQL_VALIDATION_LATENCY
+from app.core.tracing import span
+from app.db.cache import ResultCache, read_data_version
+from app.db.cost import CostGuard
+from app.db.errors import ModuleError, ScalarsError, SqlError
+from app.db.parameterize import parameterize_sql
+from app.db.rewrite import rewrite_date_predicates
+from app.db.routing import SessionFactory
+from app.db.stats import QueryStats
+from app.db.validator import SqlAnalysis, analyze_sql
 
+__all__ = ["ModuleError", "ScalarsError", "SqlError", "execute_sql"]
 
-class SqlError(ModuleError):
-    pass
-
-
-_FORBIDDEN_TOKENS = re.compile(
-    r"\b("
-    r"insert|update|delete|drop|alter|truncate|create|grant|revoke|"
-    r"copy|call|do|execute|set|show|listen|notify|vacuum|analyze"
-    r")\b",
-    re.IGNORECASE,
-)
+logger = logging.getLogger(__name__)
 
 
-def _validation_sql(sql: str) -> None:
+def _validation_sql(sql: str) -> SqlAnalysis:
     if not sql.strip():
         raise SqlError("sql пустой")
 
-    if ";" in sql:
-        raise SqlError("Запрещены ';' (только один SQL-оператор)")
-
-    if _FORBIDDEN_TOKENS.search(sql):
-        raise SqlError("Запрещены DDL/DML/utility команды в SQL")
+    return analyze_sql(sql)
 
 
 def _validation_result(value: Any) -> int | float:
@@ -60,30 +46,99 @@ def _validation_result(value: Any) -> int | float:
 async def execute_sql(
     sql: str,
     *,
-    session_maker: async_sessionmaker[AsyncSession] | None = None,
+    session_maker: SessionFactory | None = None,
+    result_cache: ResultCache | None = None,
+    cost_guard: CostGuard | None = None,
+    parameterize: bool = False,
+    query_stats: QueryStats | None = None,
 ) -> int | float:
-    _validation_sql(sql)
-    logger.info("generated_sql=%s", sql)
+    validation_started = time.perf_counter()
+    with span("sql.validate"):
+        _validation_sql(sql)
+        logger.info("generated_sql=%s", sql)
+
+        rewritten = rewrite_date_predicates(sql)
+    SQL_VALIDATION_LATENCY.observe(time.perf_counter() - validation_started)
+    if rewritten != sql:
+        logger.info("rewritten_sql=%s", rewritten)
+        sql = rewritten
+
+    cache_key: str | None = None
+    if result_cache is not None:
+        cache_key = await result_cache.make_key(sql)
+        if cache_key is not None:
+            with span("sql.result_cache"):
+                cached = await result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("sql_result_cache_hit")
+                return cached
 
     if session_maker is None:
-        from app.db.session import get_session_factory
+        from app.db.session import get_read_session_factory
 
-        session_maker = get_session_factory()
+        session_maker = get_read_session_factory()
 
     started = time.perf_counter()
     try:
         async with session_maker() as session:
-            result = await session.execute(text(sql))
-
-            keys = list(result.keys())
-            if len(keys) != 1:
-                raise ScalarsError(f"Ожидалась 1 колонка, а получили {len(keys)}")
+            data_version: int | None = None
+            if cache_key is not None:
+                # Версия читается с той же реплики, что и данные, и до запроса:
+                # запрос видит данные не старше этой версии.
+                data_version = await read_data_version(session)
+
+            rows_estimate: float | None = None
+            if cost_guard is not None:
+                rows_estimate = (await cost_guard.check(session, sql)).max_rows
+
+            query_started = time.perf_counter()
+            failed = True
+            try:
+                if parameterize:
+                    # Одинаковый шаблон -> одинаковый текст запроса, и psycopg
+                    # переиспользует подготовленный на соединении statement.
+                    prepared = parameterize_sql(sql)
+                    logger.info("sql_template=%s", prepared.fingerprint)
+                    with span("sql.execute", template=prepared.fingerprint):
+                        result = await session.execute(
+                            text(prepared.template), prepared.params
+                        )
+                else:
+                    with span("sql.execute"):
+                        result = await session.execute(text(sql))
+
+                keys = list(result.keys())
+                if len(keys) != 1:
+                    raise ScalarsError(f"Ожидалась 1 колонка, а получили {len(keys)}")
+
+                rows = result.fetchmany(2)
+                failed = False
+            finally:
+                # И упавшие запросы: statement_timeout — самый медленный случай.
+                if query_stats is not None:
+                    query_stats.record(
+                        sql,
+                        (time.perf_counter() - query_started) * 1000,
+                        rows_estimate=rows_estimate,
+                        error=failed,
+                        session_maker=session_maker,
+                    )
 
-            rows = result.fetchmany(2)
             if len(rows) != 1:
                 raise ScalarsError(f"Ожидалась 1 строка, а получили {len(rows)}")
 
-            return _validation_result(rows[0][0])
+            value = _validation_result(rows[0][0])
     finally:
-        elapsed_ms = (time.perf_counter() - started) * 1000
-        logger.info("sql_execution_time_ms=%.2f", elapsed_ms)
+        elapsed = time.perf_counter() - started
+        SQL_EXECUTION_LATENCY.observe(elapsed)
+        logger.info("sql_execution_time_ms=%.2f", elapsed * 1000)
+
+    if result_cache is not None and cache_key is not None:
+        assert data_version is not None
+        if result_cache.key_for(sql, data_version) == cache_key:
+            await result_cache.set(cache_key, value)
+        else:
+            # Реплика отстаёт от primary: её результат не кладём под новую версию.
+            logger.info("sql_result_cache_skip data_version=%s", data_version)
+
+    return value
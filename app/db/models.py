@@ -1,8 +1,18 @@
 import uuid
-from datetime import datetime
-
-
-from sqlalchemy import DateTime, ForeignKey, Index, Integer, Text
+from datetime import date, datetime
+
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    cast,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -38,6 +48,10 @@ class Video(Base):
 Index("ix_videos_creator_id", Video.creator_id)
 Index("ix_videos_video_created_at", Video.video_created_at)
 Index("ix_videos_views_count", Video.views_count)
+Index(
+    "ix_videos_video_created_at_utc_date",
+    cast(func.timezone("UTC", Video.video_created_at), Date),
+)
 
 
 class VideoSnapshot(Base):
@@ -70,3 +84,60 @@ class VideoSnapshot(Base):
 
 Index("ix_video_snapshots_video_id", VideoSnapshot.video_id)
 Index("ix_video_snapshots_created_at", VideoSnapshot.created_at)
+Index(
+    "ix_video_snapshots_created_at_utc_date",
+    cast(func.timezone("UTC", VideoSnapshot.created_at), Date),
+)
+
+
+class VideoDailyStats(Base):
+    __tablename__ = "video_daily_stats"
+
+    video_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("videos.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    delta_views_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_likes_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_comments_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_reports_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+Index("ix_video_daily_stats_day", VideoDailyStats.day)
+
+
+class DailyStats(Base):
+    __tablename__ = "daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    delta_views_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_likes_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_comments_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delta_reports_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class VideoSnapshotWatermark(Base):
+    __tablename__ = "video_snapshot_watermarks"
+
+    video_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("videos.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    last_created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.dialects.postgres import Postgres
+
+# Литерал становится параметром только в этих позициях. В GROUP BY 1,
+# AT TIME ZONE 'UTC', интервалах и форматах он меняет смысл запроса
+# или ломает совпадение с индексами-выражениями.
+_BINDABLE_PARENTS: tuple[type[exp.Expression], ...] = (
+    exp.EQ,
+    exp.NEQ,
+    exp.GT,
+    exp.GTE,
+    exp.LT,
+    exp.LTE,
+    exp.Between,
+    exp.In,
+    exp.Cast,
+    exp.Like,
+    exp.ILike,
+)
+
+
+class _BindDialect(Postgres):
+    class Generator(Postgres.Generator):  # type: ignore[misc, valid-type]
+        def placeholder_sql(self, expression: exp.Placeholder) -> str:
+            return f":{expression.name}"
+
+        def literal_sql(self, expression: exp.Literal) -> str:
+            # ':' внутри оставшихся строк text() принял бы за bind-параметр.
+            sql = super().literal_sql(expression)
+            return sql.replace(":", "\\:") if expression.is_string else sql
+
+
+@dataclass(frozen=True)
+class ParameterizedSql:
+    template: str
+    params: dict[str, Any]
+    fingerprint: str
+
+
+def _literal_value(literal: exp.Literal) -> Any:
+    if literal.is_string:
+        return literal.this
+    if literal.this.isdigit():
+        return int(literal.this)
+    return Decimal(literal.this)
+
+
+@lru_cache(maxsize=1024)
+def parameterize_sql(sql: str) -> ParameterizedSql:
+    statement = sqlglot.parse_one(sql, read="postgres")
+    params: dict[str, Any] = {}
+
+    literals = [
+        literal
+        for literal in statement.find_all(exp.Literal)
+        if isinstance(literal.parent, _BINDABLE_PARENTS)
+    ]
+    for literal in literals:
+        name = f"p{len(params) + 1}"
+        params[name] = _literal_value(literal)
+        literal.replace(exp.Placeholder(this=name))
+
+    template = statement.sql(dialect=_BindDialect)
+    fingerprint = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+    return ParameterizedSql(template=template, params=params, fingerprint=fingerprint)
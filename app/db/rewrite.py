@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import re
+from datetime import date, timedelta
+
+from sqlalchemy import DateTime
+
+from app.db.models import Base
+
+# Сессии работают в UTC (см. build_engine), поэтому col::date совпадает
+# с (col AT TIME ZONE 'UTC')::date, по которому построены индексы-выражения.
+SESSION_TIME_ZONE = "UTC"
+
+_TIMESTAMPTZ_COLUMNS = sorted(
+    {
+        column.name
+        for table in Base.metadata.tables.values()
+        for column in table.columns
+        if isinstance(column.type, DateTime) and column.type.timezone
+    }
+)
+_COLUMN = rf"(?<![\w.])(?:\w+\.)?(?:{'|'.join(_TIMESTAMPTZ_COLUMNS)})\b"
+
+_DATE_FUNCTION = re.compile(rf"\bdate\s*\(\s*({_COLUMN})\s*\)", re.IGNORECASE)
+_DATE_CAST = re.compile(rf"\bcast\s*\(\s*({_COLUMN})\s+as\s+date\s*\)", re.IGNORECASE)
+
+_LHS = rf"(?P<column>{_COLUMN})\s*::\s*date\b"
+_LITERAL = r"(?:date\s+)?'(?P<{name}>\d{{4}}-\d{{2}}-\d{{2}})'(?:\s*::\s*date\b)?"
+# Литерал, за которым идёт арифметика, переписывать нельзя: 'D'::date + 1.
+_END = r"(?!\s*(?:[-+*/|]|::))"
+
+_COMPARISON = re.compile(
+    rf"{_LHS}\s*(?P<op>>=|<=|=|>|<)\s*{_LITERAL.format(name='day')}{_END}",
+    re.IGNORECASE,
+)
+_BETWEEN = re.compile(
+    rf"{_LHS}\s+between\s+{_LITERAL.format(name='first')}"
+    rf"\s+and\s+{_LITERAL.format(name='last')}{_END}",
+    re.IGNORECASE,
+)
+_REMAINING_CAST = re.compile(rf"({_COLUMN})\s*::\s*date\b", re.IGNORECASE)
+
+
+def _parse_day(value: str) -> date | None:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _bound(day: date) -> str:
+    return f"'{day.isoformat()}'::timestamptz"
+
+
+def _rewrite_comparison(match: re.Match[str]) -> str:
+    day = _parse_day(match.group("day"))
+    if day is None:
+        return match.group(0)
+
+    column = match.group("column")
+    next_day = day + timedelta(days=1)
+    op = match.group("op")
+
+    if op == "=":
+        return f"({column} >= {_bound(day)} AND {column} < {_bound(next_day)})"
+    if op == ">=":
+        return f"{column} >= {_bound(day)}"
+    if op == ">":
+        return f"{column} >= {_bound(next_day)}"
+    if op == "<=":
+        return f"{column} < {_bound(next_day)}"
+    return f"{column} < {_bound(day)}"
+
+
+def _rewrite_between(match: re.Match[str]) -> str:
+    first = _parse_day(match.group("first"))
+    last = _parse_day(match.group("last"))
+    if first is None or last is None:
+        return match.group(0)
+
+    column = match.group("column")
+    next_day = last + timedelta(days=1)
+    return f"({column} >= {_bound(first)} AND {column} < {_bound(next_day)})"
+
+
+def rewrite_date_predicates(sql: str) -> str:
+    sql = _DATE_FUNCTION.sub(r"\1::date", sql)
+    sql = _DATE_CAST.sub(r"\1::date", sql)
+
+    # Сравнения с датой превращаются в полуоткрытые диапазоны по timestamptz
+    # и используют обычные B-tree индексы по колонке.
+    sql = _BETWEEN.sub(_rewrite_between, sql)
+    sql = _COMPARISON.sub(_rewrite_comparison, sql)
+
+    # Остальные приведения (IN, GROUP BY, ...) ведём на индексы-выражения.
+    return _REMAINING_CAST.sub(rf"(\1 AT TIME ZONE '{SESSION_TIME_ZONE}')::date", sql)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# День rollup — календарный день UTC, явно: не зависит от TimeZone сессии,
+# в которой идёт пересчёт или миграция.
+_DELETE_VIDEO_DAYS = text(
+    "DELETE FROM video_daily_stats WHERE day BETWEEN :first_day AND :last_day"
+)
+
+_INSERT_VIDEO_DAYS = text(
+    """
+    INSERT INTO video_daily_stats (
+        video_id, day, delta_views_count, delta_likes_count,
+        delta_comments_count, delta_reports_count
+    )
+    SELECT video_id, (created_at AT TIME ZONE 'UTC')::date,
+           sum(delta_views_count), sum(delta_likes_count),
+           sum(delta_comments_count), sum(delta_reports_count)
+    FROM video_snapshots
+    WHERE created_at >= CAST(:first_day AS timestamp) AT TIME ZONE 'UTC'
+      AND created_at < (CAST(:last_day AS timestamp) + interval '1 day')
+                       AT TIME ZONE 'UTC'
+    GROUP BY video_id, (created_at AT TIME ZONE 'UTC')::date
+    """
+)
+
+_DELETE_DAYS = text(
+    "DELETE FROM daily_stats WHERE day BETWEEN :first_day AND :last_day"
+)
+
+_INSERT_DAYS = text(
+    """
+    INSERT INTO daily_stats (
+        day, delta_views_count, delta_likes_count,
+        delta_comments_count, delta_reports_count
+    )
+    SELECT day, sum(delta_views_count), sum(delta_likes_count),
+           sum(delta_comments_count), sum(delta_reports_count)
+    FROM video_daily_stats
+    WHERE day BETWEEN :first_day AND :last_day
+    GROUP BY day
+    """
+)
+
+
+async def refresh_daily_rollups(
+    session: AsyncSession, first_day: date, last_day: date
+) -> None:
+    params = {"first_day": first_day, "last_day": last_day}
+
+    await session.execute(_DELETE_VIDEO_DAYS, params)
+    await session.execute(_INSERT_VIDEO_DAYS, params)
+    await session.execute(_DELETE_DAYS, params)
+    await session.execute(_INSERT_DAYS, params)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.pool import Pool
+
+from app.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AbstractAsyncContextManager[AsyncSession]]
+
+_QUERY_CANCELED = "57014"
+
+
+def _is_connection_error(exc: BaseException) -> bool:
+    # statement_timeout — проблема запроса, а не реплики.
+    if isinstance(exc, (PoolTimeoutError, OSError)):
+        return True
+    if not isinstance(exc, DBAPIError):
+        return False
+    if exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError)) and (
+        getattr(exc.orig, "sqlstate", None) != _QUERY_CANCELED
+    )
+
+
+@dataclass
+class PoolWaitStats:
+    window: int = 1024
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    recent: deque[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.recent = deque(maxlen=self.window)
+
+    def record(self, wait_ms: float) -> None:
+        self.count += 1
+        self.total_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+        self.recent.append(wait_ms)
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+@dataclass
+class _Target:
+    name: str
+    session_maker: async_sessionmaker[AsyncSession]
+    failures: int = 0
+    down_until: float = 0.0
+    waits: PoolWaitStats = field(default_factory=PoolWaitStats)
+
+
+class ReadSessionRouter:
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replicas: Sequence[tuple[str, async_sessionmaker[AsyncSession]]] = (),
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._primary = _Target("primary", primary)
+        self._replicas = [_Target(name, maker) for name, maker in replicas]
+        self._failure_threshold = failure_threshold
+        self._cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._next = 0
+
+    def __call__(self) -> AbstractAsyncContextManager[AsyncSession]:
+        return self._session()
+
+    def _candidates(self) -> list[_Target]:
+        now = self._clock()
+        healthy = [target for target in self._replicas if target.down_until <= now]
+        if not healthy:
+            return [self._primary]
+
+        replica = healthy[self._next % len(healthy)]
+        self._next += 1
+        return [replica, self._primary]
+
+    def _mark_failure(self, target: _Target, exc: BaseException) -> None:
+        if target is self._primary:
+            return
+
+        target.failures += 1
+        if target.failures >= self._failure_threshold:
+            target.down_until = self._clock() + self._cooldown_seconds
+            target.failures = 0
+            logger.warning("db_replica_down replica=%s error=%s", target.name, exc)
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        candidates = self._candidates()
+        for target in candidates:
+            session = target.session_maker()
+            started = time.perf_counter()
+            try:
+                with span("db.pool_checkout", target=target.name):
+                    await session.connection()
+            except Exception as exc:
+                await session.close()
+                if target is candidates[-1] or not _is_connection_error(exc):
+                    raise
+                self._mark_failure(target, exc)
+                continue
+
+            wait_ms = (time.perf_counter() - started) * 1000
+            target.waits.record(wait_ms)
+            logger.info("db_pool_wait_ms=%.2f target=%s", wait_ms, target.name)
+
+            try:
+                yield session
+            except Exception as exc:
+                if _is_connection_error(exc):
+                    self._mark_failure(target, exc)
+                raise
+            else:
+                target.failures = 0
+            finally:
+                await session.close()
+            return
+
+    def pools(self) -> list[tuple[str, Pool]]:
+        result: list[tuple[str, Pool]] = []
+        for target in (self._primary, *self._replicas):
+            engine = target.session_maker.kw.get("bind")
+            pool = getattr(engine, "pool", None)
+            if pool is not None:
+                result.append((target.name, pool))
+        return result
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        now = self._clock()
+        result: dict[str, dict[str, Any]] = {}
+        for target in (self._primary, *self._replicas):
+            engine = target.session_maker.kw.get("bind")
+            pool = getattr(engine, "pool", None)
+            result[target.name] = {
+                "healthy": target.down_until <= now,
+                "checkouts": target.waits.count,
+                "wait_ms_p50": target.waits.percentile(50),
+                "wait_ms_p99": target.waits.percentile(99),
+                "wait_ms_max": target.waits.max_ms,
+                "pool": pool.status() if pool is not None else None,
+            }
+        return result
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from typing import Any
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -7,27 +10,101 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
+from app.db.rewrite import SESSION_TIME_ZONE
+from app.db.routing import ReadSessionRouter
+
 _session_factory: async_sessionmaker[AsyncSession] | None = None
+_read_session_factory: ReadSessionRouter | None = None
 
 
-def build_engine(database_url: str, db_timeout_seconds: float = 15.0) -> AsyncEngine:
+def build_engine(
+    database_url: str,
+    db_timeout_seconds: float = 15.0,
+    *,
+    pool_size: int = 10,
+    max_overflow: int = 10,
+    pool_timeout_seconds: float = 30.0,
+    pool_recycle_seconds: float = 1800.0,
+    pool_pre_ping: bool = False,
+    prepare_threshold: int = 5,
+    prepared_max: int = 100,
+) -> AsyncEngine:
     timeout_ms = int(db_timeout_seconds * 1000)
-    options = f"-c statement_timeout={timeout_ms}"
+    # TimeZone фиксирован: ::date в SQL от LLM должен считаться по тем же суткам
+    # UTC, что rollup-таблицы и индексы-выражения, а не по timezone сервера.
+    options = f"-c statement_timeout={timeout_ms} -c TimeZone={SESSION_TIME_ZONE}"
 
-    return create_async_engine(
+    # Без pre-ping мёртвые соединения отсеивает pool_recycle, а обрыв во время
+    # запроса SQLAlchemy распознаёт сам и инвалидирует пул.
+    engine = create_async_engine(
         database_url,
-        pool_pre_ping=True,
-        connect_args={"options": options},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout_seconds,
+        pool_recycle=pool_recycle_seconds,
+        pool_pre_ping=pool_pre_ping,
+        connect_args={
+            "options": options,
+            # psycopg сам готовит запрос после prepare_threshold выполнений
+            # и держит не больше prepared_max statement'ов на соединение (LRU).
+            "prepare_threshold": prepare_threshold if prepared_max > 0 else None,
+        },
     )
 
+    if prepared_max > 0:
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _set_prepared_max(dbapi_connection: Any, connection_record: Any) -> None:
+            dbapi_connection.driver_connection.prepared_max = prepared_max
+
+    return engine
+
+
+def _build_session_factory(database_url: str) -> async_sessionmaker[AsyncSession]:
+    from app.core.settings import get_settings
+
+    settings = get_settings()
+    engine = build_engine(
+        database_url,
+        settings.db_timeout_seconds,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout_seconds=settings.db_pool_timeout_seconds,
+        pool_recycle_seconds=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        prepare_threshold=settings.db_prepare_threshold,
+        prepared_max=settings.db_prepared_max,
+    )
+    return async_sessionmaker(bind=engine, expire_on_commit=False)
+
 
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
     global _session_factory
     if _session_factory is None:
         from app.core.settings import get_settings
 
-        settings = get_settings()
-        engine = build_engine(settings.database_url, settings.db_timeout_seconds)
-        _session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        _session_factory = _build_session_factory(get_settings().database_url)
 
     return _session_factory
+
+
+def get_read_session_factory() -> ReadSessionRouter:
+    global _read_session_factory
+    if _read_session_factory is None:
+        from app.core.settings import get_settings
+
+        settings = get_settings()
+        replica_urls = [
+            url.strip() for url in settings.db_replica_urls.split(",") if url.strip()
+        ]
+        _read_session_factory = ReadSessionRouter(
+            get_session_factory(),
+            [
+                (f"replica{index}", _build_session_factory(url))
+                for index, url in enumerate(replica_urls, start=1)
+            ],
+            failure_threshold=settings.db_replica_failure_threshold,
+            cooldown_seconds=settings.db_replica_cooldown_seconds,
+        )
+
+    return _read_session_factory
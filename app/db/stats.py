@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+import sqlglot
+from sqlalchemy import text
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from app.db.cache import canonicalize_sql
+from app.db.routing import SessionFactory
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> tuple[str, str]:
+    """Нормализованный текст без литералов и его короткий хэш."""
+    try:
+        statement = sqlglot.parse_one(sql, read="postgres")
+    except SqlglotError:
+        normalized = canonicalize_sql(sql)
+    else:
+        # В отличие от parameterize_sql убираем все литералы: даты в
+        # AT TIME ZONE и GROUP BY 1 не должны дробить статистику.
+        # Вид $1, $2 — как в pg_stat_statements.
+        literals = list(statement.find_all(exp.Literal))
+        for number, literal in enumerate(literals, start=1):
+            literal.replace(exp.Parameter(this=exp.Var(this=str(number))))
+        normalized = statement.sql(dialect="postgres")
+
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+    return digest, normalized
+
+
+def _walk_plan(plan: dict[str, Any]) -> Iterator[tuple[int, dict[str, Any]]]:
+    stack = [(0, plan)]
+    while stack:
+        depth, node = stack.pop()
+        yield depth, node
+        for child in reversed(node.get("Plans", [])):
+            stack.append((depth + 1, child))
+
+
+def scanned_rows(plan: dict[str, Any]) -> int:
+    # Строки, прочитанные узлами сканирования, включая отброшенные фильтром.
+    total = 0.0
+    for _, node in _walk_plan(plan):
+        if node.get("Node Type", "").endswith("Scan"):
+            rows = node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)
+            total += rows * node.get("Actual Loops", 1)
+    return int(total)
+
+
+def format_plan(plan: dict[str, Any]) -> str:
+    lines = []
+    for depth, node in _walk_plan(plan):
+        title = node.get("Node Type", "?")
+        if "Relation Name" in node:
+            title += f" on {node['Relation Name']}"
+        if "Index Name" in node:
+            title += f" using {node['Index Name']}"
+        if "Actual Total Time" in node:
+            details = (
+                f"time={node['Actual Total Time']:.1f}ms "
+                f"rows={node.get('Actual Rows', 0)} loops={node.get('Actual Loops', 1)}"
+            )
+        else:
+            # План без ANALYZE: только оценки планировщика.
+            details = (
+                f"cost={node.get('Total Cost', 0):.0f} rows~{node.get('Plan Rows', 0)}"
+            )
+        lines.append(f"{'  ' * depth}{title} ({details})")
+    return "\n".join(lines)
+
+
+@dataclass
+class QueryStat:
+    fingerprint: str
+    query: str
+    window: int = 1024
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+    # Оценка строк из плана cost guard, а не факт: есть только при cost guard.
+    rows_estimated: float = 0.0
+    estimated_calls: int = 0
+    slow_calls: int = 0
+    plan: str | None = None
+    plan_rows_scanned: int | None = None
+    plan_captured_at: float | None = None
+    recent: deque[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.recent = deque(maxlen=self.window)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    @property
+    def mean_rows_estimated(self) -> float | None:
+        if not self.estimated_calls:
+            return None
+        return self.rows_estimated / self.estimated_calls
+
+    def percentile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class QueryStats:
+    """Статистика SQL по отпечатку запроса (литералы отброшены)."""
+
+    def __init__(
+        self,
+        max_queries: int = 1000,
+        slow_query_ms: float = 1000.0,
+        plan_interval_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_queries = max_queries
+        self._slow_query_ms = slow_query_ms
+        self._plan_interval_seconds = plan_interval_seconds
+        self._clock = clock
+        self._stats: OrderedDict[str, QueryStat] = OrderedDict()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def record(
+        self,
+        sql: str,
+        elapsed_ms: float,
+        rows_estimate: float | None = None,
+        error: bool = False,
+        session_maker: SessionFactory | None = None,
+    ) -> QueryStat:
+        fingerprint, query = fingerprint_sql(sql)
+        stat = self._stats.get(fingerprint)
+        if stat is None:
+            stat = QueryStat(fingerprint=fingerprint, query=query)
+            self._stats[fingerprint] = stat
+            while len(self._stats) > self._max_queries:
+                self._stats.popitem(last=False)
+        self._stats.move_to_end(fingerprint)
+
+        stat.calls += 1
+        stat.total_ms += elapsed_ms
+        stat.max_ms = max(stat.max_ms, elapsed_ms)
+        stat.errors += error
+        if rows_estimate is not None:
+            stat.rows_estimated += rows_estimate
+            stat.estimated_calls += 1
+        stat.recent.append(elapsed_ms)
+
+        if 0 < self._slow_query_ms <= elapsed_ms:
+            stat.slow_calls += 1
+            logger.warning(
+                "sql_slow_query fingerprint=%s elapsed_ms=%.2f error=%s",
+                fingerprint,
+                elapsed_ms,
+                error,
+            )
+            if session_maker is not None and self._plan_due(stat):
+                stat.plan_captured_at = self._clock()
+                # EXPLAIN ANALYZE повторяет запрос, поэтому не держим им ответ
+                # и снимаем план не чаще раза в plan_interval_seconds. Упавший
+                # запрос (например, по statement_timeout) упал бы и под ANALYZE —
+                # для него только оценочный план.
+                task = asyncio.get_running_loop().create_task(
+                    self._capture_plan(session_maker, sql, stat, analyze=not error)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        return stat
+
+    def _plan_due(self, stat: QueryStat) -> bool:
+        return (
+            stat.plan_captured_at is None
+            or self._clock() - stat.plan_captured_at >= self._plan_interval_seconds
+        )
+
+    async def _capture_plan(
+        self, session_maker: SessionFactory, sql: str, stat: QueryStat, analyze: bool
+    ) -> None:
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            async with session_maker() as session:
+                result = await session.execute(text(f"EXPLAIN ({options}) {sql}"))
+                payload = result.scalar_one()
+        except Exception:
+            logger.warning(
+                "sql_slow_plan_failed fingerprint=%s", stat.fingerprint, exc_info=True
+            )
+            return
+
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        plan = payload[0]["Plan"]
+        stat.plan = format_plan(plan)
+        stat.plan_rows_scanned = scanned_rows(plan) if analyze else None
+        logger.warning(
+            "sql_slow_plan fingerprint=%s analyze=%s rows_scanned=%s\n%s",
+            stat.fingerprint,
+            analyze,
+            stat.plan_rows_scanned,
+            stat.plan,
+        )
+
+    def top(self, n: int = 10, key: str = "total_ms") -> list[QueryStat]:
+        return sorted(
+            self._stats.values(), key=lambda stat: getattr(stat, key), reverse=True
+        )[:n]
+
+    def report(self, n: int = 10) -> str:
+        stats = self.top(n)
+        if not stats:
+            return "Запросов пока не было"
+
+        blocks = []
+        for stat in stats:
+            summary = (
+                f"{stat.fingerprint} calls={stat.calls} errors={stat.errors} "
+                f"total={stat.total_ms:.0f}ms mean={stat.mean_ms:.1f}ms "
+                f"p95={stat.percentile(95):.1f}ms max={stat.max_ms:.1f}ms "
+                f"slow={stat.slow_calls}"
+            )
+            rows_estimated = stat.mean_rows_estimated
+            if rows_estimated is not None:
+                summary += f" rows_est={rows_estimated:.0f}"
+            lines = [summary, stat.query]
+            if stat.plan is not None:
+                if stat.plan_rows_scanned is None:
+                    lines.append("plan (EXPLAIN без ANALYZE, запрос упал):")
+                else:
+                    lines.append(f"plan (rows_scanned={stat.plan_rows_scanned}):")
+                lines.append(stat.plan)
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
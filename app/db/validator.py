@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from app.db.errors import SqlError
+from app.db.models import Base
+
+# Служебные таблицы (data_version, водяные знаки загрузчика) LLM не нужны.
+ALLOWED_TABLES = ("videos", "video_snapshots", "video_daily_stats", "daily_stats")
+
+_TABLE_COLUMNS: dict[str, frozenset[str]] = {
+    name: frozenset(column.name for column in Base.metadata.tables[name].columns)
+    for name in ALLOWED_TABLES
+}
+
+_FORBIDDEN_NODES: tuple[type[exp.Expression], ...] = (
+    exp.Insert,
+    exp.Update,
+    exp.Delete,
+    exp.Merge,
+    exp.Create,
+    exp.Drop,
+    exp.Alter,
+    exp.TruncateTable,
+    exp.Command,
+    exp.Copy,
+    exp.Set,
+    exp.Into,
+    exp.Lock,
+)
+_FORBIDDEN_FUNCTIONS = re.compile(
+    r"^(?:pg_|lo_|dblink|set_config$|current_setting$|query_to_xml|txid_)"
+)
+
+
+@dataclass(frozen=True)
+class SqlAnalysis:
+    tables: frozenset[str]
+    columns: frozenset[str]
+    predicates: tuple[str, ...]
+
+
+def _parse(sql: str) -> exp.Query:
+    try:
+        statements = [
+            statement
+            for statement in sqlglot.parse(sql, read="postgres")
+            if statement is not None
+        ]
+    except SqlglotError as exc:
+        raise SqlError("Не удалось разобрать SQL") from exc
+
+    if len(statements) != 1:
+        raise SqlError("Разрешён только один SQL-оператор")
+
+    statement = statements[0]
+    if not isinstance(statement, exp.Query):
+        raise SqlError("Разрешён только SELECT")
+
+    return statement
+
+
+def _check_nodes(statement: exp.Query) -> None:
+    for node in statement.walk():
+        if isinstance(node, _FORBIDDEN_NODES):
+            raise SqlError("Запрещены DDL/DML/utility команды в SQL")
+        if isinstance(node, exp.Anonymous) and _FORBIDDEN_FUNCTIONS.match(
+            node.name.lower()
+        ):
+            raise SqlError(f"Функция {node.name} запрещена")
+
+
+def _resolve_tables(statement: exp.Query) -> tuple[dict[str, str], set[str]]:
+    derived = {cte.alias_or_name for cte in statement.find_all(exp.CTE)}
+    derived.update(
+        subquery.alias
+        for subquery in statement.find_all(exp.Subquery)
+        if subquery.alias
+    )
+
+    aliases: dict[str, str] = {}
+    for table in statement.find_all(exp.Table):
+        if not table.db and table.name in derived:
+            continue
+        if table.db not in ("", "public") or table.name not in _TABLE_COLUMNS:
+            raise SqlError(f"Таблица {table.sql(dialect='postgres')} вне схемы")
+        aliases[table.name] = table.name
+        aliases[table.alias_or_name] = table.name
+
+    return aliases, derived
+
+
+def _check_columns(
+    statement: exp.Query, aliases: dict[str, str], derived: set[str]
+) -> frozenset[str]:
+    tables = set(aliases.values())
+    output_names = {alias.alias for alias in statement.find_all(exp.Alias)}
+    columns: set[str] = set()
+
+    for column in statement.find_all(exp.Column):
+        name = column.name
+        qualifier = column.table
+
+        if qualifier:
+            if qualifier in derived:
+                continue
+            table = aliases.get(qualifier)
+            if table is None:
+                raise SqlError(f"Неизвестная таблица или алиас {qualifier}")
+            if name not in _TABLE_COLUMNS[table]:
+                raise SqlError(f"Колонка {table}.{name} вне схемы")
+            columns.add(f"{table}.{name}")
+            continue
+
+        owners = [table for table in tables if name in _TABLE_COLUMNS[table]]
+        if owners:
+            columns.update(f"{table}.{name}" for table in owners)
+        elif name not in output_names and not derived:
+            raise SqlError(f"Колонка {name} вне схемы")
+
+    return frozenset(columns)
+
+
+def _conjuncts(condition: exp.Expression) -> list[exp.Expression]:
+    if isinstance(condition, exp.And):
+        return [
+            part for part in condition.flatten() if isinstance(part, exp.Expression)
+        ]
+    return [condition]
+
+
+def _predicates(statement: exp.Query) -> tuple[str, ...]:
+    conditions: list[exp.Expression] = []
+    for where in statement.find_all(exp.Where):
+        conditions.extend(_conjuncts(where.this))
+    for join in statement.find_all(exp.Join):
+        on = join.args.get("on")
+        if on is not None:
+            conditions.extend(_conjuncts(on))
+
+    return tuple(condition.sql(dialect="postgres") for condition in conditions)
+
+
+@lru_cache(maxsize=1024)
+def _analyze(sql: str) -> SqlAnalysis | SqlError:
+    # Ошибки тоже кэшируются: повторный плохой SQL не разбирается заново.
+    try:
+        statement = _parse(sql)
+        _check_nodes(statement)
+        aliases, derived = _resolve_tables(statement)
+        columns = _check_columns(statement, aliases, derived)
+    except SqlError as exc:
+        return exc
+
+    return SqlAnalysis(
+        tables=frozenset(aliases.values()),
+        columns=columns,
+        predicates=_predicates(statement),
+    )
+
+
+def analyze_sql(sql: str) -> SqlAnalysis:
+    result = _analyze(sql)
+    if isinstance(result, SqlError):
+        raise SqlError(str(result))
+
+    return result
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import aiohttp
+
+from app.core.metrics import LLM_LATENCY
+from app.core.tracing import span
+from app.llm.client import LlmClientError
+from app.llm.resilience import LlmRequest
+from app.llm.templates import TemplateSqlGenerator
+
+logger = logging.getLogger(__name__)
+
+# Ошибки, после которых запрос уходит в следующий бэкенд. Остальное — баг,
+# а не отказ бэкенда: его не прячем за переключением.
+_BACKEND_ERRORS = (LlmClientError, aiohttp.ClientError, TimeoutError)
+
+
+@dataclass
+class _Backend:
+    name: str
+    request: LlmRequest
+    latency_ms: float | None = None
+    requests: int = 0
+    failures: int = 0
+    last_used: int = 0
+
+
+class LlmRouter:
+    def __init__(
+        self,
+        backends: Sequence[tuple[str, LlmRequest]],
+        *,
+        templates: TemplateSqlGenerator | None = None,
+        ewma_alpha: float = 0.2,
+        failure_penalty_ms: float = 10_000.0,
+        explore_every: int = 50,
+    ) -> None:
+        self._backends = [_Backend(name, request) for name, request in backends]
+        self._templates = templates
+        self._ewma_alpha = ewma_alpha
+        self._failure_penalty_ms = failure_penalty_ms
+        self._explore_every = explore_every
+        self._calls = 0
+
+    def _ordered(self) -> list[_Backend]:
+        self._calls += 1
+        # Ещё не опрошенные бэкенды идут первыми, дальше — по EWMA задержки;
+        # при равенстве сохраняется порядок из конфигурации.
+        ranked = sorted(
+            self._backends,
+            key=lambda backend: (
+                backend.latency_ms is not None,
+                backend.latency_ms or 0.0,
+            ),
+        )
+        # Изредка начинаем с давно не использованного бэкенда, иначе его
+        # оценка не обновится после того, как он снова стал быстрым.
+        if (
+            self._explore_every > 0
+            and len(ranked) > 1
+            and self._calls % self._explore_every == 0
+        ):
+            stale = min(ranked[1:], key=lambda backend: backend.last_used)
+            ranked.remove(stale)
+            ranked.insert(0, stale)
+        return ranked
+
+    def _record(self, backend: _Backend, elapsed_ms: float) -> None:
+        if backend.latency_ms is None:
+            backend.latency_ms = elapsed_ms
+        else:
+            backend.latency_ms += self._ewma_alpha * (elapsed_ms - backend.latency_ms)
+
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        if self._templates is not None:
+            started = time.perf_counter()
+            with span("llm.backend", backend="template"):
+                sql = self._templates.generate(messages)
+            if sql is not None:
+                LLM_LATENCY.labels(backend="template").observe(
+                    time.perf_counter() - started
+                )
+                logger.info("llm_backend=template")
+                return sql
+
+        error: Exception | None = None
+        for backend in self._ordered():
+            backend.requests += 1
+            backend.last_used = self._calls
+            started = time.perf_counter()
+            try:
+                with span("llm.backend", backend=backend.name):
+                    sql = await backend.request(messages)
+            except _BACKEND_ERRORS as exc:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                backend.failures += 1
+                self._record(backend, max(elapsed_ms, self._failure_penalty_ms))
+                logger.warning(
+                    "llm_backend_failed backend=%s error=%s", backend.name, exc
+                )
+                error = exc
+                continue
+
+            elapsed = time.perf_counter() - started
+            elapsed_ms = elapsed * 1000
+            self._record(backend, elapsed_ms)
+            LLM_LATENCY.labels(backend=backend.name).observe(elapsed)
+            logger.info("llm_backend=%s latency_ms=%.2f", backend.name, elapsed_ms)
+            return sql
+
+        if error is None:
+            raise LlmClientError("Не настроен ни один LLM-бэкенд")
+        raise error
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        result: dict[str, dict[str, Any]] = {}
+        if self._templates is not None:
+            result["template"] = {
+                "hits": self._templates.hits,
+                "misses": self._templates.misses,
+            }
+        for backend in self._backends:
+            result[backend.name] = {
+                "latency_ms": backend.latency_ms,
+                "requests": backend.requests,
+                "failures": backend.failures,
+            }
+        return result
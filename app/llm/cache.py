@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+
+_MONTHS: dict[str, int] = {
+    "января": 1,
+    "февраля": 2,
+    "марта": 3,
+    "апреля": 4,
+    "мая": 5,
+    "июня": 6,
+    "июля": 7,
+    "августа": 8,
+    "сентября": 9,
+    "октября": 10,
+    "ноября": 11,
+    "декабря": 12,
+}
+_MONTH_NAMES = "|".join(_MONTHS)
+
+# Текст разбирается до приведения к нижнему регистру (id креатора регистр
+# сохраняет), поэтому все шаблоны — без учёта регистра.
+_DAY_RANGE = re.compile(
+    rf"\b(\d{{1,2}})\s+(по|до|и)\s+(\d{{1,2}})\s+({_MONTH_NAMES})\s+(\d{{4}})",
+    re.IGNORECASE,
+)
+_DATE_PATTERNS: tuple[re.Pattern[str], ...] = (
+    re.compile(r"\b(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})\b"),
+    re.compile(r"\b(?P<d>\d{1,2})\.(?P<m>\d{1,2})\.(?P<y>\d{4})\b"),
+    re.compile(
+        rf"\b(?P<d>\d{{1,2}})\s+(?P<month>{_MONTH_NAMES})\s+(?P<y>\d{{4}})"
+        r"(?:\s*(?:года|г\.?)(?!\w))?",
+        re.IGNORECASE,
+    ),
+)
+_CREATOR = re.compile(
+    r"(?P<prefix>(?:креатор|автор|creator)\w*(?:\s+(?:с\s+)?(?:id|ид|№))?\s*)"
+    r"(?P<value>[0-9a-z][0-9a-z_-]*)",
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(
+    r"(?<![\w.])\d{1,3}(?:\s\d{3})+(?![\w.])|(?<![\w.])\d+(?:[.,]\d+)?"
+)
+
+_SQL_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_PLACEHOLDERS = {"date": "<date>", "creator": "<creator>", "number": "<num>"}
+_KINDS = {placeholder: kind for kind, placeholder in _PLACEHOLDERS.items()}
+_PLACEHOLDER = re.compile("|".join(map(re.escape, _KINDS)))
+
+Slot = tuple[str, str]
+Template = tuple[str | int, ...]
+
+
+@dataclass
+class _Entry:
+    template: Template
+    expires_at: float
+
+
+def _iso_date(year: str, month: int, day: str) -> str | None:
+    # 31.02.2025 — не дата: такой вопрос уходит в LLM, а не в SQL с ошибкой.
+    try:
+        return date(int(year), month, int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _extract_dates(text: str, found: dict[str, list[str]]) -> str:
+    text = _DAY_RANGE.sub(r"\1 \4 \5 \2 \3 \4 \5", text)
+
+    matches = sorted(
+        (match for pattern in _DATE_PATTERNS for match in pattern.finditer(text)),
+        key=lambda match: match.start(),
+    )
+
+    parts: list[str] = []
+    position = 0
+    for match in matches:
+        if match.start() < position:
+            continue
+        groups = match.groupdict()
+        month_name = groups.get("month")
+        month = _MONTHS[month_name.lower()] if month_name else int(groups["m"])
+        value = _iso_date(groups["y"], month, groups["d"])
+        if value is None:
+            continue
+        found["date"].append(value)
+        parts.append(text[position : match.start()])
+        parts.append(_PLACEHOLDERS["date"])
+        position = match.end()
+    parts.append(text[position:])
+
+    return "".join(parts)
+
+
+def normalize_question(question: str) -> tuple[str, list[Slot]]:
+    text = (
+        question.replace("ё", "е").replace("Ё", "Е").replace("<", " ").replace(">", " ")
+    )
+    text = " ".join(text.split()).strip(" ?!.")
+
+    found: dict[str, list[str]] = {kind: [] for kind in _PLACEHOLDERS}
+    text = _extract_dates(text, found)
+
+    def replace_creator(match: re.Match[str]) -> str:
+        found["creator"].append(match.group("value"))
+        return match.group("prefix") + _PLACEHOLDERS["creator"]
+
+    text = _CREATOR.sub(replace_creator, text)
+
+    def replace_number(match: re.Match[str]) -> str:
+        found["number"].append(re.sub(r"\s", "", match.group(0)).replace(",", "."))
+        return _PLACEHOLDERS["number"]
+
+    text = _NUMBER.sub(replace_number, text)
+
+    # Каждый проход сохраняет порядок своих литералов, поэтому слоты
+    # восстанавливаются обходом плейсхолдеров в итоговой строке.
+    queues = {kind: iter(values) for kind, values in found.items()}
+    slots: list[Slot] = []
+
+    def index_placeholder(match: re.Match[str]) -> str:
+        kind = _KINDS[match.group(0)]
+        slots.append((kind, next(queues[kind])))
+        return f"<{kind}{len(slots) - 1}>"
+
+    key = _PLACEHOLDER.sub(index_placeholder, text).lower()
+    return key, slots
+
+
+def _slot_pattern(kind: str, value: str) -> re.Pattern[str]:
+    escaped = re.escape(value)
+    if kind == "creator":
+        return re.compile(rf"'{escaped}'")
+    if kind == "number":
+        return re.compile(rf"(?<![\w.'\-]){escaped}(?![\w.'\-])")
+    return re.compile(escaped)
+
+
+def _render_slot(kind: str, value: str) -> str:
+    return f"'{value}'" if kind == "creator" else value
+
+
+def build_template(sql: str, slots: list[Slot]) -> Template | None:
+    values = [value for _, value in slots]
+    if len(set(values)) != len(values):
+        return None
+
+    matches: list[tuple[int, int, int]] = []
+    for index, (kind, value) in enumerate(slots):
+        found = list(_slot_pattern(kind, value).finditer(sql))
+        if not found or (kind == "number" and len(found) != 1):
+            return None
+        matches.extend((match.start(), match.end(), index) for match in found)
+
+    matches.sort()
+    parts: list[str | int] = []
+    position = 0
+    for start, end, index in matches:
+        if start < position:
+            return None
+        parts.append(sql[position:start])
+        parts.append(index)
+        position = end
+    parts.append(sql[position:])
+
+    static_text = "".join(part for part in parts if isinstance(part, str))
+    if _SQL_DATE.search(static_text):
+        return None
+
+    return tuple(parts)
+
+
+def render_template(template: Template, slots: list[Slot]) -> str:
+    return "".join(
+        part if isinstance(part, str) else _render_slot(*slots[part])
+        for part in template
+    )
+
+
+class QuestionSqlCache:
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, question: str) -> str | None:
+        key, slots = normalize_question(question)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires_at <= self._clock():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return render_template(entry.template, slots)
+
+    def store(self, question: str, sql: str) -> bool:
+        if self._max_size <= 0:
+            return False
+
+        key, slots = normalize_question(question)
+        template = build_template(sql, slots)
+        if template is None:
+            return False
+
+        self._entries[key] = _Entry(
+            template=template,
+            expires_at=self._clock() + self._ttl_seconds,
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+        return True
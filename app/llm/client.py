@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import json
+import logging
+import time
 from dataclasses import dataclass
 from typing import Any
 
 import aiohttp
 
+from app.core.tracing import set_attribute
+
+logger = logging.getLogger(__name__)
+
 
 class LlmClientError(Exception):
     pass
 
 
+class LlmHttpError(LlmClientError):
+    def __init__(self, status: int, body: str) -> None:
+        super().__init__(f"YandexGPT error {status}: {body}")
+        self.status = status
+
+
+class LlmTimeoutError(LlmClientError):
+    pass
+
+
 @dataclass(frozen=True)
 class YandexGptConfig:
     api_key: str
@@ -18,15 +35,52 @@ class YandexGptConfig:
         "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
     )
     temperature: float = 0.0
-    max_tokens: int = 800
+    max_tokens: int = 256
     timeout_seconds: float = 30.0
+    pool_limit: int = 100
+    pool_limit_per_host: int = 10
+    keepalive_timeout_seconds: float = 30.0
+    dns_cache_ttl_seconds: int = 300
+    stream: bool = False
 
 
 class YandexGPTClient:
     def __init__(self, config: YandexGptConfig) -> None:
         self._config = config
+        self._session: aiohttp.ClientSession | None = None
 
-    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+    async def start(self) -> None:
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self._config.pool_limit,
+            limit_per_host=self._config.pool_limit_per_host,
+            keepalive_timeout=self._config.keepalive_timeout_seconds,
+            use_dns_cache=True,
+            ttl_dns_cache=self._config.dns_cache_ttl_seconds,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self._config.timeout_seconds),
+        )
+
+    async def close(self) -> None:
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        assert self._session is not None
+        return self._session
+
+    def _build_request(
+        self, messages: list[dict[str, str]], stream: bool
+    ) -> tuple[dict[str, Any], dict[str, str]]:
         if not self._config.api_key.strip():
             raise LlmClientError("YANDEX_API_KEY is empty")
         if not self._config.folder_id.strip():
@@ -35,7 +89,7 @@ class YandexGPTClient:
         request_payload: dict[str, Any] = {
             "modelUri": f"gpt://{self._config.folder_id}/aliceai-llm",
             "completionOptions": {
-                "stream": False,
+                "stream": stream,
                 "temperature": self._config.temperature,
                 "maxTokens": str(self._config.max_tokens),
             },
@@ -46,25 +100,23 @@ class YandexGPTClient:
             "Content-Type": "application/json",
             "Authorization": f"Api-Key {self._config.api_key}",
         }
+        return request_payload, headers
 
-        timeout = aiohttp.ClientTimeout(total=self._config.timeout_seconds)
+    async def _complete(
+        self, messages: list[dict[str, str]]
+    ) -> tuple[str, dict[str, Any]]:
+        request_payload, headers = self._build_request(messages, stream=False)
+        session = await self._get_session()
 
-        try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self._config.endpoint_url,
-                    json=request_payload,
-                    headers=headers,
-                ) as response:
-                    if response.status != 200:
-                        text = await response.text()
-                        raise LlmClientError(
-                            f"YandexGPT error {response.status}: {text}"
-                        )
-
-                    data: dict[str, Any] = await response.json(content_type=None)
-        except TimeoutError as exc:
-            raise LlmClientError("LLM request timeout") from exc
+        async with session.post(
+            self._config.endpoint_url,
+            json=request_payload,
+            headers=headers,
+        ) as response:
+            if response.status != 200:
+                raise LlmHttpError(response.status, await response.text())
+
+            data: dict[str, Any] = await response.json(content_type=None)
 
         result = data.get("result")
         response_payload = result if isinstance(result, dict) else data
@@ -85,17 +137,133 @@ class YandexGPTClient:
         if not text:
             raise LlmClientError(f"Empty message text: {response_payload}")
 
-        sql = text
+        return text, _usage(response_payload)
+
+    async def _complete_streaming(
+        self, messages: list[dict[str, str]]
+    ) -> tuple[str, dict[str, Any]]:
+        request_payload, headers = self._build_request(messages, stream=True)
+        session = await self._get_session()
+
+        text = ""
+        usage: dict[str, Any] = {}
+        async with session.post(
+            self._config.endpoint_url,
+            json=request_payload,
+            headers=headers,
+        ) as response:
+            if response.status != 200:
+                raise LlmHttpError(response.status, await response.text())
+
+            async for line in response.content:
+                parsed = _stream_chunk(line)
+                if parsed is None:
+                    continue
+                chunk, usage = parsed[0], parsed[1] or usage
+                # YandexGPT присылает накопленный текст; на случай дельт — склеиваем.
+                text = chunk if chunk.startswith(text) else text + chunk
+
+                statement = complete_statement(text)
+                if statement is not None:
+                    # Выход из async with закрывает соединение, и остаток
+                    # ответа модель уже не генерирует.
+                    logger.info("llm_stream_early_stop chars=%d", len(text))
+                    return statement, usage
 
-        if sql.startswith("```"):
-            lines = sql.splitlines()
-            if lines and lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].startswith("```"):
-                lines = lines[:-1]
-            sql = "\n".join(lines).strip()
+        return text.strip(), usage
 
-        if sql.endswith(";"):
-            sql = sql[:-1].rstrip()
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        started = time.perf_counter()
 
+        text = ""
+        usage: dict[str, Any] = {}
+        try:
+            if self._config.stream:
+                text, usage = await self._complete_streaming(messages)
+            if not text:
+                text, usage = await self._complete(messages)
+        except TimeoutError as exc:
+            raise LlmTimeoutError("LLM request timeout") from exc
+
+        sql = clean_sql(text)
+        set_attribute("prompt_tokens", usage.get("inputTextTokens", "?"))
+        set_attribute("completion_tokens", usage.get("completionTokens", "?"))
+        # Токены считает API; при раннем обрыве потока completion_tokens
+        # берётся из последнего полученного фрагмента.
+        logger.info(
+            "llm_time_to_sql_ms=%.2f stream=%s prompt_chars=%d "
+            "prompt_tokens=%s completion_tokens=%s",
+            (time.perf_counter() - started) * 1000,
+            self._config.stream,
+            sum(len(message.get("text", "")) for message in messages),
+            usage.get("inputTextTokens", "?"),
+            usage.get("completionTokens", "?"),
+        )
         return sql
+
+
+def _usage(payload: dict[str, Any]) -> dict[str, Any]:
+    usage = payload.get("usage")
+    return usage if isinstance(usage, dict) else {}
+
+
+def _stream_chunk(line: bytes) -> tuple[str, dict[str, Any]] | None:
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+
+    result = data.get("result") if isinstance(data, dict) else None
+    payload = result if isinstance(result, dict) else data
+    alternatives = payload.get("alternatives") if isinstance(payload, dict) else None
+    if not isinstance(alternatives, list) or not alternatives:
+        return None
+
+    first_alt = alternatives[0]
+    message = first_alt.get("message") if isinstance(first_alt, dict) else None
+    text = message.get("text") if isinstance(message, dict) else None
+    if not isinstance(text, str):
+        return None
+    return text, _usage(payload)
+
+
+def complete_statement(text: str) -> str | None:
+    body = text.lstrip()
+    fenced = body.startswith("```")
+    if fenced:
+        first_newline = body.find("\n")
+        if first_newline == -1:
+            return None
+        body = body[first_newline + 1 :]
+
+    in_string = False
+    for index, char in enumerate(body):
+        if char == "'":
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == ";" or (fenced and body.startswith("```", index)):
+            return body[:index].strip()
+
+    return None
+
+
+def clean_sql(text: str) -> str:
+    sql = text.strip()
+
+    if sql.startswith("```"):
+        lines = sql.splitlines()
+        if lines and lines[0].startswith("```"):
+            lines = lines[1:]
+        if lines and lines[-1].startswith("```"):
+            lines = lines[:-1]
+        sql = "\n".join(lines).strip()
+
+    if sql.endswith(";"):
+        sql = sql[:-1].rstrip()
+
+    return sql
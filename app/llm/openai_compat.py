@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import aiohttp
+
+from app.llm.client import LlmClientError, LlmHttpError, LlmTimeoutError, clean_sql
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OpenAiCompatibleConfig:
+    base_url: str
+    model: str
+    api_key: str = ""
+    temperature: float = 0.0
+    max_tokens: int = 256
+    timeout_seconds: float = 30.0
+    pool_limit: int = 100
+    pool_limit_per_host: int = 10
+    keepalive_timeout_seconds: float = 30.0
+
+
+class OpenAiCompatibleClient:
+    """Клиент /chat/completions (vLLM, llama.cpp server, Ollama и т.п.)."""
+
+    def __init__(self, config: OpenAiCompatibleConfig) -> None:
+        self._config = config
+        self._session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self._config.pool_limit,
+            limit_per_host=self._config.pool_limit_per_host,
+            keepalive_timeout=self._config.keepalive_timeout_seconds,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self._config.timeout_seconds),
+        )
+
+    async def close(self) -> None:
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        assert self._session is not None
+        return self._session
+
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        if not self._config.base_url.strip():
+            raise LlmClientError("LLM_LOCAL_URL is empty")
+
+        started = time.perf_counter()
+        request_payload: dict[str, Any] = {
+            "model": self._config.model,
+            "messages": [
+                {"role": message["role"], "content": message["text"]}
+                for message in messages
+            ],
+            "temperature": self._config.temperature,
+            "max_tokens": self._config.max_tokens,
+        }
+        headers = {"Content-Type": "application/json"}
+        if self._config.api_key:
+            headers["Authorization"] = f"Bearer {self._config.api_key}"
+
+        session = await self._get_session()
+        try:
+            async with session.post(
+                self._config.base_url.rstrip("/") + "/chat/completions",
+                json=request_payload,
+                headers=headers,
+            ) as response:
+                if response.status != 200:
+                    raise LlmHttpError(response.status, await response.text())
+
+                data: dict[str, Any] = await response.json(content_type=None)
+        except TimeoutError as exc:
+            raise LlmTimeoutError("LLM request timeout") from exc
+
+        choices = data.get("choices")
+        if not isinstance(choices, list) or not choices:
+            raise LlmClientError(f"Empty choices: {data}")
+
+        first_choice = choices[0]
+        message = (
+            first_choice.get("message") if isinstance(first_choice, dict) else None
+        )
+        content = message.get("content") if isinstance(message, dict) else None
+        text = content.strip() if isinstance(content, str) else ""
+        if not text:
+            raise LlmClientError(f"Empty message content: {data}")
+
+        usage = data.get("usage")
+        usage = usage if isinstance(usage, dict) else {}
+        logger.info(
+            "llm_time_to_sql_ms=%.2f backend=local prompt_chars=%d "
+            "prompt_tokens=%s completion_tokens=%s",
+            (time.perf_counter() - started) * 1000,
+            sum(len(message.get("text", "")) for message in messages),
+            usage.get("prompt_tokens", "?"),
+            usage.get("completion_tokens", "?"),
+        )
+        return clean_sql(text)
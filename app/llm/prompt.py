@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-SYSTEM_PROMPT = """
+import re
+from dataclasses import dataclass
+
+_RULES = """
 Ты - генератор SQL для PostgreSQL.
 Твоя задача: по русскому вопросу вернуть ОДИН SQL-запрос.
 
@@ -10,10 +13,16 @@ SYSTEM_PROMPT = """
 3) Запрос должен возвращать ОДНО число (1 строка, 1 колонка). Назови колонку value.
 4) Не используй таблицы/поля вне схемы ниже.
 5) Даты сравнивай через ::date. Примеры: video_created_at::date, created_at::date
+   Все даты и время — в UTC.
 6) creator_id - текст. Всегда сравнивай как строку в кавычках: creator_id = '123'
+""".strip()
 
-Схема данных:
+_ROLLUP_RULE = """
+7) Суммы приростов (delta_*) за дату или период считай по daily_stats
+   (все видео) или video_daily_stats (по видео/креатору), а не по video_snapshots.
+""".strip()
 
+_VIDEOS = """
 Таблица videos:
 - id uuid
 - creator_id text
@@ -24,7 +33,9 @@ SYSTEM_PROMPT = """
 - reports_count int
 - created_at timestamptz
 - updated_at timestamptz
+""".strip()
 
+_VIDEO_SNAPSHOTS = """
 Таблица video_snapshots:
 - id uuid
 - video_id uuid (FK -> videos.id)
@@ -38,24 +49,145 @@ SYSTEM_PROMPT = """
 - delta_reports_count int
 - created_at timestamptz (время замера, раз в час)
 - updated_at timestamptz
+""".strip()
+
+_VIDEO_DAILY_STATS = """
+Таблица video_daily_stats (суммы delta_* из video_snapshots по видео за день):
+- video_id uuid (FK -> videos.id)
+- day date (= video_snapshots.created_at::date)
+- delta_views_count bigint
+- delta_likes_count bigint
+- delta_comments_count bigint
+- delta_reports_count bigint
+""".strip()
 
-Как считать:
-- "сколько всего видео" -> count(*) из videos
-- "сколько видео у креатора X вышло с Д1 по Д2 включительно" ->
-  count(*) из videos где creator_id='X' и video_created_at::date BETWEEN 'Д1'::date AND 'Д2'::date
-- "сколько видео набрало больше N просмотров" -> count(*) из videos где views_count > N
-- "на сколько просмотров в сумме выросли все видео ДАТА" ->
-  COALESCE(sum(delta_views_count), 0) из video_snapshots где created_at::date='ДАТА'::date
-- "сколько разных видео получали новые просмотры ДАТА" ->
-  count(distinct video_id) из video_snapshots где created_at::date='ДАТА'::date и delta_views_count > 0
+_DAILY_STATS = """
+Таблица daily_stats (суммы delta_* по всем видео за день):
+- day date
+- delta_views_count bigint
+- delta_likes_count bigint
+- delta_comments_count bigint
+- delta_reports_count bigint
+""".strip()
 
+_METRICS = """
 Если спрашивают про лайки/комментарии/жалобы - используй соответствующие поля:
-likes_count/delta_likes_count, comments_count/delta_comments_count, reports_count/delta_reports_count.
+likes_count/delta_likes_count, comments_count/delta_comments_count,
+reports_count/delta_reports_count.
+""".strip()
+
+_GROWTH = r"вырос|прирост|прибав|увелич|измен|дельт|delta"
+_NEW_ACTIVITY = r"нов\w* (?:просмотр|лайк|коммент|жалоб)|получал|замер|снапшот"
+_OTHER_METRICS = r"лайк|коммент|жалоб|репорт"
+
+
+@dataclass(frozen=True)
+class _Example:
+    text: str
+    intent: str
+
+
+_EXAMPLES: tuple[_Example, ...] = (
+    _Example('"сколько всего видео" -> count(*) из videos', "videos"),
+    _Example(
+        '"сколько видео у креатора X вышло с Д1 по Д2 включительно" ->\n'
+        "  count(*) из videos где creator_id='X' и video_created_at::date "
+        "BETWEEN 'Д1'::date AND 'Д2'::date",
+        "videos",
+    ),
+    _Example(
+        '"сколько видео набрало больше N просмотров" -> '
+        "count(*) из videos где views_count > N",
+        "videos",
+    ),
+    _Example(
+        '"на сколько просмотров в сумме выросли все видео ДАТА" ->\n'
+        "  COALESCE(sum(delta_views_count), 0) из daily_stats где day='ДАТА'::date",
+        "growth",
+    ),
+    _Example(
+        '"на сколько выросли просмотры видео креатора X с Д1 по Д2" ->\n'
+        "  COALESCE(sum(s.delta_views_count), 0) из video_daily_stats s "
+        "JOIN videos v ON v.id = s.video_id\n"
+        "  где v.creator_id='X' и s.day BETWEEN 'Д1'::date AND 'Д2'::date",
+        "growth",
+    ),
+    _Example(
+        '"сколько разных видео получали новые просмотры ДАТА" ->\n'
+        "  count(distinct video_id) из video_snapshots где "
+        "created_at::date='ДАТА'::date и delta_views_count > 0",
+        "activity",
+    ),
+)
+
+
+def _intents(question: str) -> set[str]:
+    text = question.lower().replace("ё", "е")
+    intents = {"videos"}
+    if re.search(_GROWTH, text):
+        intents.add("growth")
+    if re.search(_NEW_ACTIVITY, text):
+        intents.add("activity")
+    if re.search(_OTHER_METRICS, text):
+        intents.add("metrics")
+    return intents
+
+
+def _assemble(intents: set[str]) -> str:
+    rules = [_RULES]
+    tables = [_VIDEOS]
+    if "growth" in intents:
+        rules.append(_ROLLUP_RULE)
+        tables += [_VIDEO_DAILY_STATS, _DAILY_STATS]
+    if "activity" in intents:
+        tables.append(_VIDEO_SNAPSHOTS)
+
+    examples = "\n".join(
+        f"- {example.text}" for example in _EXAMPLES if example.intent in intents
+    )
+    sections = [
+        "\n".join(rules),
+        "Схема данных:",
+        *tables,
+        f"Как считать:\n{examples}",
+    ]
+    if "metrics" in intents:
+        sections.append(_METRICS)
+    return "\n\n".join(sections)
+
+
+SYSTEM_PROMPT = _assemble({"videos", "growth", "activity", "metrics"})
+
+
+def build_system_prompt(question: str) -> str:
+    # Локальный классификатор по ключевым словам: в prompt попадают только
+    # таблицы и примеры, нужные для вопроса.
+    return _assemble(_intents(question))
+
+
+REWRITE_PROMPT = """
+Этот SQL слишком тяжёлый для базы: {reason}.
+Перепиши его дешевле с тем же ответом: без декартовых произведений, JOIN только
+по ключам, суммы delta_* бери из daily_stats/video_daily_stats, фильтруй как можно раньше.
+Верни только SQL.
 """.strip()
 
 
 def build_messages(question: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "text": build_system_prompt(question)},
+        {"role": "user", "text": question.strip()},
+    ]
+
+
+def build_rewrite_messages(
+    question: str, sql: str, reason: str
+) -> list[dict[str, str]]:
+    # Для переписывания нужна полная схема: дешёвый вариант может
+    # опираться на таблицы, которые классификатор не выбрал.
     return [
         {"role": "system", "text": SYSTEM_PROMPT},
         {"role": "user", "text": question.strip()},
+        {"role": "assistant", "text": sql},
+        {"role": "user", "text": REWRITE_PROMPT.format(reason=reason)},
     ]
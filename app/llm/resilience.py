@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+
+from app.core.tracing import span
+from app.llm.client import LlmClientError, LlmHttpError, LlmTimeoutError
+
+logger = logging.getLogger(__name__)
+
+LlmRequest = Callable[[list[dict[str, str]]], Awaitable[str]]
+
+
+class CircuitOpenError(LlmClientError):
+    pass
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    # 4xx (кроме 429) — ошибка запроса или ключа, повтор не поможет. Как и
+    # пустой ответ модели или не заданный в настройках ключ.
+    if isinstance(exc, LlmHttpError):
+        return exc.status == 429 or exc.status >= 500
+    return isinstance(exc, (LlmTimeoutError, aiohttp.ClientError, TimeoutError))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> None:
+        if self._opened_at is None:
+            return
+
+        # После паузы пропускаем один пробный запрос (half-open).
+        if (
+            self._clock() - self._opened_at >= self._reset_seconds
+            and not self._probe_in_flight
+        ):
+            self._probe_in_flight = True
+            return
+
+        raise CircuitOpenError("LLM временно недоступна")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probe_in_flight or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning("llm_circuit_open failures=%d", self._failures)
+            self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        # До 20 замеров оценка хвоста ненадёжна.
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class ResilientLlm:
+    def __init__(
+        self,
+        request: LlmRequest,
+        *,
+        retries: int = 2,
+        backoff_base_seconds: float = 0.2,
+        backoff_max_seconds: float = 2.0,
+        hedge: bool = True,
+        hedge_quantile: float = 95.0,
+        hedge_min_delay_seconds: float = 0.5,
+        deadline_seconds: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        rng: Callable[[], float] = random.random,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self._request = request
+        self._retries = retries
+        self._backoff_base_seconds = backoff_base_seconds
+        self._backoff_max_seconds = backoff_max_seconds
+        self._hedge = hedge
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_delay_seconds = hedge_min_delay_seconds
+        self._deadline_seconds = deadline_seconds
+        self._breaker = breaker or CircuitBreaker()
+        self._rng = rng
+        self._sleep = sleep
+        self._latency = LatencyTracker()
+
+        self.retries_made = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    @property
+    def hedge_delay_seconds(self) -> float | None:
+        # Без истории задержек вторую копию не шлём: иначе на холодном старте
+        # каждый запрос дольше минимальной паузы удваивал бы нагрузку.
+        quantile = self._latency.quantile(self._hedge_quantile)
+        if quantile is None:
+            return None
+        return max(self._hedge_min_delay_seconds, quantile)
+
+    async def _timed(self, messages: list[dict[str, str]], hedge: bool = False) -> str:
+        started = time.perf_counter()
+        try:
+            with span("llm.attempt", hedge=hedge):
+                return await self._request(messages)
+        finally:
+            # Отменённая копия тоже даёт замер — нижнюю границу своей
+            # задержки; без неё из окна выпадали бы самые медленные ответы.
+            self._latency.record(time.perf_counter() - started)
+
+    async def _hedged(self, messages: list[dict[str, str]]) -> str:
+        first = asyncio.ensure_future(self._timed(messages))
+        hedge_delay = self.hedge_delay_seconds if self._hedge else None
+        if hedge_delay is None:
+            try:
+                return await first
+            finally:
+                first.cancel()
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return first.result()
+
+            self.hedges_fired += 1
+            tasks.append(asyncio.ensure_future(self._timed(messages, hedge=True)))
+
+            # Побеждает первый успешный ответ; ошибка одной копии не
+            # прерывает ожидание второй.
+            pending = set(tasks)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is tasks[1]:
+                            self.hedges_won += 1
+                        return task.result()
+
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _attempt(
+        self, messages: list[dict[str, str]], deadline: float | None
+    ) -> str:
+        timeout = asyncio.timeout_at(deadline)
+        try:
+            async with timeout:
+                return await self._hedged(messages)
+        except TimeoutError as exc:
+            if not timeout.expired():
+                raise
+            raise LlmTimeoutError("LLM deadline exceeded") from exc
+
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        # Общий срок на все попытки и паузы: без него худший случай —
+        # (retries + 1) * LLM_TIMEOUT_SECONDS.
+        loop = asyncio.get_running_loop()
+        deadline = (
+            loop.time() + self._deadline_seconds if self._deadline_seconds else None
+        )
+
+        attempt = 0
+        while True:
+            self._breaker.allow()
+            try:
+                result = await self._attempt(messages, deadline)
+            except Exception as exc:
+                if not _is_retryable(exc):
+                    # Upstream ответил осмысленной ошибкой — он жив.
+                    self._breaker.record_success()
+                    raise
+                self._breaker.record_failure()
+                if attempt >= self._retries or self._breaker.is_open:
+                    raise
+
+                # Full jitter: случайная пауза до экспоненциальной границы.
+                backoff = min(
+                    self._backoff_max_seconds,
+                    self._backoff_base_seconds * 2**attempt,
+                )
+                pause = backoff * self._rng()
+                if deadline is not None and loop.time() + pause >= deadline:
+                    raise
+                attempt += 1
+                self.retries_made += 1
+                logger.warning("llm_retry attempt=%d error=%s", attempt, exc)
+                await self._sleep(pause)
+                continue
+
+            self._breaker.record_success()
+            return result
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+
+from app.llm.cache import Slot, normalize_question
+
+# Правила повторяют примеры из prompt (app/llm/prompt.py) и работают по
+# нормализованному вопросу: даты, креаторы и числа уже заменены на слоты.
+_CREATOR = (
+    r"(?:у |для )?(?:креатор|автор|creator)\w*(?: (?:с )?(?:id|ид|№))? ?"
+    r"<creator(?P<creator>\d+)>"
+)
+_PERIOD = (
+    r"(?:(?:за период |в период )?с <date(?P<start>\d+)> (?P<until>по|до) "
+    r"<date(?P<end>\d+)>(?P<inclusive> включительно)?|(?:за )?<date(?P<day>\d+)>)"
+)
+_METRIC = r"(?P<metric>просмотр|лайк|коммент|жалоб|репорт)\w*"
+_PUBLISHED = r"(?:вышл[ои]|было опубликовано|опубликовал\w*|появил\w*|выложил\w*)"
+_GREW = r"(?:выросл[иа]|вырос|прибавил\w*|увеличил\w*|набрал[иа]?)"
+
+_COLUMNS = {
+    "просмотр": "views_count",
+    "лайк": "likes_count",
+    "коммент": "comments_count",
+    "жалоб": "reports_count",
+    "репорт": "reports_count",
+}
+_OPERATORS = {"больше": ">", "более": ">", "свыше": ">", "меньше": "<", "менее": "<"}
+
+Match = dict[str, str | None]
+
+
+def _period(column: str, match: Match, slots: list[Slot]) -> str | None:
+    # None — вопрос отдаётся LLM: перепутанные даты или «до» без
+    # «включительно», где граница неоднозначна (в prompt включительна только «по»).
+    if match["day"] is not None:
+        return f"{column} = '{slots[int(match['day'])][1]}'::date"
+    start = slots[int(match["start"] or 0)][1]
+    end = slots[int(match["end"] or 0)][1]
+    if start > end or (match["until"] == "до" and match["inclusive"] is None):
+        return None
+    return f"{column} BETWEEN '{start}'::date AND '{end}'::date"
+
+
+def _creator(column: str, match: Match, slots: list[Slot]) -> str | None:
+    if match["creator"] is None:
+        return None
+    return f"{column} = '{slots[int(match['creator'])][1]}'"
+
+
+def _where(*conditions: str | None) -> str:
+    present = [condition for condition in conditions if condition]
+    return f" WHERE {' AND '.join(present)}" if present else ""
+
+
+def _videos_published(match: Match, slots: list[Slot]) -> str | None:
+    period = None
+    if match["day"] or match["start"]:
+        period = _period("video_created_at::date", match, slots)
+        if period is None:
+            return None
+    return "SELECT count(*) AS value FROM videos" + _where(
+        _creator("creator_id", match, slots), period
+    )
+
+
+def _videos_threshold(match: Match, slots: list[Slot]) -> str:
+    column = _COLUMNS[match["metric"] or ""]
+    operator = _OPERATORS[match["op"] or ""]
+    number = slots[int(match["number"] or 0)][1]
+    return "SELECT count(*) AS value FROM videos" + _where(
+        _creator("creator_id", match, slots), f"{column} {operator} {number}"
+    )
+
+
+def _growth(match: Match, slots: list[Slot]) -> str | None:
+    column = "delta_" + _COLUMNS[match["metric"] or ""]
+    creator = _creator("v.creator_id", match, slots)
+    period = _period("day" if creator is None else "s.day", match, slots)
+    if period is None:
+        return None
+    if creator is None:
+        return f"SELECT COALESCE(sum({column}), 0) AS value FROM daily_stats" + _where(
+            period
+        )
+    return (
+        f"SELECT COALESCE(sum(s.{column}), 0) AS value FROM video_daily_stats s "
+        "JOIN videos v ON v.id = s.video_id" + _where(creator, period)
+    )
+
+
+def _activity(match: Match, slots: list[Slot]) -> str | None:
+    column = "delta_" + _COLUMNS[match["metric"] or ""]
+    creator = _creator("v.creator_id", match, slots)
+    period = _period("s.created_at::date", match, slots)
+    if period is None:
+        return None
+    source = "video_snapshots s"
+    if creator is not None:
+        source += " JOIN videos v ON v.id = s.video_id"
+    return f"SELECT count(DISTINCT s.video_id) AS value FROM {source}" + _where(
+        creator, period, f"s.{column} > 0"
+    )
+
+
+_RULES: tuple[
+    tuple[re.Pattern[str], Callable[[Match, list[Slot]], str | None]], ...
+] = (
+    (
+        re.compile(
+            rf"сколько (?:всего )?видео(?: всего)?(?: {_PUBLISHED})?(?: {_CREATOR})?"
+            rf"(?: {_PUBLISHED})?(?: {_PERIOD})?"
+            r"(?: есть)?(?: в (?:базе|системе))?(?: за все время)?"
+        ),
+        _videos_published,
+    ),
+    (
+        re.compile(
+            rf"сколько (?:всего )?видео(?: {_CREATOR})? (?:набрал[оиа]?|получил[оиа]?|"
+            r"имеют|имеет|с) (?P<op>больше|более|свыше|меньше|менее)(?: чем)? "
+            rf"<number(?P<number>\d+)> {_METRIC}(?: за все время)?"
+        ),
+        _videos_threshold,
+    ),
+    (
+        re.compile(
+            rf"на сколько(?: в сумме)? {_METRIC}(?: в сумме)? {_GREW}(?: в сумме)?"
+            rf"(?: все)? видео(?: {_CREATOR})? {_PERIOD}"
+        ),
+        _growth,
+    ),
+    (
+        re.compile(
+            rf"на сколько(?: в сумме)? {_GREW}(?: в сумме)?(?: суммарн\w*)? {_METRIC}"
+            rf"(?: всех)? видео(?: {_CREATOR})? {_PERIOD}"
+        ),
+        _growth,
+    ),
+    (
+        re.compile(
+            rf"сколько (?:разных )?видео(?: {_CREATOR})? получал[иоа]? "
+            rf"(?:новые )?{_METRIC} {_PERIOD}"
+        ),
+        _activity,
+    ),
+)
+
+
+def generate_sql(question: str) -> str | None:
+    key, slots = normalize_question(question)
+    key = key.replace(",", "")
+    for pattern, build in _RULES:
+        match = pattern.fullmatch(key)
+        if match is not None:
+            return build(match.groupdict(), slots)
+    return None
+
+
+class TemplateSqlGenerator:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def generate(self, messages: list[dict[str, str]]) -> str | None:
+        # Только первичный вопрос: диалог переписывания дорогого SQL
+        # требует модели.
+        questions = [message for message in messages if message["role"] == "user"]
+        if len(questions) != 1 or messages[-1] is not questions[0]:
+            return None
+
+        sql = generate_sql(questions[0]["text"])
+        if sql is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return sql
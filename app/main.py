@@ -1,36 +1,235 @@
 import asyncio
 import sys
+from functools import partial
+from typing import TYPE_CHECKING
 
 from aiogram import Bot, Dispatcher
 
+from app.bot.pipeline import RequestPipeline
 from app.bot.router import router
-from app.core.logging import setup_logging
-from app.core.settings import get_settings
+from app.core.logging import parse_sampling, setup_logging
+from app.core.metrics import (
+    PIPELINE_IN_FLIGHT,
+    PIPELINE_PENDING,
+    start_metrics_server,
+    watch_pool,
+)
+from app.core.tracing import (
+    FileSpanExporter,
+    OtlpHttpExporter,
+    SpanExporter,
+    configure_tracing,
+)
+from app.core.settings import Settings, get_settings
+from app.db.cache import RedisResultBackend, ResultCache, fetch_data_version
+from app.db.cost import CostGuard
 from app.db.executor import execute_sql
+from app.db.session import get_read_session_factory, get_session_factory
+from app.db.stats import QueryStats
+from app.llm.backends import LlmRouter
+from app.llm.cache import QuestionSqlCache
 from app.llm.client import YandexGptConfig, YandexGPTClient
+from app.llm.resilience import CircuitBreaker, LlmRequest, ResilientLlm
+from app.llm.templates import TemplateSqlGenerator
+
+if TYPE_CHECKING:
+    from app.llm.openai_compat import OpenAiCompatibleClient
 
 
 async def main() -> None:
     settings = get_settings()
-    setup_logging(level=settings.level_logging)
+    log_listener = setup_logging(
+        level=settings.level_logging,
+        log_format=settings.log_format,
+        queue_size=settings.log_queue_size,
+        sampling=parse_sampling(settings.log_sampling),
+    )
+    try:
+        await _run(settings)
+    finally:
+        # Дописывает оставшиеся в очереди записи, в том числе если бот
+        # не поднялся (например, неизвестный бэкенд в LLM_BACKENDS).
+        log_listener.stop()
+
+
+async def _run(settings: Settings) -> None:
+    span_exporter: SpanExporter | None = None
+    if settings.trace_sample_rate > 0:
+        span_exporter = (
+            OtlpHttpExporter(settings.trace_otlp_endpoint)
+            if settings.trace_otlp_endpoint
+            else FileSpanExporter(settings.trace_file)
+        )
+    configure_tracing(settings.trace_sample_rate, span_exporter)
 
     bot = Bot(token=settings.tg_bot_token)
 
-    llm_config = YandexGptConfig(
-        api_key=settings.yandex_api_key,
-        folder_id=settings.yandex_folder_id,
-        timeout_seconds=settings.llm_timeout_seconds,
+    llm_clients: list[YandexGPTClient | OpenAiCompatibleClient] = []
+    llm_backends: list[tuple[str, LlmRequest]] = []
+    for name in (item.strip() for item in settings.llm_backends.split(",")):
+        if not name:
+            continue
+
+        client: YandexGPTClient | OpenAiCompatibleClient
+        if name == "yandex":
+            client = YandexGPTClient(
+                YandexGptConfig(
+                    api_key=settings.yandex_api_key,
+                    folder_id=settings.yandex_folder_id,
+                    timeout_seconds=settings.llm_timeout_seconds,
+                    max_tokens=settings.llm_max_tokens,
+                    pool_limit=settings.llm_pool_limit,
+                    pool_limit_per_host=settings.llm_pool_limit_per_host,
+                    keepalive_timeout_seconds=settings.llm_keepalive_seconds,
+                    dns_cache_ttl_seconds=settings.llm_dns_cache_seconds,
+                    stream=settings.llm_stream,
+                )
+            )
+        elif name == "local":
+            from app.llm import openai_compat
+
+            client = openai_compat.OpenAiCompatibleClient(
+                openai_compat.OpenAiCompatibleConfig(
+                    base_url=settings.llm_local_url,
+                    model=settings.llm_local_model,
+                    api_key=settings.llm_local_api_key,
+                    timeout_seconds=settings.llm_timeout_seconds,
+                    max_tokens=settings.llm_max_tokens,
+                    pool_limit=settings.llm_pool_limit,
+                    pool_limit_per_host=settings.llm_pool_limit_per_host,
+                    keepalive_timeout_seconds=settings.llm_keepalive_seconds,
+                )
+            )
+        else:
+            raise ValueError(f"Неизвестный LLM-бэкенд в LLM_BACKENDS: {name}")
+
+        # У каждого бэкенда свои повторы и breaker: отказ одного не
+        # блокирует переход на другой.
+        resilient_llm = ResilientLlm(
+            client.request_llm,
+            retries=settings.llm_retries,
+            backoff_base_seconds=settings.llm_backoff_base_seconds,
+            backoff_max_seconds=settings.llm_backoff_max_seconds,
+            hedge=settings.llm_hedge,
+            hedge_quantile=settings.llm_hedge_quantile,
+            hedge_min_delay_seconds=settings.llm_hedge_min_delay_seconds,
+            deadline_seconds=settings.llm_deadline_seconds,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.llm_breaker_failures,
+                reset_seconds=settings.llm_breaker_reset_seconds,
+            ),
+        )
+        llm_clients.append(client)
+        llm_backends.append((name, resilient_llm.request_llm))
+
+    llm_router = LlmRouter(
+        llm_backends,
+        templates=TemplateSqlGenerator() if settings.llm_templates else None,
     )
-    llm_client = YandexGPTClient(llm_config)
+    question_cache = QuestionSqlCache(
+        max_size=settings.question_cache_size,
+        ttl_seconds=settings.question_cache_ttl_seconds,
+    )
+
+    result_cache: ResultCache | None = None
+    if settings.result_cache_max_bytes > 0 or settings.result_cache_redis_url:
+        result_cache = ResultCache(
+            load_version=partial(fetch_data_version, get_session_factory()),
+            max_bytes=settings.result_cache_max_bytes,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            version_refresh_seconds=settings.data_version_refresh_seconds,
+            backend=(
+                RedisResultBackend.from_url(settings.result_cache_redis_url)
+                if settings.result_cache_redis_url
+                else None
+            ),
+        )
 
-    dispatcher = Dispatcher()
+    cost_guard: CostGuard | None = None
+    if settings.sql_max_total_cost > 0 or settings.sql_max_plan_rows > 0:
+        cost_guard = CostGuard(
+            max_total_cost=settings.sql_max_total_cost or float("inf"),
+            max_plan_rows=settings.sql_max_plan_rows or float("inf"),
+            cache_size=settings.sql_explain_cache_size,
+            load_version=partial(fetch_data_version, get_session_factory()),
+            version_refresh_seconds=settings.data_version_refresh_seconds,
+        )
+
+    query_stats = QueryStats(
+        max_queries=settings.sql_stats_max_queries,
+        slow_query_ms=settings.sql_slow_query_ms,
+    )
+
+    pipeline = RequestPipeline(
+        max_in_flight=settings.pipeline_max_in_flight,
+        max_pending=settings.pipeline_max_pending,
+        max_pending_per_chat=settings.pipeline_max_pending_per_chat,
+    )
+
+    PIPELINE_IN_FLIGHT.set_function(lambda: pipeline.in_flight)
+    PIPELINE_PENDING.set_function(lambda: pipeline.pending)
+    for target, pool in get_read_session_factory().pools():
+        watch_pool(target, pool)
+
+    dispatcher = Dispatcher(
+        llm_request=llm_router.request_llm,
+        sql_execute=partial(
+            execute_sql,
+            result_cache=result_cache,
+            cost_guard=cost_guard,
+            parameterize=settings.sql_parameterize,
+            query_stats=query_stats,
+        ),
+        question_cache=question_cache,
+        pipeline=pipeline,
+        query_stats=query_stats,
+        admin_chat_ids=frozenset(
+            int(item) for item in settings.admin_chat_ids.split(",") if item.strip()
+        ),
+    )
     dispatcher.include_router(router)
+    for client in llm_clients:
+        dispatcher.startup.register(client.start)
+        dispatcher.shutdown.register(client.close)
+    if result_cache is not None:
+        dispatcher.shutdown.register(result_cache.close)
+    dispatcher.shutdown.register(query_stats.close)
+    if span_exporter is not None:
+        dispatcher.shutdown.register(span_exporter.close)
 
-    await dispatcher.start_polling(
-        bot,
-        llm_request=llm_client.request_llm,
-        sql_execute=execute_sql,
+    metrics_runner = (
+        await start_metrics_server(settings.metrics_host, settings.metrics_port)
+        if settings.metrics_port
+        else None
     )
+    try:
+        if settings.bot_mode == "webhook":
+            # aiohttp.web и серверная часть aiogram нужны только в этом режиме.
+            from app.bot.webhook import (
+                build_webhook_app,
+                register_webhook,
+                run_webhook,
+            )
+
+            if settings.webhook_base_url:
+                register_webhook(
+                    dispatcher,
+                    url=settings.webhook_base_url.rstrip("/") + settings.webhook_path,
+                    secret_token=settings.webhook_secret,
+                )
+            app = build_webhook_app(
+                dispatcher,
+                bot,
+                path=settings.webhook_path,
+                secret_token=settings.webhook_secret,
+            )
+            await run_webhook(app, settings.webhook_host, settings.webhook_port)
+            return
+
+        await dispatcher.start_polling(bot)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
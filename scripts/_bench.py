@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import math
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+CORPUS = Path(__file__).with_name("corpus.jsonl")
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def format_latency(name: str, latencies_ms: Sequence[float]) -> str:
+    return (
+        f"{name}: n={len(latencies_ms)} "
+        f"p50={percentile(latencies_ms, 50):.2f}ms "
+        f"p99={percentile(latencies_ms, 99):.2f}ms "
+        f"max={max(latencies_ms, default=0.0):.2f}ms"
+    )
+
+
+# Верхние границы корзин гистограммы, мс: от кэша в доли миллисекунды до LLM в секунды.
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def histogram(
+    latencies_ms: Sequence[float],
+    buckets_ms: Sequence[float] = HISTOGRAM_BUCKETS_MS,
+) -> dict[str, int]:
+    # Не накопительная: в каждой корзине — замеры от предыдущей границы до своей.
+    counts = {f"<={bound:g}ms": 0 for bound in buckets_ms}
+    counts[f">{buckets_ms[-1]:g}ms"] = 0
+    for value in latencies_ms:
+        bound = next((bound for bound in buckets_ms if value <= bound), None)
+        counts[f"<={bound:g}ms" if bound is not None else f">{buckets_ms[-1]:g}ms"] += 1
+    return counts
+
+
+def format_histogram(name: str, latencies_ms: Sequence[float]) -> str:
+    buckets = " ".join(
+        f"{bucket}:{count}"
+        for bucket, count in histogram(latencies_ms).items()
+        if count
+    )
+    return f"{name} histogram: {buckets or 'empty'}"
+
+
+def load_corpus(path: Path = CORPUS) -> list[dict[str, Any]]:
+    # JSONL: {"question": ..., "sql": ...}; sql — ответ LLM, записанный заранее.
+    with path.open(encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def summarize(latencies_ms: Sequence[float]) -> dict[str, float]:
+    return {
+        "p50": round(percentile(latencies_ms, 50), 3),
+        "p99": round(percentile(latencies_ms, 99), 3),
+    }
+
+
+def find_regressions(
+    current: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    tolerance: float = 0.2,
+    min_delta_ms: float = 1.0,
+) -> list[str]:
+    regressions: list[str] = []
+    for stage, quantiles in current["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        for name, value in quantiles.items():
+            old = previous.get(name)
+            # Абсолютный порог отсекает шум на стадиях в доли миллисекунды.
+            if old is None or value - old < min_delta_ms:
+                continue
+            if value > old * (1 + tolerance):
+                regressions.append(
+                    f"{stage} {name} {old:.2f}ms -> {value:.2f}ms "
+                    f"(+{(value / old - 1) * 100 if old else math.inf:.0f}%)"
+                )
+
+    old_throughput = baseline.get("throughput")
+    throughput = current.get("throughput")
+    if (
+        old_throughput
+        and throughput is not None
+        and throughput < old_throughput * (1 - tolerance)
+    ):
+        regressions.append(
+            f"throughput {old_throughput:.1f}/s -> {throughput:.1f}/s "
+            f"({(throughput / old_throughput - 1) * 100:.0f}%)"
+        )
+    return regressions
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import date
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.db.rewrite import rewrite_date_predicates
+from app.db.session import build_engine
+from scripts._bench import format_latency
+
+_SCHEMA = "bench_date_predicates"
+_START = date(2025, 1, 1)
+
+_CREATE_SCHEMA = (
+    f"DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE",
+    f"CREATE SCHEMA {_SCHEMA}",
+    f"SET search_path TO {_SCHEMA}",
+)
+
+_CREATE_TABLES = (
+    """
+    CREATE TABLE videos (
+        id bigint PRIMARY KEY,
+        creator_id text NOT NULL,
+        video_created_at timestamptz NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE video_snapshots (
+        video_id bigint NOT NULL,
+        delta_views_count int NOT NULL,
+        created_at timestamptz NOT NULL
+    )
+    """,
+)
+
+_FILL = (
+    text(
+        """
+        INSERT INTO videos
+        SELECT i, (i % 1000)::text,
+               CAST(:start AS timestamptz) + (i % (:days * 24)) * interval '1 hour'
+        FROM generate_series(1, :videos) AS i
+        """
+    ),
+    text(
+        """
+        INSERT INTO video_snapshots
+        SELECT i % :videos, (i * 7) % 50,
+               CAST(:start AS timestamptz)
+                   + ((i / :videos) % (:days * 24)) * interval '1 hour'
+        FROM generate_series(1, :rows) AS i
+        """
+    ),
+)
+
+_INDEXES = (
+    "CREATE INDEX ON videos (video_created_at)",
+    "CREATE INDEX ON video_snapshots (created_at)",
+)
+_EXPRESSION_INDEXES = (
+    "CREATE INDEX ON videos (CAST(timezone('UTC', video_created_at) AS DATE))",
+    "CREATE INDEX ON video_snapshots (CAST(timezone('UTC', created_at) AS DATE))",
+)
+
+_QUERIES = {
+    "snapshots day =": (
+        "SELECT count(DISTINCT video_id) AS value FROM video_snapshots "
+        "WHERE created_at::date = '2025-01-15'::date AND delta_views_count > 0"
+    ),
+    "videos BETWEEN": (
+        "SELECT count(*) AS value FROM videos "
+        "WHERE creator_id = '42' "
+        "AND video_created_at::date BETWEEN '2025-01-10'::date AND '2025-01-12'::date"
+    ),
+    "snapshots day IN": (
+        "SELECT COALESCE(sum(delta_views_count), 0) AS value FROM video_snapshots "
+        "WHERE created_at::date IN ('2025-01-15', '2025-01-20')"
+    ),
+}
+
+
+def _scan_nodes(plan: dict[str, Any]) -> list[str]:
+    nodes: list[str] = []
+    if "Scan" in plan["Node Type"]:
+        nodes.append(
+            f"{plan['Node Type']}({plan.get('Index Name', plan.get('Relation Name'))})"
+        )
+    for child in plan.get("Plans", []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+async def _measure(session: AsyncSession, name: str, sql: str, repeats: int) -> None:
+    explain = await session.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = (json.loads(explain) if isinstance(explain, str) else explain)[0]["Plan"]
+
+    latencies: list[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await session.execute(text(sql))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    print(format_latency(name, latencies))
+    print(f"  plan: {', '.join(_scan_nodes(plan))}")
+
+
+async def main(rows: int, days: int, repeats: int) -> None:
+    settings = get_settings()
+    engine = build_engine(settings.database_url, db_timeout_seconds=3600)
+    videos = max(1, rows // (days * 24))
+
+    try:
+        async with engine.connect() as connection:
+            session = AsyncSession(bind=connection)
+            for statement in (*_CREATE_SCHEMA, *_CREATE_TABLES):
+                await session.execute(text(statement))
+
+            started = time.perf_counter()
+            params = {"videos": videos, "days": days, "rows": rows, "start": _START}
+            for fill in _FILL:
+                await session.execute(fill, params)
+            for statement in (*_INDEXES, "ANALYZE"):
+                await session.execute(text(statement))
+            await session.commit()
+            print(
+                f"prepared rows={rows} videos={videos} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+
+            for name, sql in _QUERIES.items():
+                await _measure(session, f"before {name}", sql, repeats)
+
+            for statement in (*_EXPRESSION_INDEXES, "ANALYZE"):
+                await session.execute(text(statement))
+            await session.commit()
+
+            for name, sql in _QUERIES.items():
+                rewritten = rewrite_date_predicates(sql)
+                await _measure(session, f"after  {name}", rewritten, repeats)
+
+            await session.execute(text(f"DROP SCHEMA {_SCHEMA} CASCADE"))
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_date_predicates --rows 10000000
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    asyncio.run(main(rows=args.rows, days=args.days, repeats=args.repeats))
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from app.llm.backends import LlmRouter
+from app.llm.client import LlmClientError, YandexGPTClient, YandexGptConfig
+from app.llm.openai_compat import OpenAiCompatibleClient, OpenAiCompatibleConfig
+from app.llm.prompt import build_messages
+from app.llm.resilience import LlmRequest
+from app.llm.templates import TemplateSqlGenerator
+from scripts._bench import CORPUS, format_latency, load_corpus
+
+Backend = Callable[[list[dict[str, str]]], Awaitable[str | None]]
+
+
+def _make_stub(stub_ms: float) -> Callable[[web.Request], Awaitable[web.Response]]:
+    async def chat(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(random.uniform(0.8, 1.2) * stub_ms / 1000)
+        return web.json_response(
+            {"choices": [{"message": {"content": "SELECT count(*) FROM videos"}}]}
+        )
+
+    return chat
+
+
+async def _replay(
+    backend: Backend, questions: list[str], rounds: int
+) -> tuple[list[float], int, int]:
+    latencies: list[float] = []
+    declined = 0
+    errors = 0
+    for _ in range(rounds):
+        for question in questions:
+            messages = build_messages(question)
+            started = time.perf_counter()
+            try:
+                sql = await backend(messages)
+            except (LlmClientError, aiohttp.ClientError, TimeoutError):
+                errors += 1
+                continue
+            if sql is None:
+                declined += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, declined, errors
+
+
+async def main(
+    corpus: Path,
+    rounds: int,
+    stub_ms: float,
+    local_url: str,
+    local_model: str,
+    yandex: bool,
+) -> None:
+    questions = [entry["question"] for entry in load_corpus(corpus)]
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", _make_stub(stub_ms))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    clients: list[YandexGPTClient | OpenAiCompatibleClient] = [
+        OpenAiCompatibleClient(
+            OpenAiCompatibleConfig(
+                base_url=f"http://127.0.0.1:{runner.addresses[0][1]}/v1",
+                model="stub",
+            )
+        )
+    ]
+    remote: list[tuple[str, LlmRequest]] = [("stub", clients[0].request_llm)]
+    if local_url:
+        clients.append(
+            OpenAiCompatibleClient(
+                OpenAiCompatibleConfig(base_url=local_url, model=local_model)
+            )
+        )
+        remote.append(("local", clients[-1].request_llm))
+    if yandex:
+        clients.append(
+            YandexGPTClient(
+                YandexGptConfig(
+                    api_key=os.environ.get("YANDEX_API_KEY", ""),
+                    folder_id=os.environ.get("YANDEX_FOLDER_ID", ""),
+                    stream=True,
+                )
+            )
+        )
+        remote.append(("yandex", clients[-1].request_llm))
+
+    templates = TemplateSqlGenerator()
+
+    async def template(messages: list[dict[str, str]]) -> str | None:
+        return templates.generate(messages)
+
+    backends: list[tuple[str, Backend]] = [("template", template), *remote]
+    backends.append(
+        ("router", LlmRouter(remote, templates=TemplateSqlGenerator()).request_llm)
+    )
+
+    print(f"questions={len(questions)} rounds={rounds}")
+    try:
+        for name, backend in backends:
+            latencies, declined, errors = await _replay(backend, questions, rounds)
+            print(
+                f"{format_latency(name, latencies)} declined={declined} errors={errors}"
+            )
+    finally:
+        for client in clients:
+            await client.close()
+        await runner.cleanup()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--stub-ms", type=float, default=800)
+    parser.add_argument("--local-url", default="")
+    parser.add_argument("--local-model", default="")
+    parser.add_argument("--yandex", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_llm_backends --rounds 5 --stub-ms 800
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(
+        main(
+            corpus=args.corpus,
+            rounds=args.rounds,
+            stub_ms=args.stub_ms,
+            local_url=args.local_url,
+            local_model=args.local_model,
+            yandex=args.yandex,
+        )
+    )
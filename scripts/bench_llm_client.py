@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+from aiohttp import web
+
+from app.llm.client import YandexGPTClient, YandexGptConfig
+from scripts._bench import format_latency
+
+_COMPLETION = {
+    "result": {
+        "alternatives": [{"message": {"role": "assistant", "text": "SELECT 1"}}],
+    }
+}
+
+
+async def _completion(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response(_COMPLETION)
+
+
+async def _start_stub() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_post("/completion", _completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/completion"
+
+
+async def _timed(call: Callable[[], Awaitable[object]]) -> float:
+    started = time.perf_counter()
+    await call()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _run(
+    config: YandexGptConfig, requests: int, concurrency: int, pooled: bool
+) -> list[float]:
+    messages = [{"role": "user", "text": "сколько всего видео?"}]
+    semaphore = asyncio.Semaphore(concurrency)
+    shared = YandexGPTClient(config)
+    await shared.start()
+
+    async def one() -> float:
+        async with semaphore:
+            if pooled:
+                return await _timed(lambda: shared.request_llm(messages))
+
+            client = YandexGPTClient(config)
+
+            async def fresh() -> None:
+                try:
+                    await client.request_llm(messages)
+                finally:
+                    await client.close()
+
+            return await _timed(fresh)
+
+    try:
+        return list(await asyncio.gather(*(one() for _ in range(requests))))
+    finally:
+        await shared.close()
+
+
+async def main(requests: int, concurrency: int) -> None:
+    runner, url = await _start_stub()
+    config = YandexGptConfig(api_key="bench", folder_id="bench", endpoint_url=url)
+
+    try:
+        for pooled in (False, True):
+            latencies = await _run(config, requests, concurrency, pooled)
+            print(format_latency("pooled" if pooled else "unpooled", latencies))
+    finally:
+        await runner.cleanup()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_llm_client
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    asyncio.run(main(requests=args.requests, concurrency=args.concurrency))
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from aiohttp import web
+
+from app.llm.client import LlmClientError, YandexGPTClient, YandexGptConfig
+from app.llm.resilience import CircuitBreaker, ResilientLlm
+from scripts._bench import format_latency
+
+_COMPLETION = {"result": {"alternatives": [{"message": {"text": "SELECT 1"}}]}}
+
+
+def _make_handler(
+    base_ms: float, slow_ms: float, slow_rate: float, error_rate: float
+) -> Callable[[web.Request], Awaitable[web.Response]]:
+    async def completion(request: web.Request) -> web.Response:
+        await request.read()
+        roll = random.random()
+        if roll < error_rate:
+            return web.json_response({"error": "injected"}, status=503)
+        delay = slow_ms if roll < error_rate + slow_rate else base_ms
+        await asyncio.sleep(random.uniform(0.8, 1.2) * delay / 1000)
+        return web.json_response(_COMPLETION)
+
+    return completion
+
+
+async def _run(
+    request: Callable[[list[dict[str, str]]], Awaitable[str]],
+    requests: int,
+    concurrency: int,
+) -> tuple[list[float], int]:
+    messages = [{"role": "user", "text": "сколько всего видео?"}]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await request(messages)
+            except (LlmClientError, aiohttp.ClientError, TimeoutError):
+                failures += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, failures
+
+
+async def main(
+    requests: int,
+    concurrency: int,
+    base_ms: float,
+    slow_ms: float,
+    slow_rate: float,
+    error_rate: float,
+) -> None:
+    app = web.Application()
+    app.router.add_post(
+        "/completion", _make_handler(base_ms, slow_ms, slow_rate, error_rate)
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/completion"
+
+    client = YandexGPTClient(
+        YandexGptConfig(api_key="bench", folder_id="bench", endpoint_url=url)
+    )
+    resilient = ResilientLlm(
+        client.request_llm,
+        hedge_min_delay_seconds=base_ms * 1.5 / 1000,
+        breaker=CircuitBreaker(failure_threshold=requests),
+    )
+
+    try:
+        for name, request in (
+            ("plain", client.request_llm),
+            ("retry+hedge", resilient.request_llm),
+        ):
+            latencies, failures = await _run(request, requests, concurrency)
+            print(f"{format_latency(name, latencies)} failures={failures}")
+        print(
+            f"retries={resilient.retries_made} hedges_fired={resilient.hedges_fired} "
+            f"hedges_won={resilient.hedges_won}"
+        )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--base-ms", type=float, default=50)
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_llm_resilience --slow-rate 0.03 --error-rate 0.02
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(
+        main(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            base_ms=args.base_ms,
+            slow_ms=args.slow_ms,
+            slow_rate=args.slow_rate,
+            error_rate=args.error_rate,
+        )
+    )
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+from aiohttp import web
+
+from app.llm.client import YandexGPTClient, YandexGptConfig
+from scripts._bench import format_latency
+
+_SQL = (
+    "SELECT COUNT(*) AS value FROM videos "
+    "WHERE creator_id = '42' AND video_created_at::date "
+    "BETWEEN '2025-11-01'::date AND '2025-11-05'::date;"
+)
+_TAIL = "\nЗапрос считает видео креатора 42, опубликованные с 1 по 5 ноября."
+
+
+def _tokens(text: str, size: int = 4) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _line(text: str) -> bytes:
+    payload = {"result": {"alternatives": [{"message": {"text": text}}]}}
+    return json.dumps(payload).encode() + b"\n"
+
+
+def _make_handler(
+    token_ms: float, tail_tokens: int
+) -> Callable[[web.Request], Awaitable[web.StreamResponse]]:
+    tokens = _tokens(_SQL) + _tokens(_TAIL * tail_tokens)
+
+    async def completion(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        delay = token_ms / 1000
+
+        if not body["completionOptions"]["stream"]:
+            # Без стриминга ответ приходит после генерации всех токенов.
+            await asyncio.sleep(delay * len(tokens))
+            return web.Response(body=_line("".join(tokens)))
+
+        response = web.StreamResponse()
+        await response.prepare(request)
+        text = ""
+        try:
+            for token in tokens:
+                await asyncio.sleep(delay)
+                text += token
+                await response.write(_line(text))
+        except ConnectionError:
+            pass
+        return response
+
+    return completion
+
+
+async def main(requests: int, token_ms: float, tail_tokens: int) -> None:
+    app = web.Application()
+    app.router.add_post("/completion", _make_handler(token_ms, tail_tokens))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/completion"
+
+    messages = [{"role": "user", "text": "сколько видео у креатора 42?"}]
+    try:
+        for stream in (False, True):
+            client = YandexGPTClient(
+                YandexGptConfig(
+                    api_key="bench", folder_id="bench", endpoint_url=url, stream=stream
+                )
+            )
+            latencies: list[float] = []
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    await client.request_llm(messages)
+                    latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                await client.close()
+            print(format_latency("stream" if stream else "no-stream", latencies))
+    finally:
+        await runner.cleanup()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--tail-tokens", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_llm_stream --requests 50 --token-ms 5
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(
+        main(
+            requests=args.requests,
+            token_ms=args.token_ms,
+            tail_tokens=args.tail_tokens,
+        )
+    )
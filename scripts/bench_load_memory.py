@@ -0,0 +1,141 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from scripts.load_data import _iter_raw_batches, _iter_videos, _parse_batch
+
+_UNITS = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+_SNAPSHOTS_PER_VIDEO = 24
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    for unit, multiplier in _UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[: -len(unit)]) * multiplier)
+    return int(value)
+
+
+def _synthetic_video(index: int) -> dict[str, object]:
+    video_id = str(uuid.UUID(int=index))
+    return {
+        "id": video_id,
+        "creator_id": f"{index % 5000:032x}",
+        "video_created_at": "2025-11-01T10:00:00+00:00",
+        "views_count": index % 100_000,
+        "likes_count": index % 1000,
+        "comments_count": index % 100,
+        "reports_count": index % 10,
+        "created_at": "2025-11-01T10:00:00+00:00",
+        "updated_at": "2025-11-02T10:00:00+00:00",
+        "snapshots": [
+            {
+                "id": str(uuid.UUID(int=(index << 8) + hour)),
+                "video_id": video_id,
+                "views_count": hour * 10,
+                "likes_count": hour,
+                "comments_count": 0,
+                "reports_count": 0,
+                "delta_views_count": 10,
+                "delta_likes_count": 1,
+                "delta_comments_count": 0,
+                "delta_reports_count": 0,
+                "created_at": f"2025-11-01T{hour:02d}:00:00+00:00",
+                "updated_at": f"2025-11-01T{hour:02d}:00:00+00:00",
+            }
+            for hour in range(_SNAPSHOTS_PER_VIDEO)
+        ],
+    }
+
+
+def write_synthetic_file(path: Path, size_bytes: int) -> int:
+    videos = 0
+    with path.open("w", encoding="utf-8") as stream:
+        written = stream.write('{"videos": [')
+        while written < size_bytes:
+            separator = "," if videos else ""
+            written += stream.write(separator + json.dumps(_synthetic_video(videos)))
+            videos += 1
+        stream.write("]}")
+    return videos
+
+
+def _measure(path: Path, mode: str, batch_size: int) -> None:
+    started = time.perf_counter()
+    rows = 0
+
+    if mode == "stream":
+        for raw_batch in _iter_raw_batches(_iter_videos(path), batch_size):
+            batch = _parse_batch(raw_batch, copy_rows=False)
+            rows += len(batch.videos) + len(batch.snapshots)
+    else:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        batch = _parse_batch(payload["videos"], copy_rows=False)
+        rows += len(batch.videos) + len(batch.snapshots)
+
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"rows": rows, "seconds": elapsed, "peak_rss_kb": peak_kb}))
+
+
+def main(sizes: list[str], batch_size: int, baseline: bool) -> None:
+    modes = ["stream", "json.loads"] if baseline else ["stream"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"videos_{size}.json"
+            videos = write_synthetic_file(path, parse_size(size))
+            for mode in modes:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "scripts.bench_load_memory",
+                        "--measure",
+                        str(path),
+                        "--mode",
+                        mode,
+                        "--batch-size",
+                        str(batch_size),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output)
+                print(
+                    f"{size} ({videos} videos) {mode}: "
+                    f"rows={result['rows']} "
+                    f"time={result['seconds']:.1f}s "
+                    f"peak_rss={result['peak_rss_kb'] / 1024:.1f}MB"
+                )
+            path.unlink()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100MB,1GB,5GB")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--baseline",
+        action="store_true",
+        help="также замерить json.loads всего файла (не запускать на 5GB)",
+    )
+    parser.add_argument("--measure", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="stream", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_load_memory --sizes 100MB,1GB,5GB
+    args = _parse_args()
+    if args.measure is not None:
+        _measure(args.measure, args.mode, args.batch_size)
+    else:
+        main(args.sizes.split(","), args.batch_size, args.baseline)
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+from scripts.bench_load_memory import parse_size, write_synthetic_file
+from scripts.load_data import load_data
+
+
+async def main(size: str, batch_size: int, modes: list[str]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "videos.json"
+        videos = write_synthetic_file(path, parse_size(size))
+        print(f"synthetic file {size}: {videos} videos")
+
+        results = {}
+        for mode in modes:
+            results[mode] = await load_data(
+                path=path, batch_size=batch_size, truncate=True, mode=mode
+            )
+
+    for mode, stats in results.items():
+        print(
+            f"{mode}: rows={stats.videos + stats.snapshots} "
+            f"time={stats.seconds:.2f}s rows/sec={stats.rows_per_second:.0f}"
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Сравнение режимов загрузки. TRUNCATE-ит таблицы в DATABASE_URL."
+    )
+    parser.add_argument("--size", default="200MB")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--modes", default="insert,copy")
+    parser.add_argument("--confirm-truncate", action="store_true", required=True)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_load_modes --confirm-truncate
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    asyncio.run(main(args.size, args.batch_size, args.modes.split(",")))
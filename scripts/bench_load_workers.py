@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from scripts.bench_load_memory import parse_size, write_synthetic_file
+from scripts.load_data import _iter_parsed_batches, _iter_raw_batches, _iter_videos
+
+
+async def _parse(path: Path, batch_size: int, workers: int) -> tuple[int, float]:
+    rows = 0
+    started = time.perf_counter()
+    batches = _iter_parsed_batches(
+        _iter_raw_batches(_iter_videos(path), batch_size),
+        workers=workers,
+        copy_rows=True,
+    )
+    async for batch in batches:
+        rows += len(batch.videos) + len(batch.snapshots)
+    return rows, time.perf_counter() - started
+
+
+async def main(size: str, batch_size: int, workers_list: list[int]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "videos.json"
+        videos = write_synthetic_file(path, parse_size(size))
+        print(f"synthetic file {size}: {videos} videos, cpu_count={os.cpu_count()}")
+
+        baseline: float | None = None
+        for workers in workers_list:
+            rows, seconds = await _parse(path, batch_size, workers)
+            rate = rows / seconds
+            baseline = baseline or rate
+            print(
+                f"workers={workers}: rows={rows} time={seconds:.2f}s "
+                f"rows/sec={rate:.0f} speedup={rate / baseline:.2f}x"
+            )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="200MB")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_load_workers --size 200MB
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    workers_list = [int(value) for value in args.workers.split(",")]
+    asyncio.run(main(args.size, args.batch_size, workers_list))
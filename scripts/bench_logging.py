@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import io
+import logging
+import time
+from logging.handlers import QueueListener
+
+from app.core.logging import TEXT_FORMAT, setup_logging
+from app.core.tracing import RequestIdFilter, start_trace
+
+# Строки горячего пути одного апдейта: router -> executor -> router.
+_LINES = (
+    (
+        "app.bot.router",
+        "input_text=%s",
+        "сколько видео набрали больше 100000 просмотров",
+    ),
+    ("app.db.executor", "generated_sql=%s", "SELECT count(*) FROM videos WHERE v > 1"),
+    ("app.db.executor", "sql_execution_time_ms=%.2f", 12.5),
+    ("app.bot.router", "telegram_response=%s", "42"),
+)
+
+
+class SlowSink(io.TextIOBase):
+    """Поток вывода с задержкой на запись: stderr в pipe, занятый диск."""
+
+    def __init__(self, write_us: float) -> None:
+        self._write_s = write_us / 1_000_000
+        self.lines = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self._write_s:
+            time.sleep(self._write_s)
+        self.lines += 1
+        return len(text)
+
+
+def _setup_sync(sink: SlowSink) -> None:
+    # Как было: StreamHandler пишет прямо из event loop.
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+
+
+async def _emit(updates: int) -> list[float]:
+    loggers = [(logging.getLogger(name), msg, arg) for name, msg, arg in _LINES]
+    latencies_us: list[float] = []
+    for _ in range(updates):
+        with start_trace("handle_text"):
+            for logger, msg, arg in loggers:
+                started = time.perf_counter_ns()
+                logger.info(msg, arg)
+                latencies_us.append((time.perf_counter_ns() - started) / 1000)
+        await asyncio.sleep(0)
+    return latencies_us
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def main(updates: int, write_us: float, queue_size: int, sampling: float) -> None:
+    modes: list[tuple[str, str, dict[str, float] | None]] = [
+        ("sync-text", "text", None),
+        ("queue-text", "text", None),
+        ("queue-json", "json", None),
+        ("queue-json-sampled", "json", {"app": sampling}),
+    ]
+    print(f"updates={updates} records={updates * len(_LINES)} write_us={write_us}")
+    for name, log_format, rates in modes:
+        sink = SlowSink(write_us)
+        listener: QueueListener | None = None
+        if name == "sync-text":
+            _setup_sync(sink)
+        else:
+            listener = setup_logging(
+                logging.INFO,
+                log_format=log_format,
+                queue_size=queue_size,
+                sampling=rates,
+                stream=sink,  # type: ignore[arg-type]
+            )
+
+        started = time.perf_counter()
+        latencies_us = await _emit(updates)
+        loop_ms = (time.perf_counter() - started) * 1000
+
+        dropped = 0
+        if listener is not None:
+            dropped = logging.getLogger().handlers[0].dropped  # type: ignore[attr-defined]
+            listener.stop()
+
+        print(
+            f"{name}: per-record p50={_percentile(latencies_us, 50):.1f}us "
+            f"p99={_percentile(latencies_us, 99):.1f}us "
+            f"max={max(latencies_us):.0f}us loop={loop_ms:.0f}ms "
+            f"written={sink.lines} dropped={dropped}"
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--write-us", type=float, default=20)
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--sampling", type=float, default=0.1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_logging --updates 20000 --write-us 20
+    args = _parse_args()
+    asyncio.run(
+        main(
+            updates=args.updates,
+            write_us=args.write_us,
+            queue_size=args.queue_size,
+            sampling=args.sampling,
+        )
+    )
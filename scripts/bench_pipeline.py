@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, cast
+
+from aiogram.types import Message
+
+from app.bot.pipeline import RequestPipeline
+from app.bot.router import BUSY_TEXT, handle_text
+from scripts._bench import format_latency
+
+
+class _FakeMessage:
+    def __init__(self, text: str, chat_id: int) -> None:
+        self.text = text
+        self.chat = SimpleNamespace(id=chat_id)
+        self.answer_text: str | None = None
+
+    async def answer(self, text: str, **kwargs: Any) -> None:
+        self.answer_text = text
+
+
+async def main(
+    updates: int,
+    chats: int,
+    llm_ms: float,
+    sql_ms: float,
+    slow_sql_ms: float,
+    pipeline: RequestPipeline,
+) -> None:
+    async def llm_request(messages: list[dict[str, str]]) -> str:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * llm_ms / 1000)
+        return messages[-1]["text"]
+
+    async def sql_execute(sql: str) -> int:
+        # Чат 0 изображает пользователя с тяжёлыми запросами.
+        delay = slow_sql_ms if sql.endswith("chat=0") else sql_ms
+        await asyncio.sleep(random.uniform(0.5, 1.5) * delay / 1000)
+        return 1
+
+    async def one(index: int) -> tuple[float, bool]:
+        chat_id = index % chats
+        message = _FakeMessage(f"SELECT 1 -- chat={chat_id}", chat_id)
+        started = time.perf_counter()
+        await handle_text(
+            cast(Message, message),
+            llm_request,
+            sql_execute,
+            None,
+            pipeline,
+        )
+        return (time.perf_counter() - started) * 1000, message.answer_text == BUSY_TEXT
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(updates)))
+    elapsed = time.perf_counter() - started
+
+    served = [latency for latency, busy in results if not busy]
+    shed = sum(1 for _, busy in results if busy)
+    print(
+        f"updates={updates} chats={chats} served={len(served)} shed={shed} "
+        f"throughput={len(served) / elapsed:.0f} answers/s"
+    )
+    print(format_latency("served", served))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--llm-ms", type=float, default=50)
+    parser.add_argument("--sql-ms", type=float, default=10)
+    parser.add_argument("--slow-sql-ms", type=float, default=1000)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=2000)
+    parser.add_argument("--max-pending-per-chat", type=int, default=5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_pipeline --updates 5000 --chats 500
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(
+        main(
+            updates=args.updates,
+            chats=args.chats,
+            llm_ms=args.llm_ms,
+            sql_ms=args.sql_ms,
+            slow_sql_ms=args.slow_sql_ms,
+            pipeline=RequestPipeline(
+                max_in_flight=args.max_in_flight,
+                max_pending=args.max_pending,
+                max_pending_per_chat=args.max_pending_per_chat,
+            ),
+        )
+    )
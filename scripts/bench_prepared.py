@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.settings import get_settings
+from app.db.parameterize import parameterize_sql
+from app.db.session import build_engine
+from scripts._bench import format_latency
+
+_SCHEMA = "bench_prepared"
+_START = date(2025, 1, 1)
+
+_SETUP = (
+    f"DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE",
+    f"CREATE SCHEMA {_SCHEMA}",
+    f"""
+    CREATE TABLE {_SCHEMA}.videos (
+        id bigint PRIMARY KEY,
+        creator_id text NOT NULL,
+        views_count int NOT NULL,
+        video_created_at timestamptz NOT NULL
+    )
+    """,
+    f"""
+    INSERT INTO {_SCHEMA}.videos
+    SELECT i, (i % 1000)::text, (i * 7919) % 100000,
+           '{_START}'::timestamptz + (i % 1440) * interval '1 hour'
+    FROM generate_series(1, :rows) AS i
+    """,
+    f"CREATE INDEX ON {_SCHEMA}.videos (creator_id)",
+    f"CREATE INDEX ON {_SCHEMA}.videos (video_created_at)",
+    f"CREATE INDEX ON {_SCHEMA}.videos (views_count)",
+    f"ANALYZE {_SCHEMA}.videos",
+)
+
+_TEMPLATES = (
+    (
+        "SELECT count(*) AS value FROM {schema}.videos "
+        "WHERE creator_id = '{creator}' AND video_created_at >= '{day}'::timestamptz "
+        "AND video_created_at < '{next_day}'::timestamptz"
+    ),
+    "SELECT count(*) AS value FROM {schema}.videos WHERE views_count > {views}",
+    (
+        "SELECT COALESCE(sum(views_count), 0) AS value FROM {schema}.videos v "
+        "JOIN {schema}.videos w ON w.id = v.id "
+        "WHERE v.creator_id = '{creator}' AND w.views_count BETWEEN {views} AND 99999"
+    ),
+)
+
+
+def _random_sql() -> str:
+    day = _START + timedelta(days=random.randrange(60))
+    return random.choice(_TEMPLATES).format(
+        schema=_SCHEMA,
+        creator=random.randrange(1000),
+        day=day,
+        next_day=day + timedelta(days=1),
+        views=random.randrange(90_000, 100_000),
+    )
+
+
+async def _planning_share(engine: AsyncEngine) -> None:
+    async with engine.connect() as connection:
+        for template in _TEMPLATES:
+            sql = template.format(
+                schema=_SCHEMA,
+                creator=1,
+                day=_START,
+                next_day=_START + timedelta(days=1),
+                views=99_000,
+            )
+            result = await connection.execute(text(f"EXPLAIN (ANALYZE, SUMMARY) {sql}"))
+            summary = "\n".join(row[0] for row in result)
+            planning = re.search(r"Planning Time: ([\d.]+)", summary)
+            execution = re.search(r"Execution Time: ([\d.]+)", summary)
+            if planning and execution:
+                print(
+                    f"planning={planning.group(1)}ms execution={execution.group(1)}ms "
+                    f"template={sql[:60]}..."
+                )
+
+
+async def _run(engine: AsyncEngine, queries: list[str], bind: bool) -> list[float]:
+    latencies: list[float] = []
+    async with engine.connect() as connection:
+        for sql in queries:
+            started = time.perf_counter()
+            if bind:
+                prepared = parameterize_sql(sql)
+                await connection.execute(text(prepared.template), prepared.params)
+            else:
+                await connection.execute(text(sql))
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(rows: int, queries: int) -> None:
+    settings = get_settings()
+    engines = {
+        "literal sql": (
+            build_engine(settings.database_url, 3600, pool_size=1, prepared_max=0),
+            False,
+        ),
+        "bound, not prepared": (
+            build_engine(settings.database_url, 3600, pool_size=1, prepared_max=0),
+            True,
+        ),
+        "bound, prepared": (
+            build_engine(
+                settings.database_url,
+                3600,
+                pool_size=1,
+                prepare_threshold=0,
+                prepared_max=100,
+            ),
+            True,
+        ),
+    }
+    setup_engine = engines["literal sql"][0]
+
+    try:
+        async with setup_engine.begin() as connection:
+            for statement in _SETUP:
+                await connection.execute(text(statement), {"rows": rows})
+        await _planning_share(setup_engine)
+
+        workload = [_random_sql() for _ in range(queries)]
+        for name, (engine, bind) in engines.items():
+            await _run(engine, workload[:50], bind)
+            print(format_latency(name, await _run(engine, workload, bind)))
+
+        async with setup_engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA {_SCHEMA} CASCADE"))
+    finally:
+        for engine, _ in engines.values():
+            await engine.dispose()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_prepared --rows 1000000 --queries 5000
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    asyncio.run(main(rows=args.rows, queries=args.queries))
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.core.settings import get_settings
+from app.db.cost import CostGuard
+from app.db.errors import ModuleError
+from app.db.executor import execute_sql
+from app.db.models import Base
+from app.db.rollups import refresh_daily_rollups
+from app.db.session import build_engine
+from app.llm.cache import QuestionSqlCache
+from app.llm.client import LlmClientError
+from app.llm.prompt import build_messages
+from scripts._bench import (
+    CORPUS,
+    find_regressions,
+    format_histogram,
+    format_latency,
+    histogram,
+    load_corpus,
+    summarize,
+)
+
+_SCHEMA = "bench_replay"
+_START = date(2025, 11, 1)
+_BASELINE = Path(__file__).with_name("baselines") / "replay.json"
+_STAGES = ("cache", "prompt", "llm", "sql", "total")
+
+_FILL = (
+    """
+    INSERT INTO videos
+    SELECT md5(i::text)::uuid, md5((i % :creators)::text),
+           CAST(:start AS timestamptz) + (i % (:days * 24)) * interval '1 hour',
+           (i * 7919) % 200000, (i * 31) % 5000, i % 300, (i % 97 = 0)::int,
+           now(), now()
+    FROM generate_series(1, :videos) AS i
+    """,
+    """
+    INSERT INTO video_snapshots
+    SELECT md5('s' || i)::uuid, md5(((i % :videos) + 1)::text)::uuid,
+           i % 1000, i % 100, i % 10, 0,
+           (i * 7) % 50, (i * 3) % 5, i % 3, (i % 97 = 0)::int,
+           CAST(:start AS timestamptz)
+               + ((i / :videos) % (:days * 24)) * interval '1 hour',
+           now()
+    FROM generate_series(1, :snapshots) AS i
+    """,
+)
+
+
+class RecordedLlm:
+    """LLM-заглушка: отдаёт записанный в корпусе SQL с заданной задержкой."""
+
+    def __init__(
+        self, corpus: list[dict[str, Any]], llm_ms: float, llm_scale: float = 1.0
+    ) -> None:
+        self._entries = {entry["question"].strip(): entry for entry in corpus}
+        self._llm_ms = llm_ms
+        self._llm_scale = llm_scale
+
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        entry = self._entries.get(messages[-1]["text"])
+        if entry is None:
+            raise LlmClientError("Вопроса нет в корпусе")
+
+        # Задержка из корпуса (llm_time_to_sql_ms из логов), иначе --llm-ms.
+        delay_ms = float(entry.get("llm_ms", self._llm_ms)) * self._llm_scale
+        if delay_ms > 0:
+            await asyncio.sleep(random.uniform(0.8, 1.2) * delay_ms / 1000)
+        return str(entry["sql"])
+
+
+async def _seed(engine: AsyncEngine, videos: int, snapshots: int, days: int) -> None:
+    started = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {_SCHEMA}"))
+
+    async with engine.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        session = AsyncSession(bind=connection)
+        params = {
+            "videos": videos,
+            "snapshots": snapshots,
+            "creators": max(1, videos // 50),
+            "days": days,
+            "start": _START,
+        }
+        for statement in _FILL:
+            await session.execute(text(statement), params)
+        await refresh_daily_rollups(
+            session, first_day=_START, last_day=_START + timedelta(days=days)
+        )
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+    print(
+        f"seeded videos={videos} snapshots={snapshots} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+async def _replay(
+    corpus: list[dict[str, Any]],
+    llm: RecordedLlm,
+    session_maker: async_sessionmaker[AsyncSession],
+    cost_guard: CostGuard,
+    question_cache: QuestionSqlCache,
+    rounds: int,
+    concurrency: int,
+) -> tuple[dict[str, list[float]], int, float]:
+    stages: dict[str, list[float]] = {stage: [] for stage in _STAGES}
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(question: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # Как в боте: сначала кэш вопрос -> SQL, на промахе — LLM.
+                sql = question_cache.lookup(question)
+                cache_done = prompt_done = llm_done = time.perf_counter()
+                missed = sql is None
+                if sql is None:
+                    messages = build_messages(question)
+                    prompt_done = time.perf_counter()
+                    sql = await llm.request_llm(messages)
+                    llm_done = time.perf_counter()
+                    question_cache.store(question, sql)
+                await execute_sql(
+                    sql,
+                    session_maker=session_maker,
+                    cost_guard=cost_guard,
+                    parameterize=True,
+                )
+            except (LlmClientError, ModuleError, SQLAlchemyError) as exc:
+                errors += 1
+                print(f"error question={question!r}: {exc}")
+                return
+
+            finished = time.perf_counter()
+            stages["cache"].append((cache_done - started) * 1000)
+            if missed:
+                stages["prompt"].append((prompt_done - cache_done) * 1000)
+                stages["llm"].append((llm_done - prompt_done) * 1000)
+            stages["sql"].append((finished - llm_done) * 1000)
+            stages["total"].append((finished - started) * 1000)
+
+    questions = [entry["question"] for entry in corpus] * rounds
+    random.shuffle(questions)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(question) for question in questions))
+    return stages, errors, time.perf_counter() - started
+
+
+async def main(
+    corpus_path: Path,
+    baseline_path: Path,
+    save_baseline: bool,
+    tolerance: float,
+    rounds: int,
+    concurrency: int,
+    llm_ms: float,
+    llm_scale: float,
+    videos: int,
+    snapshots: int,
+    days: int,
+    question_cache_size: int = 0,
+) -> int:
+    # Без базы сравнивать не с чем: это ошибка, а не зелёный прогон.
+    if not save_baseline and not baseline_path.exists():
+        print(f"no baseline at {baseline_path}, run with --save-baseline first")
+        return 1
+
+    corpus = load_corpus(corpus_path)
+    settings = get_settings()
+    engine = build_engine(settings.database_url, 3600, pool_size=concurrency)
+
+    @event.listens_for(engine.sync_engine, "connect", insert=True)
+    def _set_search_path(dbapi_connection: Any, connection_record: Any) -> None:
+        # SET вне транзакции, иначе откат при возврате в пул его отменит.
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {_SCHEMA}")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+    try:
+        await _seed(engine, videos, snapshots, days)
+        session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+        llm = RecordedLlm(corpus, llm_ms=llm_ms, llm_scale=llm_scale)
+        cost_guard = CostGuard()
+        # По умолчанию кэш пуст (size=0): каждый вопрос идёт в LLM, а стадия
+        # cache меряет только нормализацию вопроса на промахе.
+        question_cache = QuestionSqlCache(max_size=question_cache_size)
+
+        # Прогрев: пул соединений, prepared statements, кэш EXPLAIN.
+        await _replay(
+            corpus, llm, session_maker, cost_guard, question_cache, 1, concurrency
+        )
+        stages, errors, elapsed = await _replay(
+            corpus, llm, session_maker, cost_guard, question_cache, rounds, concurrency
+        )
+
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA {_SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
+
+    answered = len(stages["total"])
+    throughput = answered / elapsed if elapsed else 0.0
+    print(
+        f"questions={len(corpus)} rounds={rounds} answered={answered} "
+        f"errors={errors} throughput={throughput:.1f} answers/s"
+    )
+    for stage in _STAGES:
+        print(format_latency(stage, stages[stage]))
+    for stage in _STAGES:
+        print(format_histogram(stage, stages[stage]))
+
+    current = {
+        "stages": {stage: summarize(stages[stage]) for stage in _STAGES},
+        "histograms": {stage: histogram(stages[stage]) for stage in _STAGES},
+        "throughput": round(throughput, 2),
+        "params": {
+            "rounds": rounds,
+            "concurrency": concurrency,
+            "llm_ms": llm_ms,
+            "llm_scale": llm_scale,
+            "videos": videos,
+            "snapshots": snapshots,
+            "days": days,
+            "question_cache_size": question_cache_size,
+        },
+    }
+
+    if save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"baseline saved to {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("params") != current["params"]:
+        print("warning: baseline was recorded with different parameters")
+
+    regressions = find_regressions(current, baseline, tolerance=tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"no regressions against {baseline_path} (tolerance {tolerance:.0%})")
+    return 1 if regressions or errors else 0
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--baseline", type=Path, default=_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-ms", type=float, default=0)
+    parser.add_argument("--llm-scale", type=float, default=1.0)
+    parser.add_argument("--videos", type=int, default=100_000)
+    parser.add_argument("--snapshots", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--question-cache-size", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_replay --save-baseline
+    # python -m scripts.bench_replay --tolerance 0.2
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    sys.exit(
+        asyncio.run(
+            main(
+                corpus_path=args.corpus,
+                baseline_path=args.baseline,
+                save_baseline=args.save_baseline,
+                tolerance=args.tolerance,
+                rounds=args.rounds,
+                concurrency=args.concurrency,
+                llm_ms=args.llm_ms,
+                llm_scale=args.llm_scale,
+                videos=args.videos,
+                snapshots=args.snapshots,
+                days=args.days,
+                question_cache_size=args.question_cache_size,
+            )
+        )
+    )
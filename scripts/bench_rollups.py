@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.db.rollups import refresh_daily_rollups
+from app.db.session import build_engine
+from scripts._bench import format_latency
+
+_SCHEMA = "bench_rollups"
+_START = date(2025, 1, 1)
+
+_CREATE_SCHEMA = (
+    f"DROP SCHEMA IF EXISTS {_SCHEMA} CASCADE",
+    f"CREATE SCHEMA {_SCHEMA}",
+    f"SET search_path TO {_SCHEMA}",
+)
+
+_CREATE_TABLES = (
+    """
+    CREATE TABLE video_snapshots (
+        video_id uuid NOT NULL,
+        delta_views_count int NOT NULL,
+        delta_likes_count int NOT NULL,
+        delta_comments_count int NOT NULL,
+        delta_reports_count int NOT NULL,
+        created_at timestamptz NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE video_daily_stats (
+        video_id uuid NOT NULL,
+        day date NOT NULL,
+        delta_views_count bigint NOT NULL,
+        delta_likes_count bigint NOT NULL,
+        delta_comments_count bigint NOT NULL,
+        delta_reports_count bigint NOT NULL,
+        PRIMARY KEY (video_id, day)
+    )
+    """,
+    """
+    CREATE TABLE daily_stats (
+        day date PRIMARY KEY,
+        delta_views_count bigint NOT NULL,
+        delta_likes_count bigint NOT NULL,
+        delta_comments_count bigint NOT NULL,
+        delta_reports_count bigint NOT NULL
+    )
+    """,
+)
+
+_FILL_SNAPSHOTS = text(
+    """
+    INSERT INTO video_snapshots
+    SELECT md5((i % :videos)::text)::uuid,
+           (i * 7) % 50, (i * 3) % 5, i % 3, (i % 97 = 0)::int,
+           CAST(:start AS timestamptz)
+               + ((i / :videos) % (:days * 24)) * interval '1 hour'
+    FROM generate_series(1, :rows) AS i
+    """
+)
+
+_QUERIES = {
+    "raw video_snapshots": (
+        "SELECT COALESCE(sum(delta_views_count), 0) AS value "
+        "FROM video_snapshots WHERE created_at::date = CAST(:day AS date)"
+    ),
+    "daily_stats rollup": (
+        "SELECT COALESCE(sum(delta_views_count), 0) AS value "
+        "FROM daily_stats WHERE day = CAST(:day AS date)"
+    ),
+}
+
+
+async def _prepare(session: AsyncSession, rows: int, days: int) -> None:
+    videos = max(1, rows // (days * 24))
+
+    started = time.perf_counter()
+    await session.execute(
+        _FILL_SNAPSHOTS,
+        {"videos": videos, "days": days, "rows": rows, "start": _START},
+    )
+    await session.execute(
+        text("CREATE INDEX ON video_snapshots (created_at)"),
+    )
+    await refresh_daily_rollups(
+        session, first_day=_START, last_day=_START + timedelta(days=days)
+    )
+    await session.execute(text("ANALYZE"))
+    print(
+        f"prepared rows={rows} videos={videos} in {time.perf_counter() - started:.1f}s"
+    )
+
+
+async def main(rows: int, days: int, repeats: int) -> None:
+    settings = get_settings()
+    engine = build_engine(settings.database_url, db_timeout_seconds=3600)
+
+    try:
+        async with engine.connect() as connection:
+            session = AsyncSession(bind=connection)
+            for statement in (*_CREATE_SCHEMA, *_CREATE_TABLES):
+                await session.execute(text(statement))
+            await _prepare(session, rows, days)
+            await session.commit()
+
+            for name, sql in _QUERIES.items():
+                latencies: list[float] = []
+                for i in range(repeats):
+                    day = _START + timedelta(days=i % days)
+                    started = time.perf_counter()
+                    await session.execute(text(sql), {"day": day})
+                    latencies.append((time.perf_counter() - started) * 1000)
+                print(format_latency(name, latencies))
+
+            await session.execute(text(f"DROP SCHEMA {_SCHEMA} CASCADE"))
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_rollups --rows 10000000
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    asyncio.run(main(rows=args.rows, days=args.days, repeats=args.repeats))
@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientSession, TCPConnector, web
+
+from app.bot.pipeline import RequestPipeline
+from app.bot.router import router
+from app.bot.webhook import build_webhook_app
+from scripts._bench import format_latency
+
+SECRET = "bench-secret"
+
+
+async def _send_message(request: web.Request) -> web.Response:
+    # Заглушка Bot API: подтверждаем sendMessage, не уходя в сеть.
+    data = await request.post()
+    return web.json_response(
+        {
+            "ok": True,
+            "result": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": int(str(data.get("chat_id", 0))), "type": "private"},
+                "text": str(data.get("text", "")),
+            },
+        }
+    )
+
+
+async def _start(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def _update(update_id: int, chat_id: int) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "bench"},
+            "text": "Сколько всего видео есть в системе?",
+        },
+    }
+
+
+async def main(
+    updates: int, chats: int, concurrency: int, llm_ms: float, sql_ms: float
+) -> None:
+    api = web.Application()
+    api.router.add_post("/bot{token}/sendMessage", _send_message)
+    api_runner, api_url = await _start(api)
+
+    async def llm_request(messages: list[dict[str, str]]) -> str:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * llm_ms / 1000)
+        return "SELECT COUNT(*) FROM videos"
+
+    async def sql_execute(sql: str) -> int:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * sql_ms / 1000)
+        return 1
+
+    dispatcher = Dispatcher(
+        llm_request=llm_request,
+        sql_execute=sql_execute,
+        question_cache=None,
+        pipeline=RequestPipeline(max_in_flight=64, max_pending=updates),
+    )
+    dispatcher.include_router(router)
+    bot = Bot(
+        token="42:BENCH",
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)),
+    )
+    webhook_runner, webhook_url = await _start(
+        build_webhook_app(dispatcher, bot, path="/webhook", secret_token=SECRET)
+    )
+
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+
+        async def post(update_id: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(
+                    f"{webhook_url}/webhook",
+                    json=_update(update_id, update_id % chats),
+                    headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+                ) as response:
+                    await response.read()
+                    response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, updates + 1)))
+        elapsed = time.perf_counter() - started
+
+    await webhook_runner.cleanup()
+    await bot.session.close()
+    await api_runner.cleanup()
+
+    print(
+        f"updates={updates} chats={chats} concurrency={concurrency} "
+        f"throughput={updates / elapsed:.0f} updates/s"
+    )
+    print(format_latency("webhook_ack", latencies))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--llm-ms", type=float, default=50)
+    parser.add_argument("--sql-ms", type=float, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # python -m scripts.bench_webhook --updates 5000 --concurrency 100
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    args = _parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(
+        main(
+            updates=args.updates,
+            chats=args.chats,
+            concurrency=args.concurrency,
+            llm_ms=args.llm_ms,
+            sql_ms=args.sql_ms,
+        )
+    )
@@ -1,17 +1,26 @@
 import argparse
 import asyncio
 import json
+import re
+import time
 import uuid
 import sys
-from datetime import datetime
+from collections import deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO, cast
 
-from sqlalchemy import insert, select, text
+from sqlalchemy import CursorResult, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
+from app.db.cache import bump_data_version
 from app.db.models import Video, VideoSnapshot
-from app.db.session import session_factory
+from app.db.rollups import refresh_daily_rollups
+from app.db.session import get_session_factory
 
 
 def _parse_uuid(value: str) -> uuid.UUID:
@@ -22,8 +31,111 @@ def _parse_dt(value: str) -> datetime:
     return datetime.fromisoformat(value)
 
 
-def _chunked(items: list[dict[str, Any]], size: int) -> list[list[dict[str, Any]]]:
-    return [items[i : i + size] for i in range(0, len(items), size)]
+_VIDEO_COPY_TYPES: dict[str, str] = {
+    "id": "uuid",
+    "creator_id": "text",
+    "video_created_at": "timestamptz",
+    "views_count": "int4",
+    "likes_count": "int4",
+    "comments_count": "int4",
+    "reports_count": "int4",
+    "created_at": "timestamptz",
+    "updated_at": "timestamptz",
+}
+_SNAPSHOT_COPY_TYPES: dict[str, str] = {
+    "id": "uuid",
+    "video_id": "uuid",
+    "views_count": "int4",
+    "likes_count": "int4",
+    "comments_count": "int4",
+    "reports_count": "int4",
+    "delta_views_count": "int4",
+    "delta_likes_count": "int4",
+    "delta_comments_count": "int4",
+    "delta_reports_count": "int4",
+    "created_at": "timestamptz",
+    "updated_at": "timestamptz",
+}
+
+_VIDEOS_ARRAY_START = re.compile(r'"videos"\s*:\s*\[')
+_WHITESPACE = re.compile(r"[\s,]*")
+_READ_CHUNK_SIZE = 1 << 20
+
+
+def _iter_json_array(
+    stream: TextIO, chunk_size: int = _READ_CHUNK_SIZE
+) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    while True:
+        match = _VIDEOS_ARRAY_START.search(buffer)
+        if match is not None:
+            position = match.end()
+            break
+        if eof:
+            raise ValueError("Ожидается JSON формата {'videos': [...]}")
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        # Хвост оставляем на случай, если ключ разрезан границей чанка.
+        buffer = buffer[-16:] + chunk
+
+    read_size = chunk_size
+    while True:
+        separator = _WHITESPACE.match(buffer, position)
+        if separator is not None:
+            position = separator.end()
+
+        if position < len(buffer) and buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            # Элемент больше чанка: читаем всё более крупными порциями,
+            # чтобы не декодировать его заново на каждом маленьком куске.
+            read_size *= 2
+            continue
+
+        yield item
+        position = end
+        read_size = chunk_size
+
+        if position >= chunk_size:
+            buffer = buffer[position:]
+            position = 0
+
+
+def _iter_videos(path: Path) -> Iterator[dict[str, Any]]:
+    with path.open(encoding="utf-8") as stream:
+        for video in _iter_json_array(stream):
+            if not isinstance(video, dict):
+                raise ValueError("Ожидается JSON формата {'videos': [{...}]}")
+            yield video
+
+
+def _iter_raw_batches(
+    videos: Iterable[dict[str, Any]], size: int
+) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    snapshots = 0
+
+    for video in videos:
+        batch.append(video)
+        snapshots += len(video.get("snapshots", []))
+        if len(batch) >= size or snapshots >= size:
+            yield batch
+            batch, snapshots = [], 0
+
+    if batch:
+        yield batch
 
 
 def _build_video_row(raw: dict[str, Any]) -> dict[str, Any]:
@@ -57,41 +169,322 @@ def _build_videosnapshot_row(raw: dict[str, Any]) -> dict[str, Any]:
     }
 
 
-async def load_data(path: Path, batch_size: int, truncate: bool):
-    payload = json.loads(path.read_text(encoding="utf-8"))
-    videos_raw_from_json = payload.get("videos")
-    if not isinstance(videos_raw_from_json, list):
-        raise ValueError("Ожидается JSON формата {'videos': {...}")
+@dataclass
+class ParsedBatch:
+    videos: list[Any]
+    snapshots: list[Any]
+    first_snapshot_at: datetime | None = None
+    last_snapshot_at: datetime | None = None
+
+
+def _parse_batch(raw_videos: list[dict[str, Any]], copy_rows: bool) -> ParsedBatch:
+    batch = ParsedBatch(videos=[], snapshots=[])
+
+    for raw in raw_videos:
+        video = _build_video_row(raw)
+        batch.videos.append(
+            tuple(video[name] for name in _VIDEO_COPY_TYPES) if copy_rows else video
+        )
+
+        for raw_snapshot in raw.get("snapshots", []):
+            snapshot = _build_videosnapshot_row(raw_snapshot)
+            created_at = snapshot["created_at"]
+            if batch.first_snapshot_at is None or created_at < batch.first_snapshot_at:
+                batch.first_snapshot_at = created_at
+            if batch.last_snapshot_at is None or created_at > batch.last_snapshot_at:
+                batch.last_snapshot_at = created_at
+            batch.snapshots.append(
+                tuple(snapshot[name] for name in _SNAPSHOT_COPY_TYPES)
+                if copy_rows
+                else snapshot
+            )
+
+    return batch
+
+
+async def _iter_parsed_batches(
+    raw_batches: Iterable[list[dict[str, Any]]], workers: int, copy_rows: bool
+) -> AsyncIterator[ParsedBatch]:
+    if workers <= 1:
+        for raw_batch in raw_batches:
+            yield _parse_batch(raw_batch, copy_rows)
+        return
+
+    # Парсинг UUID/дат уходит в процессы, а пока вызывающий код пишет
+    # очередную пачку в БД, воркеры разбирают следующие. Очередь ограничена,
+    # чтобы память не росла, если БД медленнее парсинга.
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[asyncio.Future[ParsedBatch]] = deque()
+        for raw_batch in raw_batches:
+            pending.append(
+                loop.run_in_executor(pool, _parse_batch, raw_batch, copy_rows)
+            )
+            if len(pending) >= workers * 2:
+                yield await pending.popleft()
+
+        while pending:
+            yield await pending.popleft()
+
+
+@dataclass
+class LoadStats:
+    videos: int = 0
+    snapshots: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.videos + self.snapshots
+        return rows / self.seconds if self.seconds else 0.0
+
+
+class _InsertWriter:
+    copy_rows = False
+
+    async def prepare(self, session: AsyncSession) -> None:
+        pass
+
+    async def write(
+        self, session: AsyncSession, batch: ParsedBatch, stats: LoadStats
+    ) -> None:
+        stats.inserted += len(batch.videos) + len(batch.snapshots)
+        if batch.videos:
+            await session.execute(insert(Video), batch.videos)
+        if batch.snapshots:
+            await session.execute(insert(VideoSnapshot), batch.snapshots)
+
+    async def finish(self, session: AsyncSession) -> None:
+        pass
+
 
-    video_row: list[dict[str, Any]] = []
-    snapshot_rows: list[dict[str, Any]] = []
+class _CopyWriter:
+    # Строки идут через COPY ... FORMAT BINARY в temp-таблицы, а в основные
+    # таблицы переносятся одним INSERT ... SELECT в конце транзакции.
+    _STAGING = (
+        ("videos_staging", "videos", _VIDEO_COPY_TYPES),
+        ("video_snapshots_staging", "video_snapshots", _SNAPSHOT_COPY_TYPES),
+    )
+
+    copy_rows = True
+
+    async def prepare(self, session: AsyncSession) -> None:
+        for staging, table, _ in self._STAGING:
+            await session.execute(
+                text(
+                    f"CREATE TEMP TABLE {staging} "
+                    f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+            )
+
+    async def write(
+        self, session: AsyncSession, batch: ParsedBatch, stats: LoadStats
+    ) -> None:
+        stats.inserted += len(batch.videos) + len(batch.snapshots)
+        await self._copy_to_staging(session, batch)
+
+    async def _copy_to_staging(self, session: AsyncSession, batch: ParsedBatch) -> None:
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection: Any = raw_connection.driver_connection
+
+        for (staging, _, types), rows in zip(
+            self._STAGING, (batch.videos, batch.snapshots)
+        ):
+            if not rows:
+                continue
+            columns = ", ".join(types)
+            async with (
+                driver_connection.cursor() as cursor,
+                cursor.copy(
+                    f"COPY {staging} ({columns}) FROM STDIN (FORMAT BINARY)"
+                ) as copy,
+            ):
+                copy.set_types(list(types.values()))
+                for row in rows:
+                    await copy.write_row(row)
+
+    async def finish(self, session: AsyncSession) -> None:
+        for staging, table, types in self._STAGING:
+            columns = ", ".join(types)
+            await session.execute(
+                text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging}")
+            )
+
+
+_VIDEO_COLUMNS = ", ".join(_VIDEO_COPY_TYPES)
+_SNAPSHOT_COLUMNS = ", ".join(_SNAPSHOT_COPY_TYPES)
+
+# Один id может прийти в пачке дважды, а ON CONFLICT DO UPDATE не трогает
+# строку второй раз — из staging берём только самую свежую версию видео.
+_UPSERT_VIDEOS = text(
+    f"""
+    INSERT INTO videos ({_VIDEO_COLUMNS})
+    SELECT DISTINCT ON (id) {_VIDEO_COLUMNS} FROM videos_staging
+    ORDER BY id, updated_at DESC
+    ON CONFLICT (id) DO UPDATE SET
+    {", ".join(f"{name} = EXCLUDED.{name}" for name in list(_VIDEO_COPY_TYPES)[1:])}
+    WHERE videos.updated_at < EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS inserted
+    """
+)
+_APPEND_SNAPSHOTS = text(
+    f"""
+    INSERT INTO video_snapshots ({_SNAPSHOT_COLUMNS})
+    SELECT {", ".join(f"s.{name}" for name in _SNAPSHOT_COPY_TYPES)}
+    FROM video_snapshots_staging s
+    LEFT JOIN video_snapshot_watermarks w ON w.video_id = s.video_id
+    WHERE w.last_created_at IS NULL OR s.created_at > w.last_created_at
+    ON CONFLICT (id) DO NOTHING
+    """
+)
+
+_WATERMARKS_UPSERT = """
+    ON CONFLICT (video_id) DO UPDATE
+    SET last_created_at = GREATEST(
+        video_snapshot_watermarks.last_created_at, EXCLUDED.last_created_at
+    )
+"""
+_UPDATE_WATERMARKS_FROM_STAGING = text(
+    "INSERT INTO video_snapshot_watermarks (video_id, last_created_at) "
+    "SELECT video_id, max(created_at) FROM video_snapshots_staging "
+    "GROUP BY video_id" + _WATERMARKS_UPSERT
+)
+_REBUILD_WATERMARKS = text(
+    "INSERT INTO video_snapshot_watermarks (video_id, last_created_at) "
+    "SELECT video_id, max(created_at) FROM video_snapshots "
+    "GROUP BY video_id" + _WATERMARKS_UPSERT
+)
+
+
+class _IncrementalWriter(_CopyWriter):
+    # Каждая пачка проходит через staging и сразу сливается в основные
+    # таблицы: видео обновляются по id, если пришла более свежая версия,
+    # а замеры добавляются только новее high-water mark видео.
+    async def write(
+        self, session: AsyncSession, batch: ParsedBatch, stats: LoadStats
+    ) -> None:
+        await self._copy_to_staging(session, batch)
+
+        if batch.videos:
+            result = await session.execute(_UPSERT_VIDEOS)
+            flags = result.scalars().all()
+            inserted = sum(1 for flag in flags if flag)
+            stats.inserted += inserted
+            stats.updated += len(flags) - inserted
+            stats.skipped += len(batch.videos) - len(flags)
+
+        if batch.snapshots:
+            appended_result = cast(
+                CursorResult[Any], await session.execute(_APPEND_SNAPSHOTS)
+            )
+            appended = appended_result.rowcount or 0
+            stats.inserted += appended
+            stats.skipped += len(batch.snapshots) - appended
+            await session.execute(_UPDATE_WATERMARKS_FROM_STAGING)
+
+        await session.execute(
+            text("TRUNCATE TABLE videos_staging, video_snapshots_staging")
+        )
+
+    async def finish(self, session: AsyncSession) -> None:
+        pass
+
+
+_WRITERS: dict[str, type[_InsertWriter | _CopyWriter]] = {
+    "insert": _InsertWriter,
+    "copy": _CopyWriter,
+    "incremental": _IncrementalWriter,
+}
 
-    for video in videos_raw_from_json:
-        video_row.append(_build_video_row(video))
-        for snap in video.get("snapshots", []):
-            snapshot_rows.append(_build_videosnapshot_row(snap))
 
+async def load_data(
+    path: Path,
+    batch_size: int,
+    truncate: bool,
+    mode: str = "insert",
+    workers: int = 1,
+) -> LoadStats:
+    writer = _WRITERS[mode]()
+    incremental = isinstance(writer, _IncrementalWriter)
+    stats = LoadStats()
+    first_snapshot_at: datetime | None = None
+    last_snapshot_at: datetime | None = None
+
+    started = time.perf_counter()
+    session_factory = get_session_factory()
     async with session_factory() as session:
         async with session.begin():
-            if truncate:
+            if truncate and not incremental:
                 await session.execute(
                     text(
-                        "TRUNCATE TABLE video_snapshots, videos RESTART IDENTITY CASCADE"
+                        "TRUNCATE TABLE daily_stats, video_daily_stats, "
+                        "video_snapshot_watermarks, video_snapshots, videos "
+                        "RESTART IDENTITY CASCADE"
                     )
                 )
 
-            for batch in _chunked(video_row, batch_size):
-                await session.execute(insert(Video), batch)
+            await writer.prepare(session)
+
+            batches = _iter_parsed_batches(
+                _iter_raw_batches(_iter_videos(path), batch_size),
+                workers=workers,
+                copy_rows=writer.copy_rows,
+            )
+            async for batch in batches:
+                await writer.write(session, batch, stats)
+                stats.videos += len(batch.videos)
+                stats.snapshots += len(batch.snapshots)
 
-            for batch in _chunked(snapshot_rows, batch_size):
-                await session.execute(insert(VideoSnapshot), batch)
+                if batch.first_snapshot_at is not None and (
+                    first_snapshot_at is None
+                    or batch.first_snapshot_at < first_snapshot_at
+                ):
+                    first_snapshot_at = batch.first_snapshot_at
+                if batch.last_snapshot_at is not None and (
+                    last_snapshot_at is None
+                    or batch.last_snapshot_at > last_snapshot_at
+                ):
+                    last_snapshot_at = batch.last_snapshot_at
+
+            await writer.finish(session)
+            if not incremental:
+                await session.execute(_REBUILD_WATERMARKS)
+
+            if first_snapshot_at is not None and last_snapshot_at is not None:
+                # День rollup — по UTC, а время в файле может идти с другим
+                # смещением, поэтому диапазон берём с запасом в день.
+                await refresh_daily_rollups(
+                    session,
+                    first_day=first_snapshot_at.date() - timedelta(days=1),
+                    last_day=last_snapshot_at.date() + timedelta(days=1),
+                )
+
+            data_version = await bump_data_version(session)
+
+        stats.seconds = time.perf_counter() - started
 
         videos_count = await session.scalar(select(func.count()).select_from(Video))
         snapshot_count = await session.scalar(
             select(func.count()).select_from(VideoSnapshot)
         )
 
-        print(f"Загружено в БД videos={videos_count}, snapshots={snapshot_count}")
+        print(
+            f"Загружено в БД videos={videos_count}, snapshots={snapshot_count}, "
+            f"data_version={data_version}"
+        )
+        print(
+            f"mode={mode} workers={workers} rows={stats.videos + stats.snapshots} "
+            f"time={stats.seconds:.2f}s rows/sec={stats.rows_per_second:.0f}"
+        )
+        print(
+            f"inserted={stats.inserted} updated={stats.updated} skipped={stats.skipped}"
+        )
+
+    return stats
 
 
 def _parse_args() -> argparse.Namespace:
@@ -102,6 +495,8 @@ def _parse_args() -> argparse.Namespace:
     parser.add_argument("--path", type=Path, default=default_path)
     parser.add_argument("--batch-size", type=int, default=1000)
     parser.add_argument("--no-truncate", dest="truncate", action="store_false")
+    parser.add_argument("--mode", choices=sorted(_WRITERS), default="insert")
+    parser.add_argument("--workers", type=int, default=1)
     parser.set_defaults(truncate=True)
     return parser.parse_args()
 
@@ -113,5 +508,11 @@ if __name__ == "__main__":
 
     args = _parse_args()
     asyncio.run(
-        load_data(path=args.path, batch_size=args.batch_size, truncate=args.truncate)
+        load_data(
+            path=args.path,
+            batch_size=args.batch_size,
+            truncate=args.truncate,
+            mode=args.mode,
+            workers=args.workers,
+        )
     )
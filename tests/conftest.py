@@ -1,8 +1,14 @@
 import asyncio
 import sys
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
 
 import pytest
+import pytest_asyncio
 from aiogram import Dispatcher
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.bot.router import router
 
@@ -15,3 +21,38 @@ def dispatcher() -> Dispatcher:
     dp = Dispatcher()
     dp.include_router(router)
     return dp
+
+
+@pytest_asyncio.fixture
+async def pg_session_maker() -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    # Для integration-тестов: пустые таблицы во временной схеме,
+    # чтобы не трогать данные в DATABASE_URL.
+    from app.core.settings import get_settings
+    from app.db.models import Base
+    from app.db.session import build_engine
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    engine = build_engine(get_settings().database_url)
+
+    @event.listens_for(engine.sync_engine, "connect", insert=True)
+    def _set_search_path(dbapi_connection: Any, connection_record: Any) -> None:
+        # SET вне транзакции, иначе откат при возврате в пул его отменит.
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {schema}")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text(f"CREATE SCHEMA {schema}"))
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        yield async_sessionmaker(bind=engine, expire_on_commit=False)
+
+        async with engine.begin() as connection:
+            await connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    finally:
+        await engine.dispose()
@@ -0,0 +1,104 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from app.db.rewrite import rewrite_date_predicates
+from app.db.validator import analyze_sql
+from app.llm.client import LlmClientError
+from app.llm.prompt import build_messages
+from scripts._bench import (
+    find_regressions,
+    format_histogram,
+    histogram,
+    load_corpus,
+    summarize,
+)
+from scripts.bench_replay import RecordedLlm, main
+
+
+def _run(sql_p99: float, throughput: float = 100.0) -> dict[str, Any]:
+    return {
+        "stages": {
+            "prompt": {"p50": 0.05, "p99": 0.1},
+            "sql": {"p50": 5.0, "p99": sql_p99},
+        },
+        "throughput": throughput,
+    }
+
+
+def test_corpus_sql_passes_validator() -> None:
+    corpus = load_corpus()
+    assert corpus
+
+    for entry in corpus:
+        analyze_sql(entry["sql"])
+        analyze_sql(rewrite_date_predicates(entry["sql"]))
+
+
+@pytest.mark.asyncio
+async def test_recorded_llm_replays_corpus_sql() -> None:
+    corpus = load_corpus()
+    llm = RecordedLlm(corpus, llm_ms=0)
+
+    for entry in corpus:
+        assert await llm.request_llm(build_messages(entry["question"])) == entry["sql"]
+
+    with pytest.raises(LlmClientError):
+        await llm.request_llm(build_messages("вопрос не из корпуса"))
+
+
+@pytest.mark.asyncio
+async def test_replay_fails_without_baseline(tmp_path: Path) -> None:
+    # Возврат до подключения к БД: PostgreSQL не нужен.
+    exit_code = await main(
+        corpus_path=Path("unused.jsonl"),
+        baseline_path=tmp_path / "replay.json",
+        save_baseline=False,
+        tolerance=0.2,
+        rounds=1,
+        concurrency=1,
+        llm_ms=0,
+        llm_scale=1.0,
+        videos=1,
+        snapshots=1,
+        days=1,
+    )
+
+    assert exit_code == 1
+
+
+def test_summarize_quantiles() -> None:
+    assert summarize([1.0, 2.0, 3.0, 4.0]) == {"p50": 2.0, "p99": 4.0}
+
+
+def test_histogram_counts_each_bucket_once() -> None:
+    counts = histogram([0.05, 0.3, 3.0, 5.0, 7000.0], buckets_ms=(1, 5, 5000))
+
+    assert counts == {"<=1ms": 2, "<=5ms": 2, "<=5000ms": 0, ">5000ms": 1}
+
+
+def test_format_histogram_skips_empty_buckets() -> None:
+    assert format_histogram("cache", [0.05, 0.07]) == "cache histogram: <=0.1ms:2"
+    assert format_histogram("llm", []) == "llm histogram: empty"
+
+
+def test_find_regressions_within_tolerance() -> None:
+    assert find_regressions(_run(11.0), _run(10.0), tolerance=0.2) == []
+
+
+def test_find_regressions_reports_slower_stage() -> None:
+    regressions = find_regressions(_run(20.0), _run(10.0), tolerance=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("sql p99 10.00ms -> 20.00ms")
+
+
+def test_find_regressions_ignores_sub_millisecond_noise() -> None:
+    current = _run(10.0)
+    current["stages"]["prompt"] = {"p50": 0.5, "p99": 0.9}
+    assert find_regressions(current, _run(10.0), tolerance=0.2) == []
+
+
+def test_find_regressions_reports_throughput_drop() -> None:
+    regressions = find_regressions(_run(10.0, 50.0), _run(10.0, 100.0))
+    assert regressions == ["throughput 100.0/s -> 50.0/s (-50%)"]
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import Any, cast
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.cost import CostGuard, PlanEstimate, SqlBudgetError, parse_explain
+
+CARTESIAN_PLAN = [
+    {
+        "Plan": {
+            "Node Type": "Aggregate",
+            "Total Cost": 9_000_000.0,
+            "Plan Rows": 1,
+            "Plans": [
+                {
+                    "Node Type": "Nested Loop",
+                    "Total Cost": 8_000_000.0,
+                    "Plan Rows": 400_000_000,
+                    "Plans": [
+                        {"Node Type": "Seq Scan", "Plan Rows": 20_000},
+                        {"Node Type": "Seq Scan", "Plan Rows": 20_000},
+                    ],
+                }
+            ],
+        }
+    }
+]
+
+
+class FakeResult:
+    def __init__(self, payload: Any) -> None:
+        self._payload = payload
+
+    def scalar_one(self) -> Any:
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, payload: Any) -> None:
+        self._payload = payload
+        self.statements: list[str] = []
+
+    async def execute(self, stmt: Any) -> FakeResult:
+        self.statements.append(str(stmt))
+        return FakeResult(self._payload)
+
+
+def test_parse_explain_uses_widest_node() -> None:
+    assert parse_explain(CARTESIAN_PLAN) == PlanEstimate(9_000_000.0, 400_000_000.0)
+
+
+@pytest.mark.asyncio
+async def test_cost_guard_rejects_and_caches_by_fingerprint() -> None:
+    session = FakeSession(CARTESIAN_PLAN)
+    guard = CostGuard(max_total_cost=10_000_000.0, max_plan_rows=1_000_000.0)
+
+    with pytest.raises(SqlBudgetError, match="строк"):
+        await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+    with pytest.raises(SqlBudgetError):
+        await guard.check(cast(AsyncSession, session), "select count(*)\nfrom videos")
+
+    assert session.statements == ["EXPLAIN (FORMAT JSON) SELECT count(*) FROM videos"]
+    assert guard.explains == 1
+    assert guard.cache_hits == 1
+    assert guard.rejected == 2
+
+
+@pytest.mark.asyncio
+async def test_cost_guard_allows_cheap_plan() -> None:
+    payload = '[{"Plan": {"Node Type": "Result", "Total Cost": 0.01, "Plan Rows": 1}}]'
+    guard = CostGuard()
+
+    estimate = await guard.check(
+        cast(AsyncSession, FakeSession(payload)), "SELECT 1 AS value"
+    )
+
+    assert estimate == PlanEstimate(0.01, 1.0)
+
+
+@pytest.mark.asyncio
+async def test_cost_guard_cache_is_keyed_by_data_version() -> None:
+    session = FakeSession(CARTESIAN_PLAN)
+    versions = [1]
+
+    async def load_version() -> int:
+        return versions[-1]
+
+    guard = CostGuard(
+        max_total_cost=10_000_000.0,
+        max_plan_rows=1_000_000_000.0,
+        load_version=load_version,
+        version_refresh_seconds=0.0,
+    )
+
+    await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+    await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+    versions.append(2)
+    await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+
+    assert (guard.explains, guard.cache_hits) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_cost_guard_explains_every_time_without_data_version() -> None:
+    session = FakeSession(CARTESIAN_PLAN)
+
+    async def load_version() -> int:
+        raise RuntimeError("relation data_version does not exist")
+
+    guard = CostGuard(
+        max_plan_rows=1_000_000_000.0, max_total_cost=1e9, load_version=load_version
+    )
+
+    await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+    await guard.check(cast(AsyncSession, session), "SELECT count(*) FROM videos")
+
+    assert (guard.explains, guard.cache_hits) == (2, 0)
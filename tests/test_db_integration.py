@@ -1,11 +1,16 @@
+import uuid
+from datetime import UTC, date, datetime
+from typing import Any
+
 import pytest
-from sqlalchemy import text
+from sqlalchemy import insert, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.core.settings import get_settings
+from app.db.models import Video, VideoSnapshot
+from app.db.rollups import refresh_daily_rollups
 from app.db.session import build_engine
 
-
 pytestmark = pytest.mark.integration
 
 
@@ -31,3 +36,107 @@ async def test_db_smoke() -> None:
         assert result.scalar_one() == 1
 
     await engine.dispose()
+
+
+def _snapshot_rows(video_id: uuid.UUID) -> list[dict[str, Any]]:
+    # Два замера в день с 1 по 4 ноября, один из них у полуночи UTC.
+    rows = []
+    for day in range(1, 5):
+        for hour, delta in ((0, day), (23, 10 * day)):
+            created_at = datetime(2025, 11, day, hour, 30, tzinfo=UTC)
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "video_id": video_id,
+                    "views_count": 0,
+                    "likes_count": 0,
+                    "comments_count": 0,
+                    "reports_count": 0,
+                    "delta_views_count": delta,
+                    "delta_likes_count": 1,
+                    "delta_comments_count": 0,
+                    "delta_reports_count": 0,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_refresh_daily_rollups_matches_snapshots(
+    pg_session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    created_at = datetime(2025, 11, 1, tzinfo=UTC)
+    video_ids = [uuid.uuid4() for _ in range(3)]
+    videos = [
+        {
+            "id": video_id,
+            "creator_id": f"creator-{index}",
+            "video_created_at": created_at,
+            "views_count": 0,
+            "likes_count": 0,
+            "comments_count": 0,
+            "reports_count": 0,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        for index, video_id in enumerate(video_ids)
+    ]
+
+    async with pg_session_maker() as session:
+        await session.execute(insert(Video), videos)
+        await session.execute(
+            insert(VideoSnapshot),
+            [row for video_id in video_ids for row in _snapshot_rows(video_id)],
+        )
+        # Устаревшая строка в диапазоне должна быть заменена, вне диапазона — остаться.
+        await session.execute(
+            text(
+                "INSERT INTO daily_stats VALUES "
+                "('2025-11-02', 999, 0, 0, 0), ('2025-11-04', 999, 0, 0, 0)"
+            )
+        )
+
+        await refresh_daily_rollups(
+            session, first_day=date(2025, 11, 1), last_day=date(2025, 11, 3)
+        )
+        await session.commit()
+
+        expected = (
+            await session.execute(
+                text(
+                    "SELECT created_at::date AS day, sum(delta_views_count), "
+                    "sum(delta_likes_count) FROM video_snapshots "
+                    "WHERE created_at::date BETWEEN '2025-11-01' AND '2025-11-03' "
+                    "GROUP BY 1 ORDER BY 1"
+                )
+            )
+        ).all()
+        daily = (
+            await session.execute(
+                text(
+                    "SELECT day, delta_views_count, delta_likes_count "
+                    "FROM daily_stats ORDER BY day"
+                )
+            )
+        ).all()
+        per_video = (
+            await session.execute(
+                text(
+                    "SELECT day, sum(delta_views_count), sum(delta_likes_count) "
+                    "FROM video_daily_stats GROUP BY day ORDER BY day"
+                )
+            )
+        ).all()
+        video_days = await session.scalar(
+            text("SELECT count(*) FROM video_daily_stats")
+        )
+
+    assert len(expected) == 3
+    assert [tuple(row) for row in daily] == [
+        *(tuple(row) for row in expected),
+        (date(2025, 11, 4), 999, 0),
+    ]
+    assert [tuple(row) for row in per_video] == [tuple(row) for row in expected]
+    assert video_days == 3 * 3
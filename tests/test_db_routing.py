@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any, cast
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.routing import ReadSessionRouter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSession:
+    def __init__(self, name: str, fail_connect: bool) -> None:
+        self.name = name
+        self._fail_connect = fail_connect
+        self.closed = False
+
+    async def connection(self) -> None:
+        if self._fail_connect:
+            raise OperationalError("SELECT 1", {}, OSError("connection refused"))
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeSessionMaker:
+    def __init__(self, name: str, fail_connect: bool = False) -> None:
+        self.name = name
+        self.fail_connect = fail_connect
+        self.kw: dict[str, Any] = {}
+        self.sessions: list[FakeSession] = []
+
+    def __call__(self) -> FakeSession:
+        session = FakeSession(self.name, self.fail_connect)
+        self.sessions.append(session)
+        return session
+
+
+def _maker(fake: FakeSessionMaker) -> async_sessionmaker[AsyncSession]:
+    return cast(async_sessionmaker[AsyncSession], fake)
+
+
+async def _target_name(router: ReadSessionRouter) -> str:
+    async with router() as session:
+        return cast(Any, session).name
+
+
+@pytest.mark.asyncio
+async def test_read_router_round_robins_replicas() -> None:
+    router = ReadSessionRouter(
+        _maker(FakeSessionMaker("primary")),
+        [
+            ("replica1", _maker(FakeSessionMaker("replica1"))),
+            ("replica2", _maker(FakeSessionMaker("replica2"))),
+        ],
+    )
+
+    names = [await _target_name(router) for _ in range(4)]
+
+    assert names == ["replica1", "replica2", "replica1", "replica2"]
+    assert router.stats()["replica1"]["checkouts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_read_router_falls_back_and_marks_replica_down() -> None:
+    clock = FakeClock()
+    replica = FakeSessionMaker("replica1", fail_connect=True)
+    router = ReadSessionRouter(
+        _maker(FakeSessionMaker("primary")),
+        [("replica1", _maker(replica))],
+        failure_threshold=2,
+        cooldown_seconds=30.0,
+        clock=clock,
+    )
+
+    names = [await _target_name(router) for _ in range(3)]
+
+    assert names == ["primary", "primary", "primary"]
+    assert len(replica.sessions) == 2
+    assert all(session.closed for session in replica.sessions)
+    assert router.stats()["replica1"]["healthy"] is False
+
+    replica.fail_connect = False
+    clock.now = 31.0
+    assert await _target_name(router) == "replica1"
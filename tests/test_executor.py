@@ -6,7 +6,9 @@ from typing import Any, cast
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.db.cache import ResultCache
 from app.db.executor import ScalarsError, SqlError, execute_sql
+from app.db.stats import QueryStats
 
 
 class FakeResult:
@@ -22,8 +24,11 @@ class FakeResult:
 
 
 class FakeSession:
-    def __init__(self, result: FakeResult) -> None:
+    def __init__(self, result: FakeResult, data_version: int = 1) -> None:
         self._result = result
+        self.data_version = data_version
+        self.executed = 0
+        self.statements: list[tuple[str, dict[str, Any] | None]] = []
 
     async def __aenter__(self) -> "FakeSession":
         return self
@@ -31,16 +36,26 @@ class FakeSession:
     async def __aexit__(self, exc_type, exc, tb) -> bool:
         return False
 
-    async def execute(self, stmt) -> FakeResult:
+    async def execute(self, stmt, params: dict[str, Any] | None = None) -> FakeResult:
+        self.executed += 1
+        self.statements.append((str(stmt), params))
         return self._result
 
+    async def scalar(self, stmt) -> int:
+        # Единственный scalar-запрос executor — версия данных.
+        return self.data_version
+
 
 class FakeSessionMaker:
-    def __init__(self, result: FakeResult) -> None:
+    def __init__(self, result: FakeResult, data_version: int = 1) -> None:
         self._result = result
+        self._data_version = data_version
+        self.sessions: list[FakeSession] = []
 
     def __call__(self) -> FakeSession:
-        return FakeSession(self._result)
+        session = FakeSession(self._result, self._data_version)
+        self.sessions.append(session)
+        return session
 
 
 def _session_maker(result: FakeResult) -> async_sessionmaker[AsyncSession]:
@@ -120,3 +135,116 @@ async def test_execute_sql_rejects_bool_result() -> None:
             "SELECT TRUE",
             session_maker=_session_maker(FakeResult(keys=["value"], rows=[(True,)])),
         )
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_uses_result_cache() -> None:
+    async def load_version() -> int:
+        return 1
+
+    maker = FakeSessionMaker(FakeResult(keys=["value"], rows=[(5,)]))
+    session_maker = cast(async_sessionmaker[AsyncSession], maker)
+    cache = ResultCache(load_version=load_version)
+
+    first = await execute_sql(
+        "SELECT count(*) FROM videos",
+        session_maker=session_maker,
+        result_cache=cache,
+    )
+    second = await execute_sql(
+        "select count(*)\nfrom videos",
+        session_maker=session_maker,
+        result_cache=cache,
+    )
+
+    assert first == second == 5
+    assert len(maker.sessions) == 1
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_skips_cache_store_from_lagging_replica() -> None:
+    async def load_version() -> int:
+        return 2
+
+    # Primary уже на версии 2, а реплика ещё отдаёт данные версии 1.
+    maker = FakeSessionMaker(FakeResult(keys=["value"], rows=[(5,)]), data_version=1)
+    cache = ResultCache(load_version=load_version)
+
+    for _ in range(2):
+        value = await execute_sql(
+            "SELECT count(*) FROM videos",
+            session_maker=cast(async_sessionmaker[AsyncSession], maker),
+            result_cache=cache,
+        )
+
+    assert value == 5
+    assert len(maker.sessions) == 2
+    assert cache.bytes_held == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_bypasses_cache_without_data_version() -> None:
+    async def load_version() -> int:
+        raise RuntimeError('relation "data_version" does not exist')
+
+    maker = FakeSessionMaker(FakeResult(keys=["value"], rows=[(5,)]))
+    cache = ResultCache(load_version=load_version)
+
+    value = await execute_sql(
+        "SELECT count(*) FROM videos",
+        session_maker=cast(async_sessionmaker[AsyncSession], maker),
+        result_cache=cache,
+    )
+
+    assert value == 5
+    assert cache.bytes_held == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_binds_literals_when_parameterized() -> None:
+    maker = FakeSessionMaker(FakeResult(keys=["value"], rows=[(3,)]))
+
+    value = await execute_sql(
+        "SELECT count(*) AS value FROM videos WHERE views_count > 100",
+        session_maker=cast(async_sessionmaker[AsyncSession], maker),
+        parameterize=True,
+    )
+
+    assert value == 3
+    assert maker.sessions[0].statements == [
+        ("SELECT COUNT(*) AS value FROM videos WHERE views_count > :p1", {"p1": 100})
+    ]
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_records_query_stats() -> None:
+    stats = QueryStats()
+    session_maker = _session_maker(FakeResult(keys=["value"], rows=[(1,)]))
+
+    for views in (100, 200):
+        await execute_sql(
+            f"SELECT count(*) FROM videos WHERE views_count > {views}",
+            session_maker=session_maker,
+            query_stats=stats,
+        )
+
+    (stat,) = stats.top()
+    assert stat.calls == 2
+    assert stat.query == "SELECT COUNT(*) FROM videos WHERE views_count > $1"
+    assert stat.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_records_failed_query_stats() -> None:
+    stats = QueryStats()
+
+    with pytest.raises(ScalarsError):
+        await execute_sql(
+            "SELECT 1, 2",
+            session_maker=_session_maker(FakeResult(keys=["a", "b"], rows=[(1, 2)])),
+            query_stats=stats,
+        )
+
+    (stat,) = stats.top()
+    assert (stat.calls, stat.errors) == (1, 1)
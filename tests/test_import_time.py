@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Без чего процесс не стартует: эти пакеты грузятся в любом случае.
+BOT_FLOOR = (
+    "aiogram",
+    "sqlalchemy.ext.asyncio",
+    "sqlalchemy.orm",
+    "sqlalchemy.dialects.postgresql",
+    "pydantic_settings",
+    "prometheus_client",
+    "sqlglot",
+)
+LOADER_FLOOR = (
+    "sqlalchemy.ext.asyncio",
+    "sqlalchemy.orm",
+    "sqlalchemy.dialects.postgresql",
+)
+
+# Бюджет: собственные модули проекта добавляют к обязательным зависимостям
+# не больше этой доли. Доля, а не миллисекунды, — чтобы не зависеть от CPU.
+OVERHEAD_BUDGET = 0.25
+
+
+def _import_profile(floor: tuple[str, ...], entrypoint: str) -> dict[str, int]:
+    # Отдельный процесс: в процессе pytest всё уже импортировано.
+    code = "".join(f"import {module}\n" for module in (*floor, entrypoint))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # "import time: self [us] | cumulative | imported package"; верхний
+    # уровень — строки без отступа перед именем модуля.
+    cumulative: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line.split("|")
+        cumulative.setdefault(name.strip(), 0)
+        if not name.startswith("  "):
+            cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def _overhead(
+    profile: dict[str, int], floor: tuple[str, ...], entrypoint: str
+) -> float:
+    floor_us = sum(profile.get(module, 0) for module in floor)
+    return profile[entrypoint] / floor_us
+
+
+def test_bot_import_stays_within_budget() -> None:
+    profile = _import_profile(BOT_FLOOR, "app.main")
+
+    # Только для webhook-режима и локального LLM-бэкенда.
+    for module in ("aiohttp.web", "app.bot.webhook", "app.llm.openai_compat"):
+        assert module not in profile
+    assert _overhead(profile, BOT_FLOOR, "app.main") <= OVERHEAD_BUDGET
+
+
+def test_loader_import_stays_within_budget() -> None:
+    profile = _import_profile(LOADER_FLOOR, "scripts.load_data")
+
+    # Загрузчику не нужны ни бот, ни HTTP-клиенты, ни разбор SQL.
+    for module in ("aiogram", "aiohttp", "sqlglot", "prometheus_client"):
+        assert module not in profile
+    assert _overhead(profile, LOADER_FLOOR, "scripts.load_data") <= OVERHEAD_BUDGET
@@ -0,0 +1,239 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.db.validator import analyze_sql
+from app.llm.backends import LlmRouter
+from app.llm.client import LlmClientError
+from app.llm.openai_compat import OpenAiCompatibleClient, OpenAiCompatibleConfig
+from app.llm.prompt import build_messages, build_rewrite_messages
+from app.llm.templates import TemplateSqlGenerator, generate_sql
+
+
+@pytest.mark.parametrize(
+    ("question", "expected"),
+    [
+        ("Сколько всего видео есть в системе?", "SELECT count(*) AS value FROM videos"),
+        (
+            (
+                "Сколько видео у креатора с id abc123 вышло с 1 ноября 2025 "
+                "по 5 ноября 2025 включительно?"
+            ),
+            (
+                "SELECT count(*) AS value FROM videos WHERE creator_id = 'abc123' "
+                "AND video_created_at::date BETWEEN '2025-11-01'::date "
+                "AND '2025-11-05'::date"
+            ),
+        ),
+        (
+            # id креатора регистрозависим: в SQL он идёт как есть.
+            (
+                "Сколько видео у креатора с id AbC123 вышло с 1 ноября 2025 "
+                "по 5 ноября 2025 включительно?"
+            ),
+            (
+                "SELECT count(*) AS value FROM videos WHERE creator_id = 'AbC123' "
+                "AND video_created_at::date BETWEEN '2025-11-01'::date "
+                "AND '2025-11-05'::date"
+            ),
+        ),
+        (
+            "Сколько видео набрало больше 100 000 просмотров за всё время?",
+            "SELECT count(*) AS value FROM videos WHERE views_count > 100000",
+        ),
+        (
+            "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+            (
+                "SELECT COALESCE(sum(delta_views_count), 0) AS value FROM daily_stats "
+                "WHERE day = '2025-11-28'::date"
+            ),
+        ),
+        (
+            "На сколько выросли лайки видео креатора abc с 1 по 5 ноября 2025",
+            (
+                "SELECT COALESCE(sum(s.delta_likes_count), 0) AS value "
+                "FROM video_daily_stats s JOIN videos v ON v.id = s.video_id "
+                "WHERE v.creator_id = 'abc' "
+                "AND s.day BETWEEN '2025-11-01'::date AND '2025-11-05'::date"
+            ),
+        ),
+        (
+            "Сколько разных видео получали новые просмотры 27 ноября 2025?",
+            (
+                "SELECT count(DISTINCT s.video_id) AS value FROM video_snapshots s "
+                "WHERE s.created_at::date = '2025-11-27'::date "
+                "AND s.delta_views_count > 0"
+            ),
+        ),
+    ],
+)
+def test_generate_sql_known_shapes(question: str, expected: str) -> None:
+    sql = generate_sql(question)
+    assert sql == expected
+    analyze_sql(sql)
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Какое среднее число просмотров у видео?",
+        "Сколько видео набрало больше 100 просмотров и 10 лайков?",
+        "Какой креатор самый популярный?",
+        # Конец периода раньше начала.
+        "Сколько видео вышло с 5 ноября 2025 по 1 ноября 2025?",
+        # «до» без «включительно»: граница неоднозначна.
+        "На сколько выросли лайки всех видео с 1 до 5 ноября 2025",
+        # Несуществующая дата: не шаблон с '2025-02-31', а вопрос для LLM.
+        "На сколько просмотров в сумме выросли все видео 31.02.2025?",
+        "На сколько просмотров в сумме выросли все видео 31 февраля 2025?",
+    ],
+)
+def test_generate_sql_declines_unknown_shapes(question: str) -> None:
+    assert generate_sql(question) is None
+
+
+def test_generate_sql_until_inclusive() -> None:
+    assert generate_sql(
+        "На сколько выросли лайки всех видео с 1 до 5 ноября 2025 включительно"
+    ) == (
+        "SELECT COALESCE(sum(delta_likes_count), 0) AS value FROM daily_stats "
+        "WHERE day BETWEEN '2025-11-01'::date AND '2025-11-05'::date"
+    )
+
+
+def test_template_generator_skips_rewrite_dialog() -> None:
+    generator = TemplateSqlGenerator()
+    question = "Сколько всего видео?"
+
+    assert generator.generate(build_messages(question)) is not None
+    assert generator.generate(build_rewrite_messages(question, "SELECT 1", "x")) is None
+    assert generator.hits == 1
+
+
+class FakeBackend:
+    def __init__(self, name: str, calls: list[str], delay: float = 0.0) -> None:
+        self.name = name
+        self.calls = calls
+        self.delay = delay
+        self.fail = False
+
+    async def request_llm(self, messages: list[dict[str, str]]) -> str:
+        self.calls.append(self.name)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise LlmClientError(f"{self.name} down")
+        return f"SELECT '{self.name}'"
+
+
+@pytest.mark.asyncio
+async def test_router_answers_known_question_locally() -> None:
+    calls: list[str] = []
+    remote = FakeBackend("remote", calls)
+    llm_router = LlmRouter(
+        [("remote", remote.request_llm)], templates=TemplateSqlGenerator()
+    )
+
+    sql = await llm_router.request_llm(build_messages("Сколько всего видео?"))
+
+    assert sql == "SELECT count(*) AS value FROM videos"
+    assert calls == []
+    assert llm_router.stats()["template"]["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_faster_backend() -> None:
+    calls: list[str] = []
+    slow = FakeBackend("slow", calls, delay=0.05)
+    fast = FakeBackend("fast", calls)
+    llm_router = LlmRouter(
+        [("slow", slow.request_llm), ("fast", fast.request_llm)], explore_every=0
+    )
+    messages = build_messages("Какой креатор самый популярный?")
+
+    for _ in range(3):
+        await llm_router.request_llm(messages)
+
+    # Сначала каждый бэкенд пробуется по разу, затем выбирается быстрый.
+    assert calls == ["slow", "fast", "fast"]
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_on_failure() -> None:
+    calls: list[str] = []
+    primary = FakeBackend("primary", calls)
+    backup = FakeBackend("backup", calls)
+    primary.fail = True
+    llm_router = LlmRouter(
+        [("primary", primary.request_llm), ("backup", backup.request_llm)]
+    )
+
+    assert await llm_router.request_llm([]) == "SELECT 'backup'"
+    assert await llm_router.request_llm([]) == "SELECT 'backup'"
+
+    # Упавший бэкенд получает штраф к задержке и уходит в конец очереди.
+    assert calls == ["primary", "backup", "backup"]
+    assert llm_router.stats()["primary"]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_router_raises_last_error_when_all_fail() -> None:
+    calls: list[str] = []
+    only = FakeBackend("only", calls)
+    only.fail = True
+    llm_router = LlmRouter([("only", only.request_llm)])
+
+    with pytest.raises(LlmClientError, match="only down"):
+        await llm_router.request_llm([])
+
+
+class OpenAiStub:
+    def __init__(self) -> None:
+        self.payloads: list[dict[str, object]] = []
+        self.headers: list[str] = []
+
+    async def chat(self, request: web.Request) -> web.Response:
+        self.payloads.append(await request.json())
+        self.headers.append(request.headers.get("Authorization", ""))
+        return web.json_response(
+            {
+                "choices": [{"message": {"content": "```sql\nSELECT 1;\n```"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 3},
+            }
+        )
+
+
+@pytest_asyncio.fixture
+async def openai_stub() -> AsyncIterator[tuple[OpenAiStub, str]]:
+    stub = OpenAiStub()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub.chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield stub, f"http://127.0.0.1:{runner.addresses[0][1]}/v1/"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_client(
+    openai_stub: tuple[OpenAiStub, str],
+) -> None:
+    stub, base_url = openai_stub
+    client = OpenAiCompatibleClient(
+        OpenAiCompatibleConfig(base_url=base_url, model="qwen", api_key="secret")
+    )
+    try:
+        sql = await client.request_llm([{"role": "user", "text": "?"}])
+    finally:
+        await client.close()
+
+    assert sql == "SELECT 1"
+    assert stub.payloads[0]["model"] == "qwen"
+    assert stub.payloads[0]["messages"] == [{"role": "user", "content": "?"}]
+    assert stub.headers == ["Bearer secret"]
@@ -0,0 +1,188 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.llm.client import (
+    LlmClientError,
+    YandexGPTClient,
+    YandexGptConfig,
+    complete_statement,
+)
+
+
+class StubServer:
+    def __init__(self) -> None:
+        self.status = 200
+        self.payload: dict[str, Any] = {
+            "result": {"alternatives": [{"message": {"text": "SELECT 1;"}}]}
+        }
+        self.peers: set[Any] = set()
+        self.url = ""
+        self.chunks: list[str] = []
+        self.chunks_sent = 0
+        self.stream_requests = 0
+
+    async def completion(self, request: web.Request) -> web.Response:
+        await request.read()
+        transport = request.transport
+        assert transport is not None
+        self.peers.add(transport.get_extra_info("peername"))
+        return web.json_response(self.payload, status=self.status)
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.stream_requests += 1
+        if not body["completionOptions"]["stream"]:
+            return web.json_response(self.payload)
+
+        response = web.StreamResponse()
+        await response.prepare(request)
+        text = ""
+        try:
+            for chunk in self.chunks:
+                text += chunk
+                line = {"result": {"alternatives": [{"message": {"text": text}}]}}
+                await response.write(json.dumps(line).encode() + b"\n")
+                self.chunks_sent += 1
+                await asyncio.sleep(0.01)
+        except ConnectionError:
+            pass
+        return response
+
+
+@pytest_asyncio.fixture
+async def stub_server() -> AsyncIterator[StubServer]:
+    stub = StubServer()
+    app = web.Application()
+    app.router.add_post("/completion", stub.completion)
+    app.router.add_post("/stream", stub.stream)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    stub.url = f"http://127.0.0.1:{runner.addresses[0][1]}/completion"
+    try:
+        yield stub
+    finally:
+        await runner.cleanup()
+
+
+def _client(stub: StubServer) -> YandexGPTClient:
+    return YandexGPTClient(
+        YandexGptConfig(api_key="key", folder_id="folder", endpoint_url=stub.url)
+    )
+
+
+@pytest.mark.asyncio
+async def test_request_llm_reuses_pooled_connection(stub_server: StubServer) -> None:
+    client = _client(stub_server)
+    await client.start()
+    try:
+        for _ in range(3):
+            assert await client.request_llm([{"role": "user", "text": "?"}]) == (
+                "SELECT 1"
+            )
+    finally:
+        await client.close()
+
+    assert len(stub_server.peers) == 1
+
+
+@pytest.mark.asyncio
+async def test_request_llm_opens_session_lazily(stub_server: StubServer) -> None:
+    client = _client(stub_server)
+    try:
+        assert await client.request_llm([{"role": "user", "text": "?"}]) == "SELECT 1"
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_request_llm_raises_on_http_error(stub_server: StubServer) -> None:
+    stub_server.status = 500
+    client = _client(stub_server)
+    try:
+        with pytest.raises(LlmClientError):
+            await client.request_llm([{"role": "user", "text": "?"}])
+    finally:
+        await client.close()
+
+
+def _streaming_client(stub: StubServer) -> YandexGPTClient:
+    return YandexGPTClient(
+        YandexGptConfig(
+            api_key="key",
+            folder_id="folder",
+            endpoint_url=stub.url.replace("/completion", "/stream"),
+            stream=True,
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_request_llm_stream_stops_at_end_of_statement(
+    stub_server: StubServer,
+) -> None:
+    stub_server.chunks = [
+        "SELECT count(*) ",
+        "FROM videos WHERE creator_id = 'a;b'",
+        ";",
+    ]
+    stub_server.chunks += ["\nПояснение"] * 20
+    client = _streaming_client(stub_server)
+    try:
+        sql = await client.request_llm([{"role": "user", "text": "?"}])
+    finally:
+        await client.close()
+
+    assert sql == "SELECT count(*) FROM videos WHERE creator_id = 'a;b'"
+    assert stub_server.chunks_sent < len(stub_server.chunks)
+
+
+@pytest.mark.asyncio
+async def test_request_llm_stream_falls_back_without_chunks(
+    stub_server: StubServer,
+) -> None:
+    client = _streaming_client(stub_server)
+    try:
+        assert await client.request_llm([{"role": "user", "text": "?"}]) == "SELECT 1"
+    finally:
+        await client.close()
+
+    assert stub_server.stream_requests == 2
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("SELECT 1", None),
+        ("SELECT 1;\nтекст", "SELECT 1"),
+        ("```sql\nSELECT 1\n```", "SELECT 1"),
+        ("```sql\nSELECT '```'", None),
+    ],
+)
+def test_complete_statement(text: str, expected: str | None) -> None:
+    assert complete_statement(text) == expected
+
+
+@pytest.mark.asyncio
+async def test_request_llm_logs_token_usage(
+    stub_server: StubServer, caplog: pytest.LogCaptureFixture
+) -> None:
+    stub_server.payload["result"]["usage"] = {
+        "inputTextTokens": "312",
+        "completionTokens": "18",
+    }
+    client = _client(stub_server)
+    try:
+        with caplog.at_level("INFO", logger="app.llm.client"):
+            await client.request_llm([{"role": "user", "text": "?"}])
+    finally:
+        await client.close()
+
+    assert "prompt_tokens=312 completion_tokens=18" in caplog.text
@@ -0,0 +1,201 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.llm.client import (
+    LlmClientError,
+    LlmHttpError,
+    LlmTimeoutError,
+    YandexGPTClient,
+    YandexGptConfig,
+)
+from app.llm.resilience import CircuitBreaker, CircuitOpenError, ResilientLlm
+
+MESSAGES = [{"role": "user", "text": "?"}]
+
+
+class FaultyServer:
+    def __init__(self) -> None:
+        self.statuses: list[int] = []
+        self.hits = 0
+        self.url = ""
+
+    async def completion(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.hits += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return web.json_response({"error": "injected"}, status=status)
+        return web.json_response(
+            {"result": {"alternatives": [{"message": {"text": "SELECT 1"}}]}}
+        )
+
+
+@pytest_asyncio.fixture
+async def faulty_client() -> AsyncIterator[tuple[FaultyServer, YandexGPTClient]]:
+    server = FaultyServer()
+    app = web.Application()
+    app.router.add_post("/completion", server.completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server.url = f"http://127.0.0.1:{runner.addresses[0][1]}/completion"
+    client = YandexGPTClient(
+        YandexGptConfig(api_key="key", folder_id="folder", endpoint_url=server.url)
+    )
+    try:
+        yield server, client
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+async def _no_sleep(seconds: float) -> None:
+    return None
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_retries_server_errors(
+    faulty_client: tuple[FaultyServer, YandexGPTClient],
+) -> None:
+    server, client = faulty_client
+    server.statuses = [500, 503]
+    llm = ResilientLlm(client.request_llm, retries=2, hedge=False, sleep=_no_sleep)
+
+    assert await llm.request_llm(MESSAGES) == "SELECT 1"
+    assert server.hits == 3
+    assert llm.retries_made == 2
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors(
+    faulty_client: tuple[FaultyServer, YandexGPTClient],
+) -> None:
+    server, client = faulty_client
+    server.statuses = [400]
+    llm = ResilientLlm(client.request_llm, retries=2, hedge=False, sleep=_no_sleep)
+
+    with pytest.raises(LlmHttpError):
+        await llm.request_llm(MESSAGES)
+    assert server.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_empty_completion() -> None:
+    calls = 0
+
+    async def request(messages: list[dict[str, str]]) -> str:
+        nonlocal calls
+        calls += 1
+        raise LlmClientError("Empty alternatives: {}")
+
+    llm = ResilientLlm(request, retries=2, hedge=False, sleep=_no_sleep)
+
+    with pytest.raises(LlmClientError):
+        await llm.request_llm(MESSAGES)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_all_attempts() -> None:
+    calls = 0
+
+    async def request(messages: list[dict[str, str]]) -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(10)
+        return "slow"
+
+    llm = ResilientLlm(
+        request, retries=5, hedge=False, deadline_seconds=0.05, sleep=_no_sleep
+    )
+
+    with pytest.raises(LlmTimeoutError):
+        await llm.request_llm(MESSAGES)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_one() -> None:
+    calls = 0
+
+    async def request(messages: list[dict[str, str]]) -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 21:
+            await asyncio.sleep(10)
+            return "slow"
+        return "fast"
+
+    llm = ResilientLlm(request, hedge_min_delay_seconds=0.01)
+
+    # Пока нет 20 замеров задержки, вторая копия не уходит.
+    for _ in range(20):
+        assert await llm.request_llm(MESSAGES) == "fast"
+    assert llm.hedges_fired == 0
+
+    assert await llm.request_llm(MESSAGES) == "fast"
+    assert llm.hedges_fired == 1
+    assert llm.hedges_won == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_attempt_latency_is_recorded() -> None:
+    async def request(messages: list[dict[str, str]]) -> str:
+        await asyncio.sleep(10)
+        return "slow"
+
+    llm = ResilientLlm(
+        request,
+        hedge=False,
+        deadline_seconds=0.05,
+        breaker=CircuitBreaker(failure_threshold=100),
+    )
+
+    for _ in range(20):
+        with pytest.raises(LlmTimeoutError):
+            await llm.request_llm(MESSAGES)
+    await asyncio.sleep(0)
+
+    # Срок обрывал каждую попытку, но замеры не потерялись.
+    delay = llm.hedge_delay_seconds
+    assert delay is not None
+    assert delay >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_and_recovers(
+    faulty_client: tuple[FaultyServer, YandexGPTClient],
+) -> None:
+    server, client = faulty_client
+    server.statuses = [500, 500]
+    clock = FakeClock()
+    llm = ResilientLlm(
+        client.request_llm,
+        retries=0,
+        hedge=False,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=clock),
+    )
+
+    for _ in range(2):
+        with pytest.raises(LlmHttpError):
+            await llm.request_llm(MESSAGES)
+    with pytest.raises(CircuitOpenError):
+        await llm.request_llm(MESSAGES)
+    assert server.hits == 2
+
+    clock.now = 31
+    assert await llm.request_llm(MESSAGES) == "SELECT 1"
+    assert server.hits == 3
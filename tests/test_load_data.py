@@ -0,0 +1,442 @@
+import io
+import json
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Self, cast
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.models import Video, VideoSnapshot
+from scripts import load_data as load_data_module
+from scripts.load_data import (
+    _SNAPSHOT_COPY_TYPES,
+    _VIDEO_COPY_TYPES,
+    LoadStats,
+    _CopyWriter,
+    _IncrementalWriter,
+    _iter_json_array,
+    _iter_parsed_batches,
+    _iter_raw_batches,
+    _parse_batch,
+    load_data,
+)
+
+
+def _video(index: int, snapshots: int) -> dict[str, Any]:
+    video_id = str(uuid.UUID(int=index))
+    return {
+        "id": video_id,
+        "creator_id": f"creator-{index % 3}",
+        "video_created_at": "2025-11-01T10:00:00+00:00",
+        "views_count": index,
+        "likes_count": 0,
+        "comments_count": 0,
+        "reports_count": 0,
+        "created_at": "2025-11-01T10:00:00+00:00",
+        "updated_at": "2025-11-02T10:00:00+00:00",
+        "snapshots": [
+            {
+                "id": str(uuid.UUID(int=index * 1000 + n)),
+                "video_id": video_id,
+                "views_count": n,
+                "likes_count": 0,
+                "comments_count": 0,
+                "reports_count": 0,
+                "delta_views_count": 1,
+                "delta_likes_count": 0,
+                "delta_comments_count": 0,
+                "delta_reports_count": 0,
+                "created_at": f"2025-11-01T{n:02d}:00:00+00:00",
+                "updated_at": f"2025-11-01T{n:02d}:00:00+00:00",
+            }
+            for n in range(snapshots)
+        ],
+    }
+
+
+async def _load(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    session_maker: async_sessionmaker[AsyncSession],
+    videos: list[dict[str, Any]],
+    mode: str,
+) -> LoadStats:
+    path = tmp_path / f"{mode}.json"
+    path.write_text(json.dumps({"videos": videos}), encoding="utf-8")
+    monkeypatch.setattr(load_data_module, "get_session_factory", lambda: session_maker)
+    return await load_data(path, batch_size=5, truncate=True, mode=mode)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 256, 1 << 20])
+def test_iter_json_array_streams_videos(chunk_size: int) -> None:
+    payload = {"meta": {"videos_total": 5}, "videos": [_video(i, 3) for i in range(5)]}
+    stream = io.StringIO(json.dumps(payload, indent=2))
+
+    assert list(_iter_json_array(stream, chunk_size=chunk_size)) == payload["videos"]
+
+
+def test_iter_json_array_rejects_truncated_document() -> None:
+    stream = io.StringIO('{"videos": [{"id": 1}, {"id": ')
+
+    with pytest.raises(json.JSONDecodeError):
+        list(_iter_json_array(stream, chunk_size=4))
+
+
+def test_iter_json_array_requires_videos_key() -> None:
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO('{"items": []}')))
+
+
+def test_iter_raw_batches_flushes_bounded_batches() -> None:
+    raw_batches = list(_iter_raw_batches((_video(i, 4) for i in range(10)), size=6))
+
+    assert [len(batch) for batch in raw_batches] == [2, 2, 2, 2, 2]
+
+
+def test_parse_batch_builds_rows_and_snapshot_range() -> None:
+    batch = _parse_batch([_video(1, 3), _video(2, 5)], copy_rows=False)
+
+    assert len(batch.videos) == 2
+    assert len(batch.snapshots) == 8
+    assert isinstance(batch.videos[0]["id"], uuid.UUID)
+    assert batch.first_snapshot_at is not None
+    assert batch.last_snapshot_at is not None
+    assert batch.first_snapshot_at.hour == 0
+    assert batch.last_snapshot_at.hour == 4
+
+
+def test_parse_batch_copy_rows_follow_column_order() -> None:
+    batch = _parse_batch([_video(1, 1)], copy_rows=True)
+
+    video_row = batch.videos[0]
+    assert isinstance(video_row, tuple)
+    assert video_row[0] == uuid.UUID(int=1)
+    assert video_row[1] == "creator-1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [1, 2])
+async def test_iter_parsed_batches_keeps_order(workers: int) -> None:
+    raw_batches = _iter_raw_batches((_video(i, 2) for i in range(20)), size=4)
+
+    batches = [
+        batch
+        async for batch in _iter_parsed_batches(
+            raw_batches, workers=workers, copy_rows=False
+        )
+    ]
+
+    ids = [video["id"] for batch in batches for video in batch.videos]
+    assert ids == [uuid.UUID(int=i) for i in range(20)]
+
+
+class _FakeCopy:
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        self.types: list[str] = []
+        self.rows: list[tuple[Any, ...]] = []
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def set_types(self, types: list[str]) -> None:
+        self.types = types
+
+    async def write_row(self, row: tuple[Any, ...]) -> None:
+        self.rows.append(row)
+
+
+class _FakeCursor:
+    def __init__(self, copies: list[_FakeCopy]) -> None:
+        self._copies = copies
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+    def copy(self, sql: str) -> _FakeCopy:
+        self._copies.append(_FakeCopy(sql))
+        return self._copies[-1]
+
+
+class _FakeResult:
+    rowcount = 0
+
+    def scalars(self) -> "_FakeResult":
+        return self
+
+    def all(self) -> list[bool]:
+        return []
+
+
+class _RecordingSession:
+    # Записывает SQL писателей вместо БД: проверяем текст запросов без Postgres.
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+        self.copies: list[_FakeCopy] = []
+        self.driver_connection = self
+
+    async def execute(self, statement: Any, params: Any = None) -> _FakeResult:
+        self.statements.append(" ".join(str(statement).split()))
+        return _FakeResult()
+
+    async def connection(self) -> "_RecordingSession":
+        return self
+
+    async def get_raw_connection(self) -> "_RecordingSession":
+        return self
+
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self.copies)
+
+
+def _parsed(videos: list[dict[str, Any]]) -> Any:
+    return _parse_batch(videos, copy_rows=True)
+
+
+@pytest.mark.asyncio
+async def test_copy_writer_stages_rows_and_moves_them_in_one_insert() -> None:
+    session = _RecordingSession()
+    writer = _CopyWriter()
+    stats = LoadStats()
+    batch = _parsed([_video(1, 2)])
+
+    await writer.prepare(cast(AsyncSession, session))
+    await writer.write(cast(AsyncSession, session), batch, stats)
+    await writer.finish(cast(AsyncSession, session))
+
+    video_columns = ", ".join(_VIDEO_COPY_TYPES)
+    snapshot_columns = ", ".join(_SNAPSHOT_COPY_TYPES)
+    assert session.statements == [
+        (
+            "CREATE TEMP TABLE videos_staging "
+            "(LIKE videos INCLUDING DEFAULTS) ON COMMIT DROP"
+        ),
+        (
+            "CREATE TEMP TABLE video_snapshots_staging "
+            "(LIKE video_snapshots INCLUDING DEFAULTS) ON COMMIT DROP"
+        ),
+        (
+            f"INSERT INTO videos ({video_columns}) "
+            f"SELECT {video_columns} FROM videos_staging"
+        ),
+        (
+            f"INSERT INTO video_snapshots ({snapshot_columns}) "
+            f"SELECT {snapshot_columns} FROM video_snapshots_staging"
+        ),
+    ]
+    assert [(copy.sql, copy.types, len(copy.rows)) for copy in session.copies] == [
+        (
+            f"COPY videos_staging ({video_columns}) FROM STDIN (FORMAT BINARY)",
+            list(_VIDEO_COPY_TYPES.values()),
+            1,
+        ),
+        (
+            (
+                f"COPY video_snapshots_staging ({snapshot_columns}) "
+                "FROM STDIN (FORMAT BINARY)"
+            ),
+            list(_SNAPSHOT_COPY_TYPES.values()),
+            2,
+        ),
+    ]
+    assert stats.inserted == 3
+
+
+@pytest.mark.asyncio
+async def test_copy_writer_skips_copy_for_empty_table() -> None:
+    session = _RecordingSession()
+
+    await _CopyWriter().write(
+        cast(AsyncSession, session), _parsed([_video(1, 0)]), LoadStats()
+    )
+
+    assert [copy.sql.split()[1] for copy in session.copies] == ["videos_staging"]
+
+
+@pytest.mark.asyncio
+async def test_incremental_writer_merges_by_updated_at_and_watermark() -> None:
+    session = _RecordingSession()
+
+    await _IncrementalWriter().write(
+        cast(AsyncSession, session), _parsed([_video(1, 1)]), LoadStats()
+    )
+
+    upsert, append, watermarks, truncate = session.statements
+    # Дубли id в пачке: DO UPDATE не может тронуть строку дважды.
+    assert "SELECT DISTINCT ON (id)" in upsert
+    assert "FROM videos_staging ORDER BY id, updated_at DESC" in upsert
+    assert "ON CONFLICT (id) DO UPDATE SET creator_id = EXCLUDED.creator_id" in upsert
+    assert "WHERE videos.updated_at < EXCLUDED.updated_at" in upsert
+    assert upsert.endswith("RETURNING (xmax = 0) AS inserted")
+    assert (
+        "WHERE w.last_created_at IS NULL OR s.created_at > w.last_created_at" in append
+    )
+    assert append.endswith("ON CONFLICT (id) DO NOTHING")
+    assert "FROM video_snapshots_staging GROUP BY video_id" in watermarks
+    assert "GREATEST(" in watermarks
+    assert truncate == "TRUNCATE TABLE videos_staging, video_snapshots_staging"
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_copy_mode_round_trip(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    pg_session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    # batch_size=5: видео с замерами разойдутся по нескольким COPY в staging.
+    stats = await _load(
+        tmp_path,
+        monkeypatch,
+        pg_session_maker,
+        [_video(i, 4) for i in range(1, 4)],
+        mode="copy",
+    )
+
+    assert (stats.videos, stats.snapshots) == (3, 12)
+    assert (stats.inserted, stats.updated, stats.skipped) == (15, 0, 0)
+
+    async with pg_session_maker() as session:
+        assert await session.scalar(select(func.count()).select_from(Video)) == 3
+        assert (
+            await session.scalar(select(func.count()).select_from(VideoSnapshot)) == 12
+        )
+        video = await session.get(Video, uuid.UUID(int=2))
+        assert video is not None
+        assert (video.creator_id, video.views_count) == ("creator-2", 2)
+        assert video.updated_at == datetime(2025, 11, 2, 10, tzinfo=UTC)
+        # Staging-таблицы живут до конца транзакции загрузки.
+        assert (
+            await session.scalar(text("SELECT to_regclass('videos_staging')")) is None
+        )
+
+
+def _with_snapshots(
+    video: dict[str, Any], first_id: int, hours: range
+) -> dict[str, Any]:
+    # Новые id замеров, чтобы их отсекал watermark, а не ON CONFLICT (id).
+    template = video["snapshots"][0]
+    video["snapshots"] = [
+        {
+            **template,
+            "id": str(uuid.UUID(int=first_id + hour)),
+            "created_at": f"2025-11-01T{hour:02d}:00:00+00:00",
+            "updated_at": f"2025-11-01T{hour:02d}:00:00+00:00",
+        }
+        for hour in hours
+    ]
+    return video
+
+
+async def _watermarks(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> dict[uuid.UUID, int]:
+    async with session_maker() as session:
+        rows = await session.execute(
+            text(
+                "SELECT video_id, extract(hour FROM last_created_at AT TIME ZONE 'UTC')"
+                " FROM video_snapshot_watermarks"
+            )
+        )
+        return {video_id: int(hour) for video_id, hour in rows}
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_full_load_rebuilds_watermarks(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    pg_session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    await _load(tmp_path, monkeypatch, pg_session_maker, [_video(1, 3)], mode="insert")
+    await _load(
+        tmp_path,
+        monkeypatch,
+        pg_session_maker,
+        [_video(1, 2), _video(2, 4)],
+        mode="copy",
+    )
+
+    # После TRUNCATE watermark считается заново по загруженным замерам.
+    assert await _watermarks(pg_session_maker) == {
+        uuid.UUID(int=1): 1,
+        uuid.UUID(int=2): 3,
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_incremental_mode_merges_by_updated_at_and_watermark(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    pg_session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    await _load(
+        tmp_path,
+        monkeypatch,
+        pg_session_maker,
+        [_video(1, 3), _video(2, 3)],
+        mode="copy",
+    )
+
+    stale = _with_snapshots(_video(1, 1), first_id=10_000, hours=range(1, 4))
+    stale.update(views_count=999, updated_at="2025-11-01T10:00:00+00:00")
+    fresh = _video(2, 0)
+    fresh.update(views_count=500, updated_at="2025-11-03T10:00:00+00:00")
+    new = _video(3, 2)
+
+    stats = await _load(
+        tmp_path, monkeypatch, pg_session_maker, [stale, fresh, new], mode="incremental"
+    )
+
+    # Видео: 3 — вставлено (xmax = 0), 2 — обновлено, 1 — пропущено как
+    # более старое. Замеры: у видео 1 проходит только час 3 (watermark — 2),
+    # у видео 3 watermark ещё нет — проходят оба.
+    assert (stats.videos, stats.snapshots) == (3, 5)
+    assert (stats.inserted, stats.updated, stats.skipped) == (1 + 3, 1, 1 + 2)
+
+    async with pg_session_maker() as session:
+        views = dict(
+            (await session.execute(select(Video.id, Video.views_count))).tuples().all()
+        )
+        snapshots = await session.scalar(
+            select(func.count()).select_from(VideoSnapshot)
+        )
+    assert views == {uuid.UUID(int=1): 1, uuid.UUID(int=2): 500, uuid.UUID(int=3): 3}
+    assert snapshots == 6 + 3
+    assert await _watermarks(pg_session_maker) == {
+        uuid.UUID(int=1): 3,
+        uuid.UUID(int=2): 2,
+        uuid.UUID(int=3): 1,
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_incremental_mode_keeps_latest_duplicate_in_batch(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    pg_session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    older = _video(1, 0)
+    older.update(views_count=10, updated_at="2025-11-02T10:00:00+00:00")
+    newer = _video(1, 0)
+    newer.update(views_count=20, updated_at="2025-11-03T10:00:00+00:00")
+
+    stats = await _load(
+        tmp_path, monkeypatch, pg_session_maker, [newer, older], mode="incremental"
+    )
+
+    assert (stats.inserted, stats.updated, stats.skipped) == (1, 0, 1)
+    async with pg_session_maker() as session:
+        views = (await session.execute(select(Video.views_count))).scalars().all()
+    assert views == [20]
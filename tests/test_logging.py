@@ -0,0 +1,121 @@
+import io
+import json
+import logging
+import queue
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from app.core.logging import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    parse_sampling,
+    setup_logging,
+)
+from app.core.tracing import RequestIdFilter, start_trace
+
+
+def _record(name: str, level: int, msg: str = "msg") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+@pytest.fixture
+def restore_root() -> Iterator[None]:
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    try:
+        yield
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
+
+
+def test_json_formatter() -> None:
+    record = logging.LogRecord(
+        "app.db.executor", logging.INFO, __file__, 1, "sql=%s", ("SELECT 1",), None
+    )
+    RequestIdFilter().filter(record)
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "app.db.executor"
+    assert payload["request_id"] == "-"
+    assert payload["message"] == "sql=SELECT 1"
+
+
+def test_sampling_is_per_logger_and_per_request() -> None:
+    sampling = SamplingFilter(parse_sampling("app.bot=0, app.db.executor=0.5"))
+    request_filter = RequestIdFilter()
+
+    assert not sampling.filter(_record("app.bot.router", logging.INFO))
+    assert sampling.filter(_record("app.bot.router", logging.WARNING))
+    assert sampling.filter(_record("app.llm.client", logging.INFO))
+
+    kept = 0
+    for _ in range(200):
+        with start_trace("handle_text"):
+            first = _record("app.db.executor", logging.INFO)
+            second = _record("app.db.executor", logging.INFO, "other")
+            request_filter.filter(first)
+            request_filter.filter(second)
+            # Все строки одного апдейта либо остаются, либо отбрасываются.
+            assert sampling.filter(first) == sampling.filter(second)
+            kept += sampling.filter(first)
+
+    assert 50 < kept < 150
+
+
+def test_queue_handler_drops_info_and_keeps_warnings() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+
+    handler.handle(_record("app", logging.INFO, "first"))
+    handler.handle(_record("app", logging.INFO, "second"))
+    handler.handle(_record("app", logging.INFO, "third"))
+    handler.handle(_record("app", logging.ERROR, "error"))
+
+    assert handler.dropped == 2
+    assert [log_queue.get_nowait().msg for _ in range(2)] == ["second", "error"]
+
+
+def test_queue_handler_renders_message_before_enqueue() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+    handler = DroppingQueueHandler(log_queue)
+    rows = [1]
+    record = logging.LogRecord(
+        "app", logging.INFO, __file__, 1, "rows=%s", (rows,), None
+    )
+
+    handler.handle(record)
+    rows.append(2)
+
+    queued = log_queue.get_nowait()
+    assert (queued.msg, queued.args) == ("rows=[1]", None)
+    assert JsonFormatter().format(queued).endswith('"message": "rows=[1]"}')
+
+
+def test_setup_logging_writes_json_from_listener(restore_root: None) -> None:
+    stream = io.StringIO()
+    listener = setup_logging("INFO", stream=stream)
+
+    with start_trace("handle_text"):
+        logging.getLogger("app.bot.router").info("input_text=%s", "привет")
+    listener.stop()
+
+    payload = json.loads(stream.getvalue())
+    assert payload["message"] == "input_text=привет"
+    assert payload["request_id"] != "-"
+
+
+def test_listener_stop_waits_for_full_queue(restore_root: None) -> None:
+    listener = setup_logging("INFO", queue_size=1, stream=io.StringIO())
+    listener.stop()
+    logging.getLogger("app.bot.router").info("fills the queue")
+
+    # Без ожидания stop() на полной очереди падал бы с queue.Full.
+    threading.Timer(0.05, listener.queue.get).start()
+    listener.enqueue_sentinel()
+
+    assert listener.queue.get() is None
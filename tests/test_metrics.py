@@ -0,0 +1,98 @@
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+from typing import cast
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from prometheus_client import REGISTRY
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.pool import QueuePool
+
+from app.bot.router import handle_text
+from app.core.metrics import build_metrics_app, watch_pool
+from app.db.errors import ScalarsError
+from app.llm.client import LlmClientError
+
+
+class FakeMessage:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.chat = SimpleNamespace(id=1)
+        self.answers: list[str] = []
+
+    async def answer(self, text: str) -> None:
+        self.answers.append(text)
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest_asyncio.fixture
+async def metrics_url() -> AsyncIterator[str]:
+    runner = web.AppRunner(build_metrics_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}/metrics"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_handle_text_records_latency_and_errors() -> None:
+    async def failing_llm(messages: list[dict[str, str]]) -> str:
+        raise LlmClientError("down")
+
+    async def ok_llm(messages: list[dict[str, str]]) -> str:
+        return "SELECT 1"
+
+    async def bad_sql(sql: str) -> int:
+        raise ScalarsError("не число")
+
+    async def ok_sql(sql: str) -> int:
+        return 1
+
+    ok_before = _sample("bot_request_seconds_count", outcome="ok")
+    error_before = _sample("bot_request_seconds_count", outcome="error")
+    llm_errors = _sample("bot_request_errors_total", error="LlmClientError")
+    scalar_errors = _sample("bot_request_errors_total", error="ScalarsError")
+    sends = _sample("bot_telegram_send_seconds_count")
+
+    await handle_text(FakeMessage("?"), ok_llm, ok_sql)
+    await handle_text(FakeMessage("?"), failing_llm, ok_sql)
+    await handle_text(FakeMessage("?"), ok_llm, bad_sql)
+
+    assert _sample("bot_request_seconds_count", outcome="ok") == ok_before + 1
+    assert _sample("bot_request_seconds_count", outcome="error") == error_before + 2
+    assert _sample("bot_request_errors_total", error="LlmClientError") == llm_errors + 1
+    assert (
+        _sample("bot_request_errors_total", error="ScalarsError") == scalar_errors + 1
+    )
+    assert _sample("bot_telegram_send_seconds_count") == sends + 3
+
+
+def test_watch_pool_reads_pool_on_scrape() -> None:
+    pool = QueuePool(lambda: cast(DBAPIConnection, None), pool_size=4, max_overflow=2)
+    watch_pool("test", pool)
+
+    assert _sample("bot_db_pool_size", target="test") == 4
+    assert _sample("bot_db_pool_checked_out", target="test") == 0
+    assert _sample("bot_db_pool_overflow", target="test") == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(metrics_url: str) -> None:
+    async with (
+        aiohttp.ClientSession() as session,
+        session.get(metrics_url) as response,
+    ):
+        body = await response.text()
+
+    assert response.status == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert "bot_request_seconds_bucket" in body
+    assert "bot_llm_request_seconds" in body
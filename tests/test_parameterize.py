@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from app.db.parameterize import parameterize_sql
+
+
+def test_parameterize_sql_shares_template_across_literals() -> None:
+    first = parameterize_sql(
+        "SELECT count(*) AS value FROM videos "
+        "WHERE creator_id = '42' AND views_count > 100"
+    )
+    second = parameterize_sql(
+        "SELECT count(*) AS value FROM videos "
+        "WHERE creator_id = 'abc' AND views_count > 5000"
+    )
+
+    assert first.template == second.template
+    assert first.fingerprint == second.fingerprint
+    assert sorted(first.params.values(), key=str) == [100, "42"]
+    assert sorted(second.params.values(), key=str) == [5000, "abc"]
+
+
+def test_parameterize_sql_binds_casted_dates() -> None:
+    result = parameterize_sql(
+        "SELECT COALESCE(sum(delta_views_count), 0) AS value FROM daily_stats "
+        "WHERE day BETWEEN '2025-11-01'::date AND '2025-11-05'::date"
+    )
+
+    assert "CAST(:p1 AS DATE)" in result.template
+    assert set(result.params.values()) == {"2025-11-01", "2025-11-05"}
+
+
+def test_parameterize_sql_keeps_structural_literals() -> None:
+    result = parameterize_sql(
+        "SELECT count(*) AS value FROM videos "
+        "WHERE (video_created_at AT TIME ZONE 'UTC')::date = '2025-11-01' "
+        "AND to_char(video_created_at, 'HH24:MI') = '10:00' "
+        "GROUP BY 1 LIMIT 1"
+    )
+
+    assert "AT TIME ZONE 'UTC'" in result.template
+    assert "'HH24\\:MI'" in result.template
+    assert result.template.endswith("GROUP BY 1 LIMIT 1")
+    assert set(result.params.values()) == {"2025-11-01", "10:00"}
@@ -0,0 +1,101 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from app.bot.pipeline import PipelineBusyError, RequestPipeline
+
+
+@pytest.mark.asyncio
+async def test_pipeline_keeps_per_chat_order() -> None:
+    pipeline = RequestPipeline(max_in_flight=4, max_pending_per_chat=10)
+    done: list[int] = []
+
+    async def job(index: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        done.append(index)
+
+    await asyncio.gather(
+        *(pipeline.run(1, partial(job, i, 0.01 * (5 - i))) for i in range(5))
+    )
+
+    assert done == [0, 1, 2, 3, 4]
+    assert pipeline.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_limits_in_flight() -> None:
+    pipeline = RequestPipeline(max_in_flight=2)
+    peak = 0
+
+    async def job() -> None:
+        nonlocal peak
+        peak = max(peak, pipeline.in_flight)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(pipeline.run(chat_id, job) for chat_id in range(10)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_sheds_per_chat_overflow() -> None:
+    pipeline = RequestPipeline(max_pending_per_chat=2)
+    release = asyncio.Event()
+
+    async def job() -> None:
+        await release.wait()
+
+    first = asyncio.create_task(pipeline.run(1, job))
+    second = asyncio.create_task(pipeline.run(1, job))
+    await asyncio.sleep(0)
+
+    with pytest.raises(PipelineBusyError):
+        await pipeline.run(1, job)
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert pipeline.shed == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_slow_chat_does_not_starve_others() -> None:
+    pipeline = RequestPipeline(max_in_flight=2, max_pending_per_chat=10)
+    release = asyncio.Event()
+    finished: list[int] = []
+
+    async def slow() -> None:
+        await release.wait()
+
+    async def fast(chat_id: int) -> None:
+        finished.append(chat_id)
+
+    slow_jobs = [asyncio.create_task(pipeline.run(1, slow)) for _ in range(5)]
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(pipeline.run(c, partial(fast, c)) for c in (2, 3, 4))),
+        timeout=1,
+    )
+
+    assert finished == [2, 3, 4]
+    release.set()
+    await asyncio.gather(*slow_jobs)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_sheds_global_overflow() -> None:
+    pipeline = RequestPipeline(max_in_flight=1, max_pending=2)
+    release = asyncio.Event()
+
+    async def job() -> None:
+        await release.wait()
+
+    tasks = [asyncio.create_task(pipeline.run(chat_id, job)) for chat_id in (1, 2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(PipelineBusyError):
+        await pipeline.run(3, job)
+
+    release.set()
+    await asyncio.gather(*tasks)
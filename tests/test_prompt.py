@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from app.llm.prompt import SYSTEM_PROMPT, build_messages, build_system_prompt
+
+
+def test_simple_question_gets_only_videos_schema() -> None:
+    prompt = build_system_prompt("Сколько всего видео есть в системе?")
+
+    assert "Таблица videos:" in prompt
+    assert "video_snapshots:" not in prompt
+    assert "daily_stats" not in prompt
+    assert len(prompt) < len(SYSTEM_PROMPT) / 2
+
+
+def test_growth_question_gets_rollup_tables() -> None:
+    prompt = build_system_prompt(
+        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?"
+    )
+
+    assert "Таблица daily_stats" in prompt
+    assert "Таблица video_daily_stats" in prompt
+    assert "7) Суммы приростов" in prompt
+    assert "Таблица video_snapshots:" not in prompt
+
+
+def test_activity_question_gets_snapshots_and_metric_hint() -> None:
+    prompt = build_system_prompt(
+        "Сколько разных видео получали новые лайки 27 ноября 2025?"
+    )
+
+    assert "Таблица video_snapshots:" in prompt
+    assert "likes_count/delta_likes_count" in prompt
+
+
+def test_build_messages_keeps_question_last() -> None:
+    messages = build_messages("  сколько видео?  ")
+
+    assert messages[0]["role"] == "system"
+    assert messages[-1] == {"role": "user", "text": "сколько видео?"}
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Self, cast
+
+import pytest
+
+from app.bot.router import command_query_stats
+from app.db.routing import SessionFactory
+from app.db.stats import QueryStats, fingerprint_sql, format_plan, scanned_rows
+
+ANALYZE_PLAN = [
+    {
+        "Plan": {
+            "Node Type": "Aggregate",
+            "Actual Total Time": 1500.0,
+            "Actual Rows": 1,
+            "Actual Loops": 1,
+            "Plans": [
+                {
+                    "Node Type": "Seq Scan",
+                    "Relation Name": "video_snapshots",
+                    "Actual Total Time": 1400.0,
+                    "Actual Rows": 1000,
+                    "Rows Removed by Filter": 99000,
+                    "Actual Loops": 2,
+                }
+            ],
+        }
+    }
+]
+
+
+class FakeResult:
+    def scalar_one(self) -> Any:
+        return ANALYZE_PLAN
+
+
+class FakeSession:
+    def __init__(self, statements: list[str]) -> None:
+        self._statements = statements
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    async def execute(self, stmt: Any) -> FakeResult:
+        self._statements.append(str(stmt))
+        return FakeResult()
+
+
+class FakeMessage:
+    def __init__(self, text: str, chat_id: int) -> None:
+        self.text = text
+        self.chat = SimpleNamespace(id=chat_id)
+        self.answers: list[str] = []
+
+    async def answer(self, text: str) -> None:
+        self.answers.append(text)
+
+
+def test_fingerprint_ignores_literals() -> None:
+    first = fingerprint_sql(
+        "SELECT count(*) FROM videos WHERE creator_id = 'abc' AND views_count > 10"
+    )
+    second = fingerprint_sql(
+        "select count(*)  from videos where creator_id = 'xyz' and views_count > 500"
+    )
+    other = fingerprint_sql("SELECT count(*) FROM videos WHERE creator_id = 'abc'")
+
+    assert first == second
+    assert first[0] != other[0]
+    assert "'abc'" not in first[1]
+
+
+def test_plan_helpers() -> None:
+    plan = ANALYZE_PLAN[0]["Plan"]
+
+    assert scanned_rows(plan) == 200_000
+    assert (
+        format_plan(plan)
+        .splitlines()[1]
+        .startswith("  Seq Scan on video_snapshots (time=1400.0ms")
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_stats_aggregates_and_captures_slow_plan() -> None:
+    statements: list[str] = []
+    stats = QueryStats(slow_query_ms=1000.0)
+    session_maker = cast(SessionFactory, lambda: FakeSession(statements))
+
+    for value, elapsed_ms in ((1, 10.0), (2, 30.0), (3, 20.0)):
+        stats.record(f"SELECT {value} + 1", elapsed_ms, rows_estimate=100.0)
+    stats.record(
+        "SELECT * FROM videos WHERE id = 'a'", 1200.0, session_maker=session_maker
+    )
+    stats.record(
+        "SELECT * FROM videos WHERE id = 'b'", 1300.0, session_maker=session_maker
+    )
+    await stats.close()
+
+    slow, fast = stats.top(2)
+    assert fast.calls == 3
+    assert fast.mean_ms == 20.0
+    assert fast.percentile(95) == 30.0
+    assert fast.mean_rows_estimated == 100.0
+
+    assert slow.calls == 2
+    assert slow.slow_calls == 2
+    # План снимается один раз за интервал, а не на каждый медленный вызов.
+    assert statements == [
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT * FROM videos WHERE id = 'a'"
+    ]
+    assert slow.plan_rows_scanned == 200_000
+    assert slow.mean_rows_estimated is None
+    assert "Seq Scan on video_snapshots" in stats.report(1)
+    # Без cost guard оценки строк нет — и в отчёте её нет.
+    assert "rows_est" not in stats.report(1)
+    assert "rows_est=100" in stats.report(2)
+
+
+@pytest.mark.asyncio
+async def test_failed_query_is_counted_and_explained_without_analyze() -> None:
+    statements: list[str] = []
+    stats = QueryStats(slow_query_ms=1000.0)
+    session_maker = cast(SessionFactory, lambda: FakeSession(statements))
+
+    stats.record(
+        "SELECT count(*) FROM video_snapshots",
+        5000.0,
+        error=True,
+        session_maker=session_maker,
+    )
+    await stats.close()
+
+    (stat,) = stats.top()
+    assert (stat.calls, stat.errors, stat.slow_calls) == (1, 1, 1)
+    # ANALYZE повторил бы запрос, упавший по statement_timeout.
+    assert statements == ["EXPLAIN (FORMAT JSON) SELECT count(*) FROM video_snapshots"]
+    assert stat.plan_rows_scanned is None
+    assert "errors=1" in stats.report()
+
+
+def test_query_stats_evicts_oldest_fingerprint() -> None:
+    stats = QueryStats(max_queries=2)
+
+    stats.record("SELECT 1 FROM videos", 1.0)
+    stats.record("SELECT 1 FROM video_snapshots", 1.0)
+    stats.record("SELECT 1 FROM videos", 1.0)
+    stats.record("SELECT 1 FROM creators", 1.0)
+
+    assert {stat.query for stat in stats.top(10)} == {
+        "SELECT $1 FROM videos",
+        "SELECT $1 FROM creators",
+    }
+
+
+@pytest.mark.asyncio
+async def test_querystats_command_is_admin_only() -> None:
+    stats = QueryStats()
+    stats.record("SELECT count(*) FROM videos", 5.0)
+
+    stranger = FakeMessage("/querystats", chat_id=2)
+    await command_query_stats(stranger, stats, frozenset({1}))
+    assert stranger.answers == []
+
+    admin = FakeMessage("/querystats 5", chat_id=1)
+    await command_query_stats(admin, stats, frozenset({1}))
+    assert "calls=1" in admin.answers[0]
+    assert "SELECT COUNT(*) FROM videos" in admin.answers[0]
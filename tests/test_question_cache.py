@@ -0,0 +1,145 @@
+from app.llm.cache import QuestionSqlCache, normalize_question
+
+CREATOR_SQL = (
+    "SELECT count(*) AS value FROM videos WHERE creator_id = 'abc123' "
+    "AND video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-05'::date"
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize_question_extracts_literals() -> None:
+    key, slots = normalize_question(
+        "Сколько видео у креатора abc123 вышло с 1 ноября 2025 по 05.11.2025?"
+    )
+
+    assert key == "сколько видео у креатора <creator0> вышло с <date1> по <date2>"
+    assert slots == [
+        ("creator", "abc123"),
+        ("date", "2025-11-01"),
+        ("date", "2025-11-05"),
+    ]
+
+
+def test_normalize_question_expands_day_range() -> None:
+    _, slots = normalize_question("видео креатора 42 с 1 по 5 ноября 2025")
+
+    assert slots == [
+        ("creator", "42"),
+        ("date", "2025-11-01"),
+        ("date", "2025-11-05"),
+    ]
+
+
+def test_normalize_question_keeps_creator_case() -> None:
+    key, slots = normalize_question("Сколько видео у Креатора с ID AbC123?")
+
+    assert key == "сколько видео у креатора с id <creator0>"
+    assert slots == [("creator", "AbC123")]
+
+
+def test_normalize_question_skips_impossible_dates() -> None:
+    key, slots = normalize_question("сколько видео вышло 31.02.2025")
+
+    assert "<date" not in key
+    assert ("date", "2025-02-31") not in slots
+
+
+def test_cache_reuses_template_with_new_literals() -> None:
+    cache = QuestionSqlCache()
+    assert cache.store(
+        "Сколько видео у креатора abc123 вышло с 2025-11-01 по 2025-11-05?",
+        CREATOR_SQL,
+    )
+
+    sql = cache.lookup(
+        "сколько  видео у креатора ff00 вышло с 2 декабря 2025 по 10.12.2025"
+    )
+
+    assert sql == (
+        "SELECT count(*) AS value FROM videos WHERE creator_id = 'ff00' "
+        "AND video_created_at::date BETWEEN '2025-12-02'::date "
+        "AND '2025-12-10'::date"
+    )
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_cache_renders_creator_in_original_case() -> None:
+    cache = QuestionSqlCache()
+    assert cache.store(
+        "Сколько видео у креатора abc123 вышло с 2025-11-01 по 2025-11-05?",
+        CREATOR_SQL,
+    )
+
+    sql = cache.lookup(
+        "Сколько видео у креатора ABC123 вышло с 2025-11-01 по 2025-11-05?"
+    )
+
+    assert sql == CREATOR_SQL.replace("'abc123'", "'ABC123'")
+
+
+def test_cache_binds_numbers() -> None:
+    cache = QuestionSqlCache()
+    cache.store(
+        "Сколько видео набрало больше 100 000 просмотров?",
+        "SELECT count(*) AS value FROM videos WHERE views_count > 100000",
+    )
+
+    assert cache.lookup("сколько видео набрало больше 500 просмотров") == (
+        "SELECT count(*) AS value FROM videos WHERE views_count > 500"
+    )
+
+
+def test_cache_skips_sql_with_unbound_literals() -> None:
+    cache = QuestionSqlCache()
+
+    stored = cache.store(
+        "на сколько выросли просмотры 1 ноября 2025",
+        "SELECT sum(delta_views_count) AS value FROM video_snapshots "
+        "WHERE created_at >= '2025-11-01' AND created_at < '2025-11-02'",
+    )
+
+    assert not stored
+    assert cache.lookup("на сколько выросли просмотры 3 ноября 2025") is None
+    assert cache.misses == 1
+
+
+def test_cache_skips_ambiguous_literals() -> None:
+    cache = QuestionSqlCache()
+
+    assert not cache.store(
+        "видео креатора abc123 с 2025-11-01 по 2025-11-01",
+        CREATOR_SQL.replace("2025-11-05", "2025-11-01"),
+    )
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache = QuestionSqlCache(max_size=2)
+    cache.store("сколько всего видео", "SELECT count(*) AS value FROM videos")
+    cache.store(
+        "сколько всего замеров", "SELECT count(*) AS value FROM video_snapshots"
+    )
+    assert cache.lookup("сколько всего видео") is not None
+
+    cache.store("сколько всего креаторов", "SELECT 1 AS value")
+
+    assert len(cache) == 2
+    assert cache.lookup("сколько всего видео") is not None
+    assert cache.lookup("сколько всего замеров") is None
+
+
+def test_cache_expires_entries() -> None:
+    clock = FakeClock()
+    cache = QuestionSqlCache(ttl_seconds=10, clock=clock)
+    cache.store("сколько всего видео", "SELECT count(*) AS value FROM videos")
+
+    clock.now = 11
+
+    assert cache.lookup("сколько всего видео") is None
+    assert len(cache) == 0
@@ -0,0 +1,119 @@
+import pytest
+
+from app.db.cache import ResultCache, canonicalize_sql
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeVersion:
+    def __init__(self) -> None:
+        self.value = 1
+        self.loads = 0
+
+    async def __call__(self) -> int:
+        self.loads += 1
+        return self.value
+
+
+class InMemoryBackend:
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.store.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self.store[key] = value
+
+    async def close(self) -> None:
+        pass
+
+
+async def _key(cache: ResultCache, sql: str) -> str:
+    key = await cache.make_key(sql)
+    assert key is not None
+    return key
+
+
+def test_canonicalize_sql_keeps_literals() -> None:
+    assert canonicalize_sql(
+        "SELECT  count(*)\n  FROM Videos WHERE creator_id = 'AbC'"
+    ) == ("select count(*) from videos where creator_id = 'AbC'")
+
+
+@pytest.mark.asyncio
+async def test_result_cache_hit_and_miss_metrics() -> None:
+    cache = ResultCache(load_version=FakeVersion())
+    key = await _key(cache, "SELECT count(*) FROM videos")
+
+    assert await cache.get(key) is None
+    await cache.set(key, 42)
+
+    assert await cache.get(await _key(cache, "select COUNT(*)  from videos")) == 42
+    assert (
+        await cache.get(await _key(cache, "SELECT count(*) FROM video_snapshots"))
+        is None
+    )
+    assert cache.hits == 1
+    assert cache.misses == 2
+    assert cache.hit_rate == pytest.approx(1 / 3)
+    assert cache.bytes_held > 0
+
+
+@pytest.mark.asyncio
+async def test_result_cache_invalidated_by_data_version() -> None:
+    clock = FakeClock()
+    version = FakeVersion()
+    cache = ResultCache(load_version=version, version_refresh_seconds=5, clock=clock)
+    sql = "SELECT count(*) FROM videos"
+
+    await cache.set(await _key(cache, sql), 10)
+    version.value = 2
+
+    clock.now = 1
+    assert await cache.get(await _key(cache, sql)) == 10
+
+    clock.now = 6
+    assert await cache.get(await _key(cache, sql)) is None
+    assert cache.bytes_held == 0
+    assert version.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_result_cache_bounded_by_bytes() -> None:
+    cache = ResultCache(load_version=FakeVersion(), max_bytes=200)
+
+    for i in range(10):
+        await cache.set(await _key(cache, f"SELECT {i}"), i)
+
+    assert cache.bytes_held <= 200
+    assert await cache.get(await _key(cache, "SELECT 9")) == 9
+    assert await cache.get(await _key(cache, "SELECT 0")) is None
+
+
+@pytest.mark.asyncio
+async def test_result_cache_shared_backend() -> None:
+    backend = InMemoryBackend()
+    writer = ResultCache(load_version=FakeVersion(), backend=backend)
+    reader = ResultCache(load_version=FakeVersion(), backend=backend)
+
+    await writer.set(await _key(writer, "SELECT 1"), 1.5)
+
+    assert await reader.get(await _key(reader, "SELECT 1")) == 1.5
+    assert reader.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_result_cache_bypassed_when_version_unavailable() -> None:
+    async def failing_version() -> int:
+        raise RuntimeError('relation "data_version" does not exist')
+
+    cache = ResultCache(load_version=failing_version)
+
+    assert await cache.make_key("SELECT 1") is None
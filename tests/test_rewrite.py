@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pytest
+
+from app.db.rewrite import rewrite_date_predicates
+
+
+@pytest.mark.parametrize(
+    ("sql", "expected"),
+    [
+        (
+            (
+                "SELECT count(*) AS value FROM video_snapshots "
+                "WHERE created_at::date = '2025-11-27'::date"
+            ),
+            (
+                "SELECT count(*) AS value FROM video_snapshots "
+                "WHERE (created_at >= '2025-11-27'::timestamptz "
+                "AND created_at < '2025-11-28'::timestamptz)"
+            ),
+        ),
+        (
+            (
+                "SELECT count(*) AS value FROM videos WHERE video_created_at::date "
+                "BETWEEN '2025-11-01'::date AND '2025-11-30'::date"
+            ),
+            (
+                "SELECT count(*) AS value FROM videos "
+                "WHERE (video_created_at >= '2025-11-01'::timestamptz "
+                "AND video_created_at < '2025-12-01'::timestamptz)"
+            ),
+        ),
+        (
+            (
+                "SELECT count(*) AS value FROM videos v "
+                "WHERE DATE(v.video_created_at) > '2025-11-01' "
+                "AND v.video_created_at::date <= DATE '2025-12-31'"
+            ),
+            (
+                "SELECT count(*) AS value FROM videos v "
+                "WHERE v.video_created_at >= '2025-11-02'::timestamptz "
+                "AND v.video_created_at < '2026-01-01'::timestamptz"
+            ),
+        ),
+        (
+            (
+                "SELECT count(*) AS value FROM videos "
+                "WHERE CAST(video_created_at AS date) < '2025-11-01'"
+            ),
+            (
+                "SELECT count(*) AS value FROM videos "
+                "WHERE video_created_at < '2025-11-01'::timestamptz"
+            ),
+        ),
+    ],
+)
+def test_rewrite_turns_date_casts_into_ranges(sql: str, expected: str) -> None:
+    assert rewrite_date_predicates(sql) == expected
+
+
+def test_rewrite_routes_other_casts_to_expression_index() -> None:
+    sql = (
+        "SELECT count(*) AS value FROM videos "
+        "WHERE video_created_at::date IN ('2025-11-01', '2025-11-03')"
+    )
+    assert rewrite_date_predicates(sql) == (
+        "SELECT count(*) AS value FROM videos "
+        "WHERE (video_created_at AT TIME ZONE 'UTC')::date "
+        "IN ('2025-11-01', '2025-11-03')"
+    )
+
+
+def test_rewrite_keeps_literal_arithmetic() -> None:
+    sql = "SELECT 1 FROM videos WHERE video_created_at::date = '2025-11-01'::date + 1"
+    assert "'2025-11-01'::date + 1" in rewrite_date_predicates(sql)
+    assert "timestamptz" not in rewrite_date_predicates(sql)
+
+
+def test_rewrite_ignores_date_columns() -> None:
+    sql = (
+        "SELECT sum(delta_views_count) FROM daily_stats WHERE day::date = '2025-11-01'"
+    )
+    assert rewrite_date_predicates(sql) == sql
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, cast
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.rollups import refresh_daily_rollups
+
+
+class RecordingSession:
+    def __init__(self) -> None:
+        self.statements: list[tuple[str, dict[str, Any]]] = []
+
+    async def execute(self, statement: Any, params: dict[str, Any]) -> None:
+        self.statements.append((" ".join(str(statement).split()), params))
+
+
+@pytest.mark.asyncio
+async def test_refresh_daily_rollups_rebuilds_video_days_then_totals() -> None:
+    session = RecordingSession()
+
+    await refresh_daily_rollups(
+        cast(AsyncSession, session),
+        first_day=date(2025, 11, 1),
+        last_day=date(2025, 11, 3),
+    )
+
+    sqls = [sql for sql, _ in session.statements]
+    assert [sql.split()[0:3] for sql in sqls] == [
+        ["DELETE", "FROM", "video_daily_stats"],
+        ["INSERT", "INTO", "video_daily_stats"],
+        ["DELETE", "FROM", "daily_stats"],
+        ["INSERT", "INTO", "daily_stats"],
+    ]
+    assert all(
+        params == {"first_day": date(2025, 11, 1), "last_day": date(2025, 11, 3)}
+        for _, params in session.statements
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_daily_rollups_groups_snapshots_by_utc_day() -> None:
+    session = RecordingSession()
+
+    await refresh_daily_rollups(
+        cast(AsyncSession, session),
+        first_day=date(2025, 11, 1),
+        last_day=date(2025, 11, 1),
+    )
+
+    insert_video_days = session.statements[1][0]
+    assert (
+        "GROUP BY video_id, (created_at AT TIME ZONE 'UTC')::date" in insert_video_days
+    )
+    assert "CAST(:first_day AS timestamp) AT TIME ZONE 'UTC'" in insert_video_days
+    assert (
+        "(CAST(:last_day AS timestamp) + interval '1 day') AT TIME ZONE 'UTC'"
+        in insert_video_days
+    )
+    assert "created_at::date" not in insert_video_days
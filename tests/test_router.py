@@ -1,11 +1,18 @@
+import asyncio
+from types import SimpleNamespace
+
 import pytest
 
-from app.bot.router import handle_text
+from app.bot.pipeline import RequestPipeline
+from app.bot.router import BUSY_TEXT, TOO_EXPENSIVE_TEXT, handle_text
+from app.db.cost import PlanEstimate, SqlBudgetError
+from app.llm.cache import QuestionSqlCache
 
 
 class FakeMessage:
-    def __init__(self, text: str) -> None:
+    def __init__(self, text: str, chat_id: int = 1) -> None:
         self.text = text
+        self.chat = SimpleNamespace(id=chat_id)
         self.answers: list[str] = []
 
     async def answer(self, text: str) -> None:
@@ -42,3 +49,98 @@ async def test_handle_text_returns_unified_error() -> None:
     await handle_text(message, fake_llm_request, fake_sql_execute)
 
     assert message.answers == ["Не смог обработать запрос"]
+
+
+@pytest.mark.asyncio
+async def test_handle_text_uses_question_cache() -> None:
+    llm_calls: list[str] = []
+    executed: list[str] = []
+
+    async def fake_llm_request(messages: list[dict[str, str]]) -> str:
+        llm_calls.append(messages[-1]["text"])
+        return "SELECT count(*) AS value FROM videos WHERE views_count > 100"
+
+    async def fake_sql_execute(sql: str) -> int:
+        executed.append(sql)
+        return 7
+
+    cache = QuestionSqlCache()
+
+    await handle_text(
+        FakeMessage("Сколько видео набрало больше 100 просмотров?"),
+        fake_llm_request,
+        fake_sql_execute,
+        cache,
+    )
+    message = FakeMessage("Сколько видео набрало больше 200 просмотров?")
+    await handle_text(message, fake_llm_request, fake_sql_execute, cache)
+
+    assert len(llm_calls) == 1
+    assert executed[-1] == (
+        "SELECT count(*) AS value FROM videos WHERE views_count > 200"
+    )
+    assert message.answers == ["7"]
+
+
+@pytest.mark.asyncio
+async def test_handle_text_replies_busy_when_pipeline_is_full() -> None:
+    release = asyncio.Event()
+
+    async def slow_llm_request(messages: list[dict[str, str]]) -> str:
+        await release.wait()
+        return "SELECT 1"
+
+    async def fake_sql_execute(sql: str) -> int:
+        return 1
+
+    pipeline = RequestPipeline(max_pending_per_chat=1)
+    first = FakeMessage("сколько?")
+    second = FakeMessage("а теперь?")
+
+    task = asyncio.create_task(
+        handle_text(first, slow_llm_request, fake_sql_execute, None, pipeline)
+    )
+    await asyncio.sleep(0)
+    await handle_text(second, slow_llm_request, fake_sql_execute, None, pipeline)
+    release.set()
+    await task
+
+    assert first.answers == ["1"]
+    assert second.answers == [BUSY_TEXT]
+
+
+@pytest.mark.asyncio
+async def test_handle_text_asks_llm_for_cheaper_sql() -> None:
+    prompts: list[list[dict[str, str]]] = []
+
+    async def fake_llm_request(messages: list[dict[str, str]]) -> str:
+        prompts.append(messages)
+        return "SELECT 2" if len(prompts) > 1 else "SELECT 1"
+
+    async def fake_sql_execute(sql: str) -> int:
+        if sql == "SELECT 1":
+            raise SqlBudgetError("дорого", PlanEstimate(1e9, 1e9))
+        return 2
+
+    message = FakeMessage("сколько?")
+
+    await handle_text(message, fake_llm_request, fake_sql_execute)
+
+    assert message.answers == ["2"]
+    assert prompts[1][-2] == {"role": "assistant", "text": "SELECT 1"}
+    assert "дорого" in prompts[1][-1]["text"]
+
+
+@pytest.mark.asyncio
+async def test_handle_text_gives_up_when_rewrite_is_still_expensive() -> None:
+    async def fake_llm_request(messages: list[dict[str, str]]) -> str:
+        return "SELECT 1"
+
+    async def fake_sql_execute(sql: str) -> int:
+        raise SqlBudgetError("дорого", PlanEstimate(1e9, 1e9))
+
+    message = FakeMessage("сколько?")
+
+    await handle_text(message, fake_llm_request, fake_sql_execute)
+
+    assert message.answers == [TOO_EXPENSIVE_TEXT]
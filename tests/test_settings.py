@@ -1,7 +1,7 @@
 import pytest
 from pydantic import ValidationError
 
-from app.core.settings import Settings
+from app.core.settings import Settings, get_settings
 
 
 def set_valid_env(monkeypatch: pytest.MonkeyPatch, **overrides: str) -> None:
@@ -45,3 +45,68 @@ def test_settings_timeout_values(monkeypatch: pytest.MonkeyPatch) -> None:
     settings = Settings()
     assert settings.llm_timeout_seconds == 45
     assert settings.db_timeout_seconds == 20
+
+
+def test_settings_webhook_values(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(
+        monkeypatch,
+        BOT_MODE="webhook",
+        WEBHOOK_BASE_URL="https://bot.example.com",
+        WEBHOOK_PORT="9000",
+        WEBHOOK_SECRET="s3cret",
+    )
+    settings = Settings()
+    assert settings.bot_mode == "webhook"
+    assert settings.webhook_base_url == "https://bot.example.com"
+    assert settings.webhook_port == 9000
+    assert settings.webhook_path == "/webhook"
+    assert settings.webhook_secret == "s3cret"
+
+
+def test_settings_webhook_requires_secret(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(monkeypatch, BOT_MODE="webhook", WEBHOOK_SECRET="")
+    with pytest.raises(ValidationError, match="WEBHOOK_SECRET"):
+        Settings()
+
+
+def test_settings_metrics_server_is_opt_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(monkeypatch)
+    monkeypatch.delenv("METRICS_HOST", raising=False)
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+    settings = Settings()
+    assert settings.metrics_port == 0
+    assert settings.metrics_host == "127.0.0.1"
+
+
+def test_settings_rejects_unknown_bot_mode(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(monkeypatch, BOT_MODE="carrier-pigeon")
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_settings_llm_backend_values(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(
+        monkeypatch,
+        LLM_BACKENDS="local,yandex",
+        LLM_LOCAL_URL="http://localhost:8000/v1",
+        LLM_TEMPLATES="false",
+    )
+    settings = Settings()
+    assert settings.llm_backends == "local,yandex"
+    assert settings.llm_local_url == "http://localhost:8000/v1"
+    assert settings.llm_templates is False
+
+
+def test_get_settings_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_valid_env(monkeypatch, LLM_TIMEOUT_SECONDS="45")
+    get_settings.cache_clear()
+    try:
+        settings = get_settings()
+        monkeypatch.setenv("LLM_TIMEOUT_SECONDS", "60")
+        assert get_settings() is settings
+        assert settings.llm_timeout_seconds == 45
+
+        get_settings.cache_clear()
+        assert get_settings().llm_timeout_seconds == 60
+    finally:
+        get_settings.cache_clear()
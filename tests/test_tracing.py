@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+from collections.abc import Iterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from aiohttp import web
+
+from app.bot.router import handle_text
+from app.core.tracing import (
+    FileSpanExporter,
+    OtlpHttpExporter,
+    RequestIdFilter,
+    Span,
+    configure_tracing,
+    current_request_id,
+    span,
+    start_trace,
+)
+
+
+class MemoryExporter:
+    def __init__(self) -> None:
+        self.traces: list[list[Span]] = []
+
+    def export(self, spans: list[Span]) -> None:
+        self.traces.append(list(spans))
+
+    async def close(self) -> None:
+        return None
+
+
+class FakeMessage:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.chat = SimpleNamespace(id=1)
+        self.answers: list[str] = []
+
+    async def answer(self, text: str) -> None:
+        self.answers.append(text)
+
+
+@pytest.fixture
+def exporter() -> Iterator[MemoryExporter]:
+    exporter = MemoryExporter()
+    configure_tracing(1.0, exporter)
+    try:
+        yield exporter
+    finally:
+        configure_tracing(0.0, None)
+
+
+def test_unsampled_trace_sets_only_request_id() -> None:
+    assert current_request_id() == "-"
+
+    with start_trace("handle_text") as root:
+        request_id = current_request_id()
+        with span("llm") as child:
+            assert child is None
+        assert root is None
+
+    assert len(request_id) == 16
+    assert current_request_id() == "-"
+
+
+@pytest.mark.asyncio
+async def test_handle_text_exports_one_trace(exporter: MemoryExporter) -> None:
+    async def fake_llm_request(messages: list[dict[str, str]]) -> str:
+        with span("llm.backend", backend="fake"):
+            return "SELECT 1"
+
+    async def fake_sql_execute(sql: str) -> int:
+        with span("db.pool_checkout"):
+            await asyncio.sleep(0)
+        return 1
+
+    await handle_text(FakeMessage("?"), fake_llm_request, fake_sql_execute)
+
+    assert len(exporter.traces) == 1
+    spans = {item.name: item for item in exporter.traces[0]}
+    assert set(spans) == {
+        "handle_text",
+        "llm",
+        "llm.backend",
+        "sql",
+        "db.pool_checkout",
+        "telegram.send",
+    }
+
+    root = spans["handle_text"]
+    assert root.parent_id is None
+    assert root.attributes == {"chat_id": 1, "outcome": "ok"}
+    assert {item.trace_id for item in spans.values()} == {root.trace_id}
+    assert spans["llm"].parent_id == root.span_id
+    assert spans["llm.backend"].parent_id == spans["llm"].span_id
+    assert spans["db.pool_checkout"].parent_id == spans["sql"].span_id
+
+
+@pytest.mark.asyncio
+async def test_span_records_error(exporter: MemoryExporter) -> None:
+    async def failing_llm(messages: list[dict[str, str]]) -> str:
+        raise RuntimeError("boom")
+
+    async def fake_sql_execute(sql: str) -> int:
+        return 1
+
+    await handle_text(FakeMessage("?"), failing_llm, fake_sql_execute)
+
+    spans = {item.name: item for item in exporter.traces[0]}
+    assert spans["llm"].error == "RuntimeError"
+    assert spans["handle_text"].attributes["outcome"] == "error"
+
+
+def test_request_id_filter() -> None:
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg", None, None)
+
+    with start_trace("handle_text"):
+        RequestIdFilter().filter(record)
+        assert record.__dict__["request_id"] == current_request_id()
+
+
+def test_file_exporter_writes_jsonl(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(path)
+    configure_tracing(1.0, exporter)
+    try:
+        with start_trace("handle_text"), span("sql"):
+            pass
+    finally:
+        configure_tracing(0.0, None)
+        asyncio.run(exporter.close())
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["sql", "handle_text"]
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+
+
+@pytest.mark.asyncio
+async def test_file_exporter_writes_from_background_thread(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(path)
+    configure_tracing(1.0, exporter)
+    try:
+        for _ in range(50):
+            with start_trace("handle_text"):
+                pass
+    finally:
+        configure_tracing(0.0, None)
+        await exporter.close()
+
+    # close() дожидается потока: в файле все трассы, ни одна не потеряна.
+    assert len(path.read_text().splitlines()) == 50
+    assert exporter.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_file_exporter_close_returns_when_file_cannot_open(
+    tmp_path: Path,
+) -> None:
+    # Путь — каталог: open падает в потоке записи, а close() не должен зависнуть.
+    exporter = FileSpanExporter(tmp_path, queue_size=1)
+    configure_tracing(1.0, exporter)
+    try:
+        for _ in range(5):
+            with start_trace("handle_text"):
+                pass
+    finally:
+        configure_tracing(0.0, None)
+        await asyncio.wait_for(exporter.close(), timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_otlp_exporter_posts_to_collector() -> None:
+    received: list[dict[str, Any]] = []
+
+    async def traces(request: web.Request) -> web.Response:
+        received.append(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post("/v1/traces", traces)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    exporter = OtlpHttpExporter(f"http://127.0.0.1:{runner.addresses[0][1]}")
+    configure_tracing(1.0, exporter)
+    try:
+        with start_trace("handle_text", chat_id=7), span("llm"):
+            pass
+        await exporter.close()
+    finally:
+        configure_tracing(0.0, None)
+        await runner.cleanup()
+
+    spans = received[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [item["name"] for item in spans] == ["llm", "handle_text"]
+    assert len(spans[1]["traceId"]) == 32
+    assert spans[1]["attributes"] == [{"key": "chat_id", "value": {"intValue": "7"}}]
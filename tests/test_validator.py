@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+from app.db.errors import SqlError
+from app.db.validator import analyze_sql
+
+
+def test_analyze_sql_extracts_tables_columns_and_predicates() -> None:
+    analysis = analyze_sql(
+        "SELECT count(DISTINCT s.video_id) AS value "
+        "FROM video_snapshots s JOIN videos v ON v.id = s.video_id "
+        "WHERE v.creator_id = '42' AND s.delta_views_count > 0"
+    )
+
+    assert analysis.tables == {"videos", "video_snapshots"}
+    assert analysis.columns == {
+        "videos.id",
+        "videos.creator_id",
+        "video_snapshots.video_id",
+        "video_snapshots.delta_views_count",
+    }
+    assert analysis.predicates == (
+        "v.creator_id = '42'",
+        "s.delta_views_count > 0",
+        "v.id = s.video_id",
+    )
+
+
+def test_analyze_sql_allows_keywords_inside_literals() -> None:
+    analysis = analyze_sql(
+        "SELECT count(*) AS value FROM videos WHERE creator_id = 'set show delete'"
+    )
+    assert analysis.tables == {"videos"}
+
+
+def test_analyze_sql_allows_ctes_and_output_aliases() -> None:
+    analysis = analyze_sql(
+        "WITH t AS (SELECT video_id, sum(delta_views_count) AS total "
+        "FROM video_daily_stats GROUP BY video_id) "
+        "SELECT max(t.total) AS value FROM t ORDER BY value"
+    )
+    assert analysis.tables == {"video_daily_stats"}
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM videos",
+        "SELECT 1; SELECT 2",
+        "SELECT 1 INTO copy_of_videos",
+        "SELECT count(*) FROM videos FOR UPDATE",
+        "SELECT pg_sleep(10)",
+        "SELECT count(*) FROM data_version",
+        "SELECT count(*) FROM pg_catalog.pg_user",
+        "SELECT count(secret) FROM videos",
+        "SELECT count(v.secret) FROM videos v",
+        "SELECT count(x.id) FROM videos v",
+        "SELEC 1",
+    ],
+)
+def test_analyze_sql_rejects(sql: str) -> None:
+    with pytest.raises(SqlError):
+        analyze_sql(sql)
+
+
+def test_analyze_sql_caches_rejections() -> None:
+    for _ in range(2):
+        with pytest.raises(SqlError, match="вне схемы"):
+            analyze_sql("SELECT count(*) FROM data_version")
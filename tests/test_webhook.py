@@ -0,0 +1,94 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+
+from app.bot.webhook import build_webhook_app
+
+SECRET = "test-secret"
+
+
+def _update(update_id: int, text: str) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "test"},
+            "text": text,
+        },
+    }
+
+
+@pytest_asyncio.fixture
+async def webhook_url() -> AsyncIterator[tuple[str, list[str]]]:
+    received: list[str] = []
+    router = Router()
+
+    @router.message(F.text)
+    async def capture(message: Message) -> None:
+        received.append(message.text or "")
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    bot = Bot(token="42:TEST")
+
+    app = build_webhook_app(dispatcher, bot, path="/webhook", secret_token=SECRET)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield f"http://127.0.0.1:{runner.addresses[0][1]}", received
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_webhook_feeds_updates_to_dispatcher(
+    webhook_url: tuple[str, list[str]],
+) -> None:
+    base_url, received = webhook_url
+
+    async with (
+        ClientSession() as session,
+        session.post(
+            f"{base_url}/webhook",
+            json=_update(1, "сколько всего видео?"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        ) as response,
+    ):
+        assert response.status == 200
+
+    for _ in range(50):
+        if received:
+            break
+        await asyncio.sleep(0.01)
+
+    assert received == ["сколько всего видео?"]
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret(
+    webhook_url: tuple[str, list[str]],
+) -> None:
+    base_url, received = webhook_url
+
+    async with ClientSession() as session:
+        async with session.post(
+            f"{base_url}/webhook",
+            json=_update(1, "?"),
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        ) as response:
+            assert response.status == 401
+
+        async with session.get(f"{base_url}/healthz") as response:
+            assert response.status == 200
+
+    assert received == []